@@ -0,0 +1,66 @@
+"""
+Compares sorting remote versions by their precomputed sort keys with
+sorting them by comparing their versions with semver, which is how they
+were sorted previously. Run it from the repository root:
+
+    python -m benchmarks.sorting
+"""
+import functools
+import random
+import timeit
+
+import semver
+
+from pipper import versioning
+
+#: Number of remote version keys that are sorted.
+COUNT = 1000
+
+#: Number of timed sorts, of which the fastest is reported.
+REPEATS = 5
+
+
+def make_keys(count: int) -> list:
+    """Returns remote version keys for randomly generated versions."""
+    generator = random.Random(42)
+    return [
+        versioning.make_s3_key('test', '{}.{}.{}{}'.format(
+            generator.randint(0, 20),
+            generator.randint(0, 50),
+            generator.randint(0, 99),
+            '-rc.{}'.format(generator.randint(0, 9))
+            if generator.random() < 0.3 else
+            ''
+        ))
+        for _ in range(count)
+    ]
+
+
+def legacy_compare(a: str, b: str) -> int:
+    """Compares the versions of two remote version keys with semver."""
+    return semver.Version.parse(
+        versioning.RemoteVersion('FAKE', a).version
+    ).compare(versioning.RemoteVersion('FAKE', b).version)
+
+
+def main():
+    keys = make_keys(COUNT)
+
+    legacy = min(timeit.repeat(
+        lambda: sorted(keys, key=functools.cmp_to_key(legacy_compare)),
+        number=1,
+        repeat=REPEATS
+    ))
+    current = min(timeit.repeat(
+        lambda: sorted(versioning.RemoteVersion('FAKE', k) for k in keys),
+        number=1,
+        repeat=REPEATS
+    ))
+
+    print('Sorted {} remote versions'.format(COUNT))
+    print('  semver comparisons: {:.1f} ms'.format(legacy * 1000))
+    print('  sort keys:          {:.1f} ms'.format(current * 1000))
+
+
+if __name__ == '__main__':
+    main()
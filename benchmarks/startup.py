@@ -0,0 +1,72 @@
+"""
+Measures the cumulative import time of the pipper command module and of the
+heavy dependencies imported while running pipper commands. Run it from the
+repository root:
+
+    python -m benchmarks.startup
+"""
+import subprocess
+import sys
+
+#: Commands whose imports are measured.
+COMMANDS = [
+    ['--version'],
+    ['repository', 'list'],
+    ['cache', 'list'],
+]
+
+#: Modules whose cumulative import times are reported.
+MODULES = [
+    'pipper.command',
+    'boto3',
+    'botocore',
+    'requests',
+    'semver',
+    'pkg_resources',
+]
+
+#: Number of interpreter runs per command, of which the fastest is reported.
+REPEATS = 5
+
+
+def import_times(cli_args: list) -> dict:
+    """
+    Returns the cumulative import time in microseconds of every module that
+    was imported while running the pipper command in a new interpreter.
+    """
+    script = 'from pipper import command; command.run({})'.format(
+        repr(list(cli_args))
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[12:].split('|')]
+        if parts[1].isdigit():
+            times[parts[2]] = int(parts[1])
+    return times
+
+
+def main():
+    for cli_args in COMMANDS:
+        runs = [import_times(cli_args) for _ in range(REPEATS)]
+        print('pipper {}'.format(' '.join(cli_args)))
+        for name in MODULES:
+            measured = [run[name] for run in runs if name in run]
+            print('  {:<16} {}'.format(
+                name,
+                '{:.1f} ms'.format(min(measured) / 1000)
+                if measured else
+                'not imported'
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Programmatic interface to pipper for embedding it in other python
+applications, such as services that would otherwise run the pipper command
+in a subprocess. The `Client` methods return structured results instead of
+printing them and raise exceptions when they fail. The `AsyncClient` offers
+the same methods as coroutines for use within an asyncio event loop.
+
+    from pipper import api
+
+    client = api.Client(bucket='my-bucket', profile='my-profile')
+    client.resolve('foo:1.*')['version']
+
+All of the calls made by a client share the same AWS session, S3 client,
+HTTP connection pools and version indexes. Progress messages are written to
+the `pipper` logger, which can be configured with the `logging` module.
+"""
+import asyncio
+import functools
+import os
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from pipper import output
+from pipper import versioning
+from pipper.environment import Environment
+
+
+def to_package_name(package_id: str) -> str:
+    """Returns the package name of a package identifier or URL."""
+    if package_id.startswith('https://'):
+        return versioning.parse_package_url(package_id).package_name
+    return package_id.split(':')[0]
+
+
+class Client:
+    """
+    Runs pipper actions against a pipper repository. The repository is
+    selected in the same way as on the command line, where unspecified
+    values fall back to the default repository configuration.
+
+    :param repository:
+        Name of a repository configured with the repository command.
+    :param bucket:
+        Name of the S3 bucket containing the pipper packages.
+    :param root_prefix:
+        Root prefix of the pipper repository within the bucket.
+    :param profile:
+        Name of the AWS profile whose credentials are used.
+    :param credentials:
+        AWS access key id, secret access key and optional session token
+        used instead of a profile.
+    :param use_cache:
+        Whether or not to use the local bundle cache.
+    :param client_options:
+        S3 client options that override those of the repository, such as
+        `region`, `endpoint_url` or `max_pool_connections`. See the
+        `s3.create_client` function for all of the options.
+    :param verbose:
+        Whether or not to also write the progress messages of the calls to
+        stdout, as the pipper command does.
+    """
+
+    def __init__(
+            self,
+            repository: str = None,
+            bucket: str = None,
+            root_prefix: str = None,
+            profile: str = None,
+            credentials: typing.List[str] = None,
+            use_cache: bool = True,
+            client_options: dict = None,
+            verbose: bool = False
+    ):
+        self.verbose = verbose
+        self._args = dict(
+            client_options or {},
+            repository_name=repository,
+            bucket=bucket,
+            root_prefix=root_prefix,
+            aws_profile=profile,
+            aws_credentials=list(credentials or []),
+            no_cache=not use_cache,
+            quiet=not verbose
+        )
+        self._shared = {}
+        self._lock = threading.Lock()
+        self._s3_client = None
+
+    @property
+    def s3_client(self):
+        """
+        The S3 client shared by all of the calls of the client, which is
+        created by the first call.
+        """
+        with self._lock:
+            if self._s3_client is None:
+                env = Environment(dict(self._args), self._shared)
+                with output.to_stdout(self.verbose):
+                    self._s3_client = env.s3_client
+            return self._s3_client
+
+    def environment(self, **kwargs) -> Environment:
+        """
+        Creates the command environment for a call with the client arguments
+        and the specified call arguments.
+        """
+        env = Environment(dict(self._args, **kwargs), self._shared)
+        env.s3_client = self.s3_client
+        return env
+
+    def resolve(
+            self,
+            package_id: str,
+            include_prereleases: bool = False
+    ) -> dict:
+        """
+        Resolves the package identifier to the latest matching remote
+        version without considering locally installed versions.
+
+        :param package_id:
+            Package name, package name and version constraint (NAME:VERSION)
+            combination, or pipper URL.
+        :param include_prereleases:
+            Whether or not pre-release versions can be matched.
+        :return
+            A dictionary with the package `name`, `version`, `bucket` and
+            S3 `key` of the matching bundle.
+        """
+        return self.resolve_many([package_id], include_prereleases)[0]
+
+    def resolve_many(
+            self,
+            package_ids: typing.List[str],
+            include_prereleases: bool = False
+    ) -> typing.List[dict]:
+        """
+        Resolves all of the package identifiers in a single pass, in which
+        the versions of all of the packages are refreshed together.
+
+        :return
+            The resolved package data for each of the package identifiers
+            in the same form as returned by the `resolve` method.
+        """
+        from pipper import authorizer
+
+        env = self.environment(unstable=include_prereleases)
+        with output.to_stdout(self.verbose):
+            return authorizer.resolve_many(env, list(package_ids))
+
+    def download(
+            self,
+            package_ids: typing.List[str],
+            directory: str,
+            extract: bool = False,
+            jobs: int = 4
+    ) -> typing.Dict[str, str]:
+        """
+        Downloads the pipper bundles of the latest matching remote versions
+        of the specified packages into the directory.
+
+        :param package_ids:
+            Package names, package name and version combinations, or pipper
+            URLs to download.
+        :param directory:
+            Directory where the bundles will be saved.
+        :param extract:
+            Whether or not to also extract the wheel and package metadata of
+            each downloaded bundle into the directory.
+        :param jobs:
+            Maximum number of bundles that are downloaded concurrently.
+        :return
+            A dictionary mapping each package identifier to the local path
+            of its downloaded bundle.
+        """
+        from pipper import downloader
+
+        env = self.environment(
+            save_directory=os.path.realpath(directory),
+            extract=extract,
+            jobs=jobs,
+            upgrade=True
+        )
+        with output.to_stdout(self.verbose):
+            return downloader.download_many(env, list(package_ids))
+
+    def install(
+            self,
+            package_ids: typing.List[str],
+            target_directory: str = None,
+            upgrade: bool = False,
+            user: bool = False,
+            jobs: int = 1
+    ) -> typing.Dict[str, typing.Union[str, None]]:
+        """
+        Installs the specified packages and their pipper dependencies.
+
+        :param package_ids:
+            Package names, package name and version combinations, or pipper
+            URLs to install.
+        :param target_directory:
+            Alternate installation location if specified.
+        :param upgrade:
+            Whether or not to upgrade installed packages to the latest
+            matching versions.
+        :param user:
+            Whether or not to install the packages for the user.
+        :param jobs:
+            Maximum number of packages that are downloaded and installed
+            concurrently.
+        :return
+            A dictionary mapping the name of each specified package to its
+            installed version, or `None` if it is not installed.
+        :raises ValueError:
+            If a requested version of a package is not available.
+        """
+        from pipper import installer
+        from pipper import wrapper
+
+        env = self.environment(
+            target_directory=target_directory,
+            upgrade=upgrade,
+            pip_user=user,
+            jobs=jobs,
+            fail_missing=True
+        )
+        with output.to_stdout(self.verbose):
+            installer.install_many(env, list(package_ids))
+
+        installed = {}
+        for package_id in package_ids:
+            name = to_package_name(package_id)
+            existing = wrapper.status(name, target_directory)
+            installed[name] = existing.version if existing else None
+        return installed
+
+    def publish(
+            self,
+            target_path: str,
+            force: bool = False,
+            acl: str = 'private',
+            jobs: int = 4
+    ) -> typing.List[dict]:
+        """
+        Publishes a pipper bundle, or every pipper bundle in a directory.
+        Versions that have already been published are skipped unless
+        forced.
+
+        :param target_path:
+            Path of a pipper bundle or of a directory containing bundles.
+        :param force:
+            Whether or not to publish versions that have already been
+            published.
+        :param acl:
+            ACL applied to the published bundles and manifests.
+        :param jobs:
+            Maximum number of bundles that are uploaded concurrently.
+        :return
+            A list of results for each package version with its `name`,
+            `version`, `status`, uploaded `size`, upload time `elapsed` and
+            the manifest `entry` of published bundles.
+        """
+        from pipper import publisher
+
+        path = os.path.realpath(target_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError('No such path "{}"'.format(path))
+
+        env = self.environment(force=force, s3_object_acl=acl, jobs=jobs)
+        with output.to_stdout(self.verbose):
+            if os.path.isdir(path):
+                return publisher.publish_all(env, path)
+            return [publisher.from_pipper_file(env, path)]
+
+    def info(self, package_name: str, local_only: bool = False) -> dict:
+        """
+        Returns information about the installed and the latest published
+        versions of the package.
+
+        :param package_name:
+            Name of the package about which to retrieve information.
+        :param local_only:
+            Whether or not to skip looking up the published versions.
+        :return
+            A dictionary with the package `name`, the `installed` version,
+            the `latest` published version entry and the `status` of the
+            installed version.
+        """
+        from pipper import info
+
+        env = self.environment()
+        with output.to_stdout(self.verbose):
+            return info.get_info(env, package_name, local_only)
+
+
+class AsyncClient:
+    """
+    Asyncio variant of the `Client`, which accepts the same arguments. Each
+    call runs on a thread pool, so that many resolutions, downloads and
+    other S3 requests can run concurrently from a single event loop while
+    sharing one S3 client and its connection pool.
+
+    :param max_workers:
+        Maximum number of calls that run concurrently.
+    """
+
+    def __init__(self, *args, max_workers: int = 16, **kwargs):
+        self.client = Client(*args, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _run(self, function: typing.Callable, *args, **kwargs):
+        """Runs the client function on the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(function, *args, **kwargs)
+        )
+
+    async def resolve(self, *args, **kwargs) -> dict:
+        """See `Client.resolve`."""
+        return await self._run(self.client.resolve, *args, **kwargs)
+
+    async def resolve_many(self, *args, **kwargs) -> typing.List[dict]:
+        """See `Client.resolve_many`."""
+        return await self._run(self.client.resolve_many, *args, **kwargs)
+
+    async def download(self, *args, **kwargs) -> typing.Dict[str, str]:
+        """See `Client.download`."""
+        return await self._run(self.client.download, *args, **kwargs)
+
+    async def install(self, *args, **kwargs) -> dict:
+        """See `Client.install`."""
+        return await self._run(self.client.install, *args, **kwargs)
+
+    async def publish(self, *args, **kwargs) -> typing.List[dict]:
+        """See `Client.publish`."""
+        return await self._run(self.client.publish, *args, **kwargs)
+
+    async def info(self, *args, **kwargs) -> dict:
+        """See `Client.info`."""
+        return await self._run(self.client.info, *args, **kwargs)
+
+    def close(self):
+        """Waits for the running calls and shuts down the thread pool."""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
@@ -6,6 +6,8 @@ from urllib.parse import urlparse
 
 from pipper import downloader
 from pipper import environment
+from pipper import output
+from pipper import versioning
 from pipper.environment import Environment
 
 DELTA_REGEX = re.compile('(?P<number>[0-9]+)\s*(?P<unit>[a-zA-Z]+)')
@@ -56,6 +58,51 @@ def parse_url(pipper_url: str) -> dict:
     )
 
 
+def resolve_many(env: Environment, package_ids: list) -> list:
+    """
+    Resolves the latest matching versions of all of the specified packages
+    in a single pass. The cached versions of all of the packages are
+    refreshed together from the repository-wide manifest first, so that
+    resolving each package does not require its own S3 requests.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations.
+    :return
+        The resolved package data for each of the package identifiers.
+    """
+    versioning.index.prefetch(env, [
+        package_id.split(':')[0]
+        for package_id in package_ids
+        if not package_id.startswith('https://')
+    ])
+    return [
+        downloader.parse_package_id(
+            env=env,
+            package_id=package_id,
+            use_latest_version=True
+        )
+        for package_id in package_ids
+    ]
+
+
+def sign_url(env: Environment, data: dict, expires_in: int) -> str:
+    """
+    Creates a presigned URL for the resolved package data. Signing is a
+    local operation that does not make any requests to S3.
+    """
+    url = env.s3_client.generate_presigned_url(
+        ClientMethod='get_object',
+        ExpiresIn=expires_in,
+        Params={'Bucket': env.bucket, 'Key': data['key']}
+    )
+
+    if not env.quiet:
+        output.echo('[AUTHORIZED]: {} -> {}'.format(data['name'], url))
+    return url
+
+
 def create_url(env: Environment, package_id: str) -> str:
     """ """
     data = downloader.parse_package_id(
@@ -64,21 +111,20 @@ def create_url(env: Environment, package_id: str) -> str:
         use_latest_version=True
     )
     delta = to_time_delta(env.args.get('expires_in'))
-
-    url = env.s3_client.generate_presigned_url(
-        ClientMethod='get_object',
-        ExpiresIn=int(delta.total_seconds()),
-        Params={'Bucket': env.bucket, 'Key': data['key']}
-    )
-
-    if not env.quiet:
-        print('[AUTHORIZED]: {} -> {}'.format(data['name'], url))
-    return url
+    return sign_url(env, data, int(delta.total_seconds()))
 
 
 def create_many_urls(env: Environment, package_ids: list) -> dict:
-    """ """
-    urls = {pid: create_url(env, pid) for pid in package_ids}
+    """
+    Creates presigned URLs for all of the specified packages by resolving
+    all of their versions first and then signing all of the URLs locally.
+    """
+    resolved = resolve_many(env, package_ids)
+    expires_in = int(to_time_delta(env.args.get('expires_in')).total_seconds())
+    urls = {
+        pid: sign_url(env, data, expires_in)
+        for pid, data in zip(package_ids, resolved)
+    }
     save_path = env.args.get('save_path')
 
     if not save_path:
@@ -93,7 +139,7 @@ def create_many_urls(env: Environment, package_ids: list) -> dict:
         json.dump(configs, f)
 
     if not env.quiet:
-        print('[SAVED]: {}'.format(path))
+        output.echo('[SAVED]: {}'.format(path))
 
     return urls
 
@@ -109,5 +155,5 @@ def run(env: Environment):
         urls = create_many_urls(env, configs.get('dependencies') or [])
 
     if env.quiet:
-        print(' '.join(urls.values()))
+        output.echo(' '.join(urls.values()))
     return urls
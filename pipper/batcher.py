@@ -0,0 +1,108 @@
+import contextlib
+import shlex
+import sys
+import time
+import typing
+
+from pipper import output
+from pipper.environment import Environment
+
+
+def read_commands(commands_path: str) -> typing.Iterator[tuple]:
+    """
+    Reads the pipper commands of a batch file, which contains one command
+    per line written as it would be on the command line. The leading
+    `pipper` program name is optional. Blank lines and comments starting
+    with `#` are ignored. A path of `-` reads the commands from stdin. The
+    lines are read one at a time as the commands are iterated, so that
+    commands piped into stdin can run as soon as they arrive instead of
+    after stdin is closed.
+
+    :return
+        An iterator of (line number, command line arguments) tuples.
+    """
+    with contextlib.ExitStack() as stack:
+        source = (
+            sys.stdin
+            if commands_path == '-' else
+            stack.enter_context(open(commands_path, 'r'))
+        )
+        lines = iter(source.readline, '')
+        for number, line in enumerate(lines, 1):
+            cli_args = shlex.split(line, comments=True)
+            if cli_args and cli_args[0] == 'pipper':
+                cli_args = cli_args[1:]
+            if cli_args:
+                yield number, cli_args
+
+
+def run_command(env: Environment, cli_args: list) -> bool:
+    """
+    Runs a single command of the batch with the state shared by the batch.
+    Commands that change the repository configs discard the loaded configs
+    so that the following commands read the changes.
+
+    :return
+        Whether or not the command completed successfully.
+    """
+    from pipper import command
+
+    try:
+        command.run(cli_args, env.shared)
+        return True
+    except (Exception, SystemExit) as error:
+        # Argument errors and the version flag exit instead of raising.
+        return isinstance(error, SystemExit) and not error.code
+    finally:
+        if cli_args[0] == 'repository':
+            env.shared.pop('repositories', None)
+
+
+def run(env: Environment) -> typing.List[dict]:
+    """
+    Executes the batch command action, which runs every command in the
+    batch file within this process. The repository configs, AWS sessions,
+    S3 clients, HTTP connection pools and version indexes are created once
+    and reused by all of the commands instead of once per command. The
+    batch stops at the first failed command unless the keep going argument
+    is set.
+
+    :param env:
+        Command environment in which this function is being executed
+    :return
+        A list containing the `line`, `command` and `success` of each
+        command that was run.
+    """
+    started = time.time()
+    keep_going = env.args.get('keep_going')
+    results = []
+
+    for number, cli_args in read_commands(env.args.get('commands_path')):
+        output.echo('[BATCH]: {}: pipper {}'.format(
+            number,
+            ' '.join(cli_args)
+        ))
+        if cli_args[0] == 'batch':
+            raise ValueError('Batches cannot run other batches')
+
+        success = run_command(env, cli_args)
+        results.append(dict(line=number, command=cli_args, success=success))
+        if not success and not keep_going:
+            break
+
+    failures = [r for r in results if not r['success']]
+    output.echo('[TOTAL]: Ran {} commands in {:.2f}s with {} failures'.format(
+        len(results),
+        time.time() - started,
+        len(failures)
+    ))
+    for failure in failures:
+        output.echo('  * Line {}: pipper {}'.format(
+            failure['line'],
+            ' '.join(failure['command'])
+        ))
+
+    if failures:
+        raise RuntimeError('{} batch commands failed'.format(len(failures)))
+
+    return results
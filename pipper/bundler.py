@@ -1,27 +1,56 @@
+import email.parser
+import hashlib
 import json
 import os
 import shutil
+import subprocess
+import sys
 import tempfile
-import time
+import typing
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from distutils.core import run_setup
-
-from setuptools.dist import Distribution
 
+from pipper import output
+from pipper import publisher
 from pipper import versioning
 from pipper.environment import Environment
 
 
+#: Compression applied to each bundle member for each compression option.
+#: The automatic option deflates the metadata but stores the wheel as is,
+#: because wheels are already compressed zip files.
+COMPRESSIONS = {
+    'auto': {'.whl': zipfile.ZIP_STORED, '': zipfile.ZIP_DEFLATED},
+    'stored': {'': zipfile.ZIP_STORED},
+    'deflated': {'': zipfile.ZIP_DEFLATED},
+}
+
+
+def get_source_date() -> datetime:
+    """
+    Returns the fixed time that is recorded in bundles, which is specified
+    by the SOURCE_DATE_EPOCH environment variable for reproducible builds.
+    Without it, the earliest time that zip files can represent is used.
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if not epoch:
+        return datetime(1980, 1, 1)
+    return max(datetime.utcfromtimestamp(int(epoch)), datetime(1980, 1, 1))
+
+
 def zip_bundle(
         bundle_directory: str,
         output_directory: str,
-        distribution_data: dict
+        distribution_data: dict,
+        compression: str = 'auto'
 ) -> str:
     """
     Creates a pipper zip file from the temporarily stored meta data and wheel
     files and saves that zip file to the output directory location with the
-    pipper extension.
+    pipper extension. The zip file is reproducible, because its members are
+    written in sorted order with fixed timestamps and permissions, so that
+    identical bundle contents always produce identical bytes.
     
     :param bundle_directory:
         The directory in which the bundle was assembled, which contains the
@@ -32,6 +61,9 @@ def zip_bundle(
         Information about the package obtained during the wheel building
         process, which includes information retrieved from the setup.py
         file.
+    :param compression:
+        Name of the compression option, as defined in `COMPRESSIONS`, that
+        determines how each member of the bundle is compressed.
         
     :return
         Returns the absolute path to the created zip file.
@@ -42,11 +74,20 @@ def zip_bundle(
         distribution_data['safe_version']
     )
     zip_path = os.path.join(output_directory, filename)
+    compressions = COMPRESSIONS[compression or 'auto']
+    date_time = get_source_date().timetuple()[:6]
 
     with zipfile.ZipFile(zip_path, mode='w') as zipper:
-        for filename in os.listdir(bundle_directory):
+        for filename in sorted(os.listdir(bundle_directory)):
+            info = zipfile.ZipInfo(filename, date_time=date_time)
+            info.external_attr = 0o644 << 16
+            info.compress_type = compressions.get(
+                os.path.splitext(filename)[-1],
+                compressions['']
+            )
             path = os.path.join(bundle_directory, filename)
-            zipper.write(path, filename)
+            with open(path, 'rb') as src, zipper.open(info, 'w') as dest:
+                shutil.copyfileobj(src, dest, 1024 * 1024)
 
     return zip_path
 
@@ -86,77 +127,291 @@ def create_meta(
     metadata.update(dict(
         name=distribution_data['package_name'],
         wheel_name=distribution_data['wheel_name'],
+        wheel_sha256=distribution_data.get('wheel_sha256'),
         version=distribution_data['version'],
         safe_version=distribution_data['safe_version'],
-        timestamp=datetime.utcnow().isoformat()
+        source_hash=distribution_data.get('source_hash'),
+        build_options=distribution_data.get('build_options'),
+        timestamp=(
+            get_source_date()
+            if os.environ.get('SOURCE_DATE_EPOCH') else
+            get_source_mtime(package_directory)
+        ).isoformat()
     ))
 
     path = os.path.join(bundle_directory, 'package.meta')
 
     with open(path, 'w') as f:
-        json.dump(metadata, f)
+        json.dump(metadata, f, sort_keys=True)
 
     return path
 
 
-def create_wheel(package_directory: str, bundle_directory: str) -> dict:
+#: Directories within a package directory that contain build artifacts or
+#: tooling state rather than package sources.
+IGNORED_DIRECTORIES = {
+    '__pycache__', 'build', 'dist', '.git', '.hg', '.tox', '.nox', '.venv',
+    'venv', '.eggs', '.pytest_cache', '.mypy_cache', '.idea', '.vscode'
+}
+
+#: File extensions of build artifacts that are not package sources.
+IGNORED_EXTENSIONS = ('.pyc', '.pyo', '.pipper', '.whl')
+
+
+def list_source_files(package_directory: str) -> typing.Iterator[tuple]:
+    """
+    Yields the relative and absolute paths of the source files within the
+    specified package directory in a deterministic order. Build artifacts
+    and tooling directories are skipped.
+    """
+    for root, directories, filenames in os.walk(package_directory):
+        directories[:] = sorted(
+            d for d in directories
+            if d not in IGNORED_DIRECTORIES and not d.endswith('.egg-info')
+        )
+        for filename in sorted(filenames):
+            if filename.endswith(IGNORED_EXTENSIONS):
+                continue
+
+            path = os.path.join(root, filename)
+            relative_path = os.path.relpath(path, package_directory)
+            yield relative_path.replace(os.sep, '/'), path
+
+
+def get_source_mtime(package_directory: str) -> datetime:
+    """
+    Returns the modification time of the most recently modified source file
+    of the specified package, which is recorded as the bundle timestamp so
+    that bundling unchanged sources records the same timestamp.
+    """
+    mtimes = [
+        os.path.getmtime(path)
+        for _, path in list_source_files(package_directory)
+    ]
+    return max(
+        datetime.utcfromtimestamp(int(max(mtimes, default=0))),
+        datetime(1980, 1, 1)
+    )
+
+
+def hash_source_tree(package_directory: str) -> str:
+    """
+    Computes a fingerprint of the sources of the specified package, which
+    changes whenever a file that can affect the built wheel changes. This
+    includes the setup.py, setup.cfg, MANIFEST.in and pipper.json files,
+    every package module and package data file and the python interpreter
+    that builds the wheel. Build artifacts and tooling directories are
+    ignored.
+
+    :param package_directory:
+        Directory where the package being bundled resides
+    :return
+        The hex SHA-256 digest fingerprint of the package sources.
+    """
+    digest = hashlib.sha256(sys.implementation.cache_tag.encode())
+
+    for relative_path, path in list_source_files(package_directory):
+        digest.update(relative_path.encode())
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+
+    return digest.hexdigest()
+
+
+def get_build_options(
+        compression: str = 'auto',
+        build_isolation: bool = True
+) -> dict:
+    """
+    Returns the bundling options that affect the contents of a bundle other
+    than its package sources, which are recorded in the bundle metadata so
+    that bundles are only reused when they were created with the same ones.
+    """
+    return dict(
+        compression=compression or 'auto',
+        build_isolation=bool(build_isolation)
+    )
+
+
+def find_existing_bundle(
+        output_directory: str,
+        source_hash: str,
+        build_options: dict = None
+) -> typing.Union[str, None]:
+    """
+    Returns the path of the most recently created pipper bundle in the
+    output directory that was bundled from sources with the specified
+    fingerprint and with the specified build options, or `None` if there is
+    no such bundle.
+
+    :param output_directory:
+        The directory where the bundles are saved.
+    :param source_hash:
+        Fingerprint of the package sources, see `hash_source_tree`.
+    :param build_options:
+        Options the bundle must have been created with, as returned by
+        `get_build_options`. Defaults to the default options.
+    """
+    build_options = build_options or get_build_options()
+
+    if not os.path.isdir(output_directory):
+        return None
+
+    paths = sorted(
+        (
+            os.path.join(output_directory, filename)
+            for filename in os.listdir(output_directory)
+            if filename.endswith('.pipper')
+        ),
+        key=os.path.getmtime,
+        reverse=True
+    )
+
+    for path in paths:
+        try:
+            with zipfile.ZipFile(path) as zipper:
+                metadata = json.loads(zipper.read('package.meta'))
+        except Exception:
+            continue
+        is_match = (
+            metadata.get('source_hash') == source_hash
+            and metadata.get('build_options') == build_options
+        )
+        if is_match:
+            return path
+
+    return None
+
+
+def read_wheel_metadata(wheel_path: str) -> dict:
     """
-    Creates a universally wheel distribution of the specified package and
-    saves that to the bundle directory.
+    Reads the core metadata fields, such as the name and version, from the
+    METADATA file within the dist-info directory of the specified wheel.
+    """
+    with zipfile.ZipFile(wheel_path) as zipper:
+        path = next(
+            name for name in zipper.namelist()
+            if name.count('/') == 1
+            and name.endswith('.dist-info/METADATA')
+        )
+        contents = zipper.read(path).decode('utf-8')
+
+    headers = contents.split('\n\n', 1)[0]
+    return email.parser.Parser().parsestr(headers, headersonly=True)
+
+
+def create_wheel(
+        package_directory: str,
+        bundle_directory: str,
+        build_isolation: bool = True
+) -> dict:
+    """
+    Creates a wheel distribution of the specified package and saves that to
+    the bundle directory. The wheel is built by pip with the package's PEP
+    517 build backend in a separate process, so that the build neither
+    shares state with pipper nor with other builds running in parallel. The
+    wheel file is complete once that process has exited. Universal wheels
+    are created for packages that configure them in their setup.cfg file.
     
     :param package_directory:
         Directory where the package being bundled resides
     :param bundle_directory:
         Directory where the bundle is being assembled. This is where the 
         wheel file will be written.
+    :param build_isolation:
+        Whether or not pip installs the build requirements of the package
+        into an isolated environment. Without isolation, the build backend
+        must already be installed in the current environment.
         
     :return
         Returns a dictionary containing distribution information about the 
         wheel package.
     """
+    is_buildable = any(
+        os.path.exists(os.path.join(package_directory, filename))
+        for filename in ('setup.py', 'pyproject.toml')
+    )
+    if not is_buildable:
+        raise FileNotFoundError(
+            'No setup.py or pyproject.toml at "{}"'.format(package_directory)
+        )
+
+    wheel_directory = tempfile.mkdtemp(prefix='pipper-wheel-')
 
-    setup_path = os.path.join(package_directory, 'setup.py')
-    if not os.path.exists(setup_path):
-        raise FileNotFoundError('No setup.py at "{}"'.format(setup_path))
+    try:
+        cmd = [
+            sys.executable,
+            '-m', 'pip',
+            'wheel', package_directory,
+            '--no-deps',
+            '--wheel-dir', wheel_directory,
+        ]
+        if not build_isolation:
+            cmd.append('--no-build-isolation')
 
-    result = run_setup(
-        script_name=setup_path,
-        script_args=['bdist_wheel', '--universal', '-d', bundle_directory]
-    )  # type: Distribution
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True
+        )
+        if result.returncode != 0:
+            output.echo(result.stdout)
+        result.check_returncode()
 
-    # Pause to make sure OS releases wheel file before moving it
-    time.sleep(1)
+        wheel_filename = next(
+            name
+            for name in os.listdir(wheel_directory)
+            if name.endswith('.whl')
+        )
+        wheel_path = os.path.join(bundle_directory, 'package.whl')
+        os.replace(os.path.join(wheel_directory, wheel_filename), wheel_path)
+    finally:
+        shutil.rmtree(wheel_directory)
 
-    wheel_files = [
-        name
-        for name in os.listdir(bundle_directory)
-        if name.endswith('.whl')
-    ]
-    wheel_filename = wheel_files[0]
-    wheel_path = os.path.join(bundle_directory, 'package.whl')
-    shutil.move(os.path.join(bundle_directory, wheel_filename), wheel_path)
+    metadata = read_wheel_metadata(wheel_path)
 
     return dict(
         wheel_path=wheel_path,
         wheel_name=wheel_filename,
-        package_name=result.get_name(),
-        version=result.get_version(),
-        safe_version=versioning.serialize(result.get_version())
+        wheel_sha256=publisher.hash_file(wheel_path),
+        package_name=metadata['Name'],
+        version=metadata['Version'],
+        safe_version=versioning.serialize(metadata['Version'])
     )
 
 
-def run(env: Environment):
-    """
-    Executes the bundling process on the specified package directory and saves
-    the pipper bundle file in the specified output directory.
-            
-    :param env:
-        Environment configuration in which this command is being executed
+def bundle(
+        package_directory: str,
+        output_directory: str = None,
+        force: bool = False,
+        compression: str = 'auto',
+        build_isolation: bool = True
+) -> str:
     """
+    Bundles the specified package directory into a pipper bundle file. If
+    the output directory already contains a bundle that was created from
+    identical package sources with the same compression and build isolation
+    options, that bundle is reused instead.
 
-    package_directory = env.args.get('package_directory') or '.'
-    output_directory = env.args.get('output_directory')
-
+    :param package_directory:
+        Directory where the package being bundled resides
+    :param output_directory:
+        The directory where the zip bundle will be saved. Defaults to the
+        package directory.
+    :param force:
+        Whether or not to bundle the package even if an existing bundle was
+        created from identical package sources.
+    :param compression:
+        Name of the compression option for the members of the bundle.
+    :param build_isolation:
+        Whether or not the wheel is built in an isolated environment.
+    :return
+        Returns the absolute path to the created pipper bundle file.
+    """
     directory = os.path.realpath(package_directory)
     if not os.path.exists(directory):
         raise NotADirectoryError('No such directory "{}"'.format(directory))
@@ -166,18 +421,81 @@ def run(env: Environment):
         if output_directory else
         directory
     )
+    name = os.path.basename(directory)
+    source_hash = hash_source_tree(directory)
+    build_options = get_build_options(compression, build_isolation)
+
+    existing_path = (
+        None
+        if force else
+        find_existing_bundle(save_directory, source_hash, build_options)
+    )
+    if existing_path:
+        output.echo(
+            '[UNCHANGED]: Reusing existing bundle for "{}"'.format(name)
+        )
+        output.echo('[BUNDLED]:', existing_path)
+        return existing_path
 
     bundle_directory = tempfile.mkdtemp(prefix='pipper-bundle-')
 
     try:
-        print('[COMPILE]: Creating universal wheel')
-        distribution_data = create_wheel(directory, bundle_directory)
-        print('[COLLECT]: Creating package metadata')
+        output.echo('[COMPILE]: Creating wheel for "{}"'.format(name))
+        distribution_data = create_wheel(
+            directory,
+            bundle_directory,
+            build_isolation
+        )
+        distribution_data['source_hash'] = source_hash
+        distribution_data['build_options'] = build_options
+        output.echo(
+            '[COLLECT]: Creating package metadata for "{}"'.format(name)
+        )
         create_meta(directory, bundle_directory, distribution_data)
-        print('[ASSEMBLE]: Creating pipper package bundle')
-        path = zip_bundle(bundle_directory, save_directory, distribution_data)
-        print('[BUNDLED]:', path)
+        output.echo(
+            '[ASSEMBLE]: Creating pipper package bundle for "{}"'.format(name)
+        )
+        path = zip_bundle(
+            bundle_directory,
+            save_directory,
+            distribution_data,
+            compression
+        )
+        output.echo('[BUNDLED]:', path)
     except Exception:
         raise
     finally:
         shutil.rmtree(bundle_directory)
+
+    return path
+
+
+def run(env: Environment):
+    """
+    Executes the bundling process on the specified package directories and
+    saves the pipper bundle files in the specified output directory. If the
+    jobs argument is greater than one, the package directories are bundled
+    in parallel.
+            
+    :param env:
+        Environment configuration in which this command is being executed
+    """
+
+    package_directories = env.args.get('package_directories') or ['.']
+    output_directory = env.args.get('output_directory')
+    jobs = max(1, int(env.args.get('jobs') or 1))
+    force = env.args.get('force')
+    compression = env.args.get('compression')
+    build_isolation = not env.args.get('no_build_isolation')
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(
+            lambda d: bundle(
+                d,
+                output_directory,
+                force,
+                compression,
+                build_isolation
+            ),
+            package_directories
+        ))
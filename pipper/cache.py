@@ -0,0 +1,523 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import typing
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+from pipper import output
+from pipper.environment import Environment
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from botocore.client import BaseClient
+
+CACHE_DIRECTORY = (
+    os.environ.get('PIPPER_CACHE_DIRECTORY')
+    or os.path.join(os.path.expanduser('~'), '.pipper', 'cache')
+)
+
+#: Maximum number of bytes of bundles that will be stored in the cache
+#: before the least recently used bundles are evicted.
+MAX_SIZE = int(os.environ.get('PIPPER_CACHE_MAX_SIZE') or 2 * 1024 ** 3)
+
+#: Number of seconds after a cached bundle was last validated against its
+#: remote ETag during which it is used without contacting S3 at all.
+MAX_AGE = int(os.environ.get('PIPPER_CACHE_MAX_AGE') or 24 * 3600)
+
+CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.RLock()
+_lock_depth = 0
+_lock_file = None
+
+#: Paths of the cached bundles and wheels used by the operations that are
+#: currently deferring the pruning of the cache, or `None` if there are none.
+_deferred = None
+_deferred_depth = 0
+
+
+def get_path(*args: str) -> str:
+    """Returns an absolute path within the cache directory."""
+    return os.path.join(CACHE_DIRECTORY, *args)
+
+
+def to_digest(bucket: str, key: str) -> str:
+    """Returns the cache identifier for the specified remote bundle."""
+    return hashlib.sha256('{}/{}'.format(bucket, key).encode()).hexdigest()
+
+
+def get_bundle_path(bucket: str, key: str) -> str:
+    """Returns the path where the specified remote bundle is cached."""
+    return get_path('bundles', '{}.pipper'.format(to_digest(bucket, key)))
+
+
+def get_wheel_path(digest: str, wheel_name: str) -> str:
+    """
+    Returns the path where the wheel with the specified SHA-256 digest is
+    stored in the deduplicating wheel store.
+    """
+    return get_path('wheels', digest, wheel_name)
+
+
+@contextlib.contextmanager
+def locked():
+    """
+    Holds the cache lock, which serializes changes to the cache across the
+    threads of this process and, with an exclusive lock on the lock file in
+    the cache directory, across all pipper processes sharing the cache. The
+    lock is reentrant within a thread.
+    """
+    global _lock_depth, _lock_file
+
+    with _lock:
+        if _lock_depth == 0:
+            if not os.path.exists(get_path()):
+                os.makedirs(get_path(), exist_ok=True)
+            _lock_file = open(get_path('cache.lock'), 'a+')
+            if fcntl:
+                fcntl.flock(_lock_file.fileno(), fcntl.LOCK_EX)
+            else:  # pragma: no cover
+                _lock_file.seek(0)
+                msvcrt.locking(_lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        _lock_depth += 1
+
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if _lock_depth == 0:
+                if fcntl:
+                    fcntl.flock(_lock_file.fileno(), fcntl.LOCK_UN)
+                else:  # pragma: no cover
+                    _lock_file.seek(0)
+                    msvcrt.locking(_lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                _lock_file.close()
+                _lock_file = None
+
+
+def read_json(path: str, default: dict) -> dict:
+    """
+    Reads the JSON file at the specified path or returns the default value
+    if the file does not exist or cannot be read.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def write_json(path: str, data: dict) -> dict:
+    """
+    Atomically writes the data to a JSON file at the specified path so that
+    concurrent pipper processes never read a partially written file.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+    with os.fdopen(handle, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+    return data
+
+
+def load_index() -> dict:
+    """
+    Loads the cache index, which stores information about each cached bundle
+    keyed by its cache identifier.
+    """
+    index = read_json(get_path('bundles.json'), {'bundles': {}})
+    index.setdefault('wheels', {})
+    return index
+
+
+def save_index(index: dict) -> dict:
+    """Writes the cache index to disk."""
+    return write_json(get_path('bundles.json'), index)
+
+
+def update_entry(bucket: str, key: str, **kwargs) -> dict:
+    """
+    Updates the cache index entry for the specified remote bundle with the
+    keyword arguments and returns the updated entry.
+    """
+    with locked():
+        index = load_index()
+        entry = index['bundles'].setdefault(to_digest(bucket, key), {})
+        entry.update(bucket=bucket, key=key, **kwargs)
+        save_index(index)
+    return entry
+
+
+def get_entry(bucket: str, key: str) -> typing.Union[dict, None]:
+    """
+    Returns the cache index entry for the specified remote bundle if the
+    bundle is currently cached or `None` otherwise.
+    """
+    entry = load_index()['bundles'].get(to_digest(bucket, key))
+    if entry and os.path.exists(get_bundle_path(bucket, key)):
+        return entry
+    return None
+
+
+def update_wheel_entry(digest: str, wheel_name: str, **kwargs) -> dict:
+    """
+    Updates the cache index entry of the stored wheel with the keyword
+    arguments and marks it as used.
+    """
+    with locked():
+        index = load_index()
+        entry = index['wheels'].setdefault(digest, {})
+        entry.update(
+            digest=digest,
+            wheel_name=wheel_name,
+            last_used=time.time(),
+            **kwargs
+        )
+        save_index(index)
+    return entry
+
+
+def get_wheel_entry(
+        digest: str,
+        wheel_name: str
+) -> typing.Union[dict, None]:
+    """
+    Returns the cache index entry of the stored wheel if the wheel is
+    currently stored or `None` otherwise.
+    """
+    entry = load_index()['wheels'].get(digest)
+    if entry and os.path.exists(get_wheel_path(digest, wheel_name)):
+        return entry
+    return None
+
+
+def is_fresh(bucket: str, key: str, max_age: int = None) -> bool:
+    """
+    Whether or not the specified remote bundle is cached and was validated
+    against its remote ETag recently enough to be used without contacting
+    S3 at all.
+    """
+    entry = get_entry(bucket, key)
+    max_age = MAX_AGE if max_age is None else max_age
+    age = time.time() - ((entry or {}).get('validated') or 0)
+    return entry is not None and age < max_age
+
+
+def fetch_bundle(
+        s3_client: 'BaseClient',
+        bucket: str,
+        key: str,
+        max_age: int = None
+) -> str:
+    """
+    Returns the local path of the cached copy of the specified remote
+    bundle. Fresh cached bundles are returned without any network access.
+    Stale cached bundles are revalidated with a conditional request on their
+    ETag and only downloaded again if they have changed remotely. Adding a
+    bundle to the cache evicts the least recently used bundles once the
+    cache exceeds its maximum size, which is deferred until the end of the
+    operation when called within `deferred_pruning`.
+
+    :param s3_client:
+        S3 client used to revalidate and download the bundle.
+    :param bucket:
+        Name of the S3 bucket where the bundle resides.
+    :param key:
+        S3 key of the bundle within the bucket.
+    :param max_age:
+        Number of seconds after validation during which a cached bundle is
+        used without revalidation. Defaults to the `MAX_AGE` setting.
+    :return
+        The absolute path to the cached bundle file.
+    """
+    from botocore.exceptions import ClientError
+    from pipper import s3
+
+    path = get_bundle_path(bucket, key)
+    entry = get_entry(bucket, key)
+    now = time.time()
+
+    if is_fresh(bucket, key, max_age):
+        update_entry(bucket, key, last_used=now)
+        protect(path)
+        output.echo('[CACHED]: {}'.format(key))
+        return path
+
+    kwargs = {'IfNoneMatch': entry['etag']} if entry else {}
+
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+    except ClientError as error:
+        code = error.response.get('Error', {}).get('Code')
+        if not entry or code not in ('304', 'NotModified'):
+            raise
+        update_entry(bucket, key, validated=now, last_used=now)
+        protect(path)
+        output.echo('[CACHED]: {} (revalidated)'.format(key))
+        return path
+
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.partial')
+    try:
+        if (response.get('ContentLength') or 0) < s3.PART_SIZE:
+            with os.fdopen(handle, 'wb') as f:
+                shutil.copyfileobj(response['Body'], f, CHUNK_SIZE)
+        else:
+            # Large bundles are downloaded with concurrent ranged requests
+            # and must still have the ETag of the response afterwards.
+            os.close(handle)
+            response['Body'].close()
+            s3.download_file(
+                s3_client,
+                bucket,
+                key,
+                temp_path,
+                etag=response.get('ETag')
+            )
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    update_entry(
+        bucket,
+        key,
+        etag=response.get('ETag'),
+        size=os.path.getsize(path),
+        validated=now,
+        last_used=now
+    )
+    prune_after(path)
+    return path
+
+
+def list_entries() -> typing.List[dict]:
+    """
+    Returns the cached bundle entries sorted from most to least recently
+    used.
+    """
+    entries = [
+        entry for entry in load_index()['bundles'].values()
+        if os.path.exists(get_bundle_path(entry['bucket'], entry['key']))
+    ]
+    entries.sort(key=lambda entry: entry.get('last_used') or 0, reverse=True)
+    return entries
+
+
+def prune(
+        max_size: int = None,
+        protected: typing.List[str] = None
+) -> typing.List[dict]:
+    """
+    Evicts the least recently used bundles and stored wheels from the cache
+    until their total size is no larger than the maximum size.
+
+    :param max_size:
+        Maximum total size of cached bundles and wheels in bytes. Defaults
+        to the `MAX_SIZE` setting.
+    :param protected:
+        Paths of cached bundles or wheels that must not be evicted, such as
+        the file that was just added to the cache.
+    :return
+        The list of evicted cache entries.
+    """
+    max_size = MAX_SIZE if max_size is None else max_size
+    protected = protected or []
+    removed = []
+
+    with locked():
+        index = load_index()
+        items = [
+            ('bundles', digest, entry, get_bundle_path(
+                entry['bucket'],
+                entry['key']
+            ))
+            for digest, entry in index['bundles'].items()
+        ] + [
+            ('wheels', digest, entry, get_wheel_path(
+                digest,
+                entry['wheel_name']
+            ))
+            for digest, entry in index['wheels'].items()
+        ]
+        items.sort(key=lambda item: item[2].get('last_used') or 0)
+        total = sum(item[2].get('size') or 0 for item in items)
+
+        for kind, digest, entry, path in items:
+            missing = not os.path.exists(path)
+            if not missing and (total <= max_size or path in protected):
+                continue
+
+            if not missing:
+                os.remove(path)
+            if kind == 'wheels':
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            total -= entry.get('size') or 0
+            removed.append(index[kind].pop(digest))
+
+        save_index(index)
+
+    return removed
+
+
+def protect(path: str):
+    """
+    Protects the cached bundle or wheel at the specified path from eviction
+    until the operations deferring the pruning of the cache have completed.
+    """
+    with _lock:
+        if _deferred is not None:
+            _deferred.add(path)
+
+
+def prune_after(path: str):
+    """
+    Prunes the cache after the bundle or wheel at the specified path was
+    added to it without evicting that path. Within `deferred_pruning`, the
+    path is protected instead and the cache is pruned once at its end.
+    """
+    with _lock:
+        if _deferred is not None:
+            _deferred.add(path)
+            return
+    prune(protected=[path])
+
+
+@contextlib.contextmanager
+def deferred_pruning():
+    """
+    Defers the pruning of the cache until the end of an operation, such as
+    an installation, that uses many cached bundles and wheels. All of the
+    cache paths used during the operation are protected when the cache is
+    pruned at its end, so that no bundle of a dependency graph is evicted
+    before it has been installed. The contexts can be nested and can be
+    active in multiple threads at once, in which case the cache is pruned
+    when the last of them exits.
+    """
+    global _deferred, _deferred_depth
+
+    with _lock:
+        if _deferred_depth == 0:
+            _deferred = set()
+        _deferred_depth += 1
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _deferred_depth -= 1
+            protected = _deferred if _deferred_depth == 0 else None
+            if protected is not None:
+                _deferred = None
+
+        if protected is not None:
+            prune(protected=list(protected))
+
+
+def clear() -> typing.List[dict]:
+    """
+    Removes all bundles and stored wheels from the cache and returns the
+    removed entries.
+    """
+    with locked():
+        index = load_index()
+        entries = (
+            list(index['bundles'].values())
+            + list(index['wheels'].values())
+        )
+        shutil.rmtree(get_path('bundles'), ignore_errors=True)
+        shutil.rmtree(get_path('wheels'), ignore_errors=True)
+        save_index({'bundles': {}, 'wheels': {}})
+    return entries
+
+
+def to_size_label(size: int) -> str:
+    """Converts a size in bytes into a human readable label."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return '{:.1f}{}'.format(size, unit)
+        size /= 1024
+
+
+def list_wheel_entries() -> typing.List[dict]:
+    """
+    Returns the stored wheel entries sorted from most to least recently
+    used.
+    """
+    entries = [
+        entry for entry in load_index()['wheels'].values()
+        if os.path.exists(get_wheel_path(entry['digest'], entry['wheel_name']))
+    ]
+    entries.sort(key=lambda entry: entry.get('last_used') or 0, reverse=True)
+    return entries
+
+
+def to_throughput_label(size: int, elapsed: float) -> str:
+    """Converts a transfer size and duration into a throughput label."""
+    return '{}/s'.format(to_size_label(size / elapsed if elapsed > 0 else 0))
+
+
+def print_entries():
+    """Prints information about each of the cached bundles and wheels."""
+    entries = list_entries()
+    wheels = list_wheel_entries()
+    total = sum(entry.get('size') or 0 for entry in entries + wheels)
+
+    output.echo('[CACHE]: {}'.format(get_path()))
+    for entry in entries:
+        output.echo('  * s3://{}/{} ({}, last used {})'.format(
+            entry['bucket'],
+            entry['key'],
+            to_size_label(entry.get('size') or 0),
+            datetime.fromtimestamp(entry.get('last_used') or 0).isoformat()
+        ))
+    for entry in wheels:
+        output.echo('  * {} ({}, last used {})'.format(
+            entry['wheel_name'],
+            to_size_label(entry.get('size') or 0),
+            datetime.fromtimestamp(entry.get('last_used') or 0).isoformat()
+        ))
+    output.echo('[TOTAL]: {} bundles, {} wheels, {} of {}'.format(
+        len(entries),
+        len(wheels),
+        to_size_label(total),
+        to_size_label(MAX_SIZE)
+    ))
+
+
+def run(env: Environment):
+    """Executes the cache command action."""
+    action = env.args.get('cache_action')
+    if action == 'list':
+        return print_entries()
+    elif action == 'prune':
+        max_size = env.args.get('max_size')
+        removed = prune(
+            int(max_size * 1024 * 1024) if max_size is not None else None
+        )
+        output.echo('[PRUNED]: Removed {} cache entries'.format(len(removed)))
+        return removed
+    elif action == 'clear':
+        removed = clear()
+        output.echo('[CLEARED]: Removed {} cache entries'.format(len(removed)))
+        return removed
+
+    raise ValueError('Unknown cache action "{}"'.format(action))
@@ -1,29 +1,41 @@
+import importlib
 import sys
 import json
 import os
+import typing
 
+from pipper import output
 from pipper import parser
-from pipper import installer
-from pipper import bundler
-from pipper import publisher
-from pipper import info
-from pipper import authorizer
-from pipper import downloader
-from pipper import repository
 from pipper.environment import Environment
 
-
+#: Modules that implement each command action with a `run` function. The
+#: modules are only imported when their action is invoked because they
+#: import heavy dependencies, such as boto3, that slow down startup.
 ACTIONS = dict(
-    authorize=authorizer.run,
-    download=downloader.run,
-    install=installer.run,
-    bundle=bundler.run,
-    publish=publisher.run,
-    info=info.run,
-    repository=repository.run
+    authorize='pipper.authorizer',
+    batch='pipper.batcher',
+    download='pipper.downloader',
+    install='pipper.installer',
+    lock='pipper.locker',
+    bundle='pipper.bundler',
+    publish='pipper.publisher',
+    info='pipper.info',
+    repository='pipper.repository',
+    cache='pipper.cache'
 )
 
 
+def get_action(action_name: str) -> typing.Union[typing.Callable, None]:
+    """
+    Imports the module of the specified command action and returns its run
+    function, or `None` if no such action exists.
+    """
+    module_path = ACTIONS.get(action_name)
+    if module_path is None:
+        return None
+    return importlib.import_module(module_path).run
+
+
 def show_version(env: Environment):
     """Shows the pipper version information and then exits"""
 
@@ -34,35 +46,46 @@ def show_version(env: Environment):
     version = settings.get('version') or '0.0.0'
 
     if env.quiet:
-        print(version)
+        output.echo(version)
     else:
-        print('Version: {}'.format(version))
+        output.echo('Version: {}'.format(version))
+
 
+def run(cli_args: list = None, shared: dict = None):
+    """
+    Runs the pipper command specified by the command line arguments. The
+    output of the command is written to stdout.
 
-def run(cli_args: list = None):
-    """ """
-    args = parser.parse(cli_args)
-    env = Environment(args)
+    :param cli_args:
+        Overrides the command line arguments. By default the sys args will
+        be used.
+    :param shared:
+        State shared with the other commands of a batch, which is passed
+        along to the command environment.
+    """
+    with output.to_stdout():
+        args = parser.parse(cli_args)
+        env = Environment(args, shared)
 
-    if args.get('version'):
-        show_version(env)
-        sys.exit(0)
+        if args.get('version'):
+            show_version(env)
+            sys.exit(0)
 
-    action = ACTIONS.get(env.action)
-    if action is None:
-        message = 'Unrecognized command action "{}"'.format(env.action)
-        print('[ERROR]: {}'.format(message))
-        args['parser'].print_help()
-        raise ValueError(message)
+        action = get_action(env.action)
+        if action is None:
+            message = 'Unrecognized command action "{}"'.format(env.action)
+            output.echo('[ERROR]: {}'.format(message))
+            args['parser'].print_help()
+            raise ValueError(message)
 
-    if not env.quiet:
-        print('\n\n=== {} ===\n'.format(env.action.upper()))
+        if not env.quiet:
+            output.echo('\n\n=== {} ===\n'.format(env.action.upper()))
 
-    try:
-        action(env)
-    except Exception as err:
-        print('[ERROR]: Unable to complete action. {}\n'.format(err))
-        raise
+        try:
+            action(env)
+        except Exception as err:
+            output.echo('[ERROR]: Unable to complete action. {}\n'.format(err))
+            raise
 
-    if not env.quiet:
-        print('\n')
+        if not env.quiet:
+            output.echo('\n')
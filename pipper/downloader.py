@@ -1,16 +1,42 @@
+import hashlib
 import json
 import os
 import shutil
+import tempfile
+import threading
+import time
+import typing
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from pipper import cache
 from pipper import environment
+from pipper import output
+from pipper import s3
 from pipper import versioning
 from pipper import wrapper
 from pipper.environment import Environment
 
+#: Number of bytes of a streamed bundle that are buffered in memory before
+#: the buffer is rolled over to an anonymous temporary file.
+SPOOL_SIZE = 64 * 1024 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+
+#: Number of times that failed HTTP requests are retried.
+RETRIES = 5
+
+#: Maximum number of pooled HTTP connections kept open per host.
+POOL_SIZE = 16
+
+_http_lock = threading.Lock()
+_http_session = None
+
 
 def parse_package_id(
         env: Environment,
@@ -69,7 +95,10 @@ def parse_package_id(
                 include_prereleases=unstable
             ).version
         if not upgrade:
-            existing = wrapper.status(name)
+            existing = wrapper.status(
+                name,
+                env.args.get('target_directory')
+            )
             yield existing.version if existing else None
         yield versioning.find_latest_match(
             env,
@@ -80,10 +109,12 @@ def parse_package_id(
     try:
         version = next((v for v in possible_versions() if v is not None))
     except IndexError:
-        print('[ERROR]: Unable to acquire version of "{}"'.format(package_id))
+        output.echo(
+            '[ERROR]: Unable to acquire version of "{}"'.format(package_id)
+        )
         raise
 
-    print('[PACKAGE]:', package_id, version)
+    output.echo('[PACKAGE]:', package_id, version)
 
     return dict(
         name=name,
@@ -93,24 +124,393 @@ def parse_package_id(
     )
 
 
-def save(url: str, local_path: str) -> str:
-    """..."""
-    with closing(requests.get(url, stream=True)) as response:
-        if response.status_code != 200:
-            print((
-                '[ERROR]: Unable to download remote package. Has your'
+def get_http_session() -> requests.Session:
+    """
+    Returns the HTTP session shared by all downloads of the process, which
+    pools connections to each host and retries transient failures, such as
+    connection errors and throttling responses, with exponential backoff.
+    """
+    global _http_session
+
+    with _http_lock:
+        if _http_session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504)
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE,
+                pool_maxsize=POOL_SIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def stream_url(
+        url: str,
+        destination: typing.BinaryIO,
+        offset: int = 0,
+        etag: str = None,
+        on_etag: typing.Callable[[str], None] = None
+) -> dict:
+    """
+    Streams the contents of the URL into the destination file object. If
+    an offset and the ETag of the already downloaded contents are
+    specified, only the remainder of the contents after that offset is
+    requested with a Range request, which is conditional on the ETag with
+    an If-Range header. If the server returns the complete contents
+    instead, such as when the remote file has changed, the destination is
+    truncated and the complete contents are written. Without an ETag, the
+    contents before the offset cannot be validated and are downloaded
+    again.
+
+    :param url:
+        URL of the remote file to download.
+    :param destination:
+        Binary file object positioned at the offset into which the contents
+        are written.
+    :param offset:
+        Number of bytes that have already been downloaded.
+    :param etag:
+        ETag of the remote file from which the bytes before the offset were
+        downloaded.
+    :param on_etag:
+        Function called with the ETag of the remote file before its contents
+        are written, so that an interrupted download can be resumed later.
+    :return
+        A dictionary with the `size` of the remote file written to the
+        destination, including the bytes before the offset, and its `etag`.
+    """
+    if offset and not etag:
+        destination.seek(0)
+        destination.truncate()
+        offset = 0
+
+    headers = (
+        {'Range': 'bytes={}-'.format(offset), 'If-Range': etag}
+        if offset else
+        {}
+    )
+    session = get_http_session()
+
+    with closing(session.get(url, headers=headers, stream=True)) as response:
+        remote_etag = response.headers.get('ETag')
+        if response.status_code == 416 and offset:
+            # The range starts at the end of the remote file, which means
+            # that the previous download was already complete.
+            total = response.headers.get('Content-Range', '').split('/')[-1]
+            if total == str(offset):
+                return dict(size=offset, etag=etag)
+            return stream_url(url, destination, on_etag=on_etag)
+
+        if response.status_code not in (200, 206):
+            raise IOError((
+                'Unable to download remote package (HTTP {}). Has your '
                 'authorized URL expired? Is there internet connectivity?'
-            ))
+            ).format(response.status_code))
 
-        with open(local_path, 'wb') as f:
-            for chunk in response:
-                f.write(chunk)
-                f.flush()
-                os.fsync(f.fileno())
+        is_resumed = (
+            response.status_code == 206
+            and (not remote_etag or remote_etag == etag)
+        )
+        if offset and not is_resumed:
+            # Servers that ignore If-Range may return a range of another
+            # version of the file, which must not be appended.
+            if response.status_code == 206:
+                return stream_url(url, destination, on_etag=on_etag)
+            destination.seek(0)
+            destination.truncate()
+            offset = 0
+
+        if on_etag:
+            on_etag(remote_etag)
+
+        for chunk in response.iter_content(CHUNK_SIZE):
+            destination.write(chunk)
+            offset += len(chunk)
+
+    return dict(size=offset, etag=remote_etag or etag)
+
+
+def save(url: str, local_path: str) -> str:
+    """
+    Downloads the remote file at the URL to the local path. The file is
+    downloaded to a partial file next to the local path, which is only
+    moved into place once the download is complete and synced to disk.
+    Downloads that are interrupted are resumed from the end of the partial
+    file with Range requests, including a partial file left behind by a
+    previous invocation. The ETag of the remote file is stored next to the
+    partial file, so that a partial file is only resumed from the same
+    version of the remote file.
+
+    :param url:
+        URL of the remote file to download, such as an authorized URL.
+    :param local_path:
+        Path where the downloaded file will be saved.
+    :return
+        The local path where the file was saved.
+    """
+    partial_path = '{}.partial'.format(local_path)
+    etag_path = '{}.etag'.format(partial_path)
+
+    def read_etag() -> typing.Union[str, None]:
+        if not os.path.exists(etag_path):
+            return None
+        with open(etag_path, 'r') as e:
+            return e.read().strip() or None
+
+    def write_etag(value: typing.Union[str, None]):
+        with open(etag_path, 'w') as e:
+            e.write(value or '')
 
+    try:
+        with open(partial_path, 'ab') as f:
+            for attempt in range(RETRIES + 1):
+                try:
+                    stream_url(url, f, f.tell(), read_etag(), write_etag)
+                    break
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError
+                ):
+                    if attempt == RETRIES:
+                        raise
+                    output.echo(
+                        '[RETRYING]: Resuming download after {}B'.format(
+                            f.tell()
+                        )
+                    )
+                    time.sleep(0.5 * 2 ** attempt)
+
+            f.flush()
+            os.fsync(f.fileno())
+    except (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError
+    ):
+        # Keep partial downloads that can be resumed by a later invocation.
+        if not os.path.getsize(partial_path):
+            remove_partial(partial_path)
+        raise
+    except Exception:
+        remove_partial(partial_path)
+        raise
+
+    os.replace(partial_path, local_path)
+    if os.path.exists(etag_path):
+        os.remove(etag_path)
     return local_path
 
 
+def remove_partial(path: str):
+    """Removes a partial download file and the ETag stored next to it."""
+    for target in (path, '{}.etag'.format(path)):
+        if os.path.exists(target):
+            os.remove(target)
+
+
+def open_bundle(env: Environment, data: dict) -> typing.BinaryIO:
+    """
+    Opens a readable and seekable file object for the remote pipper bundle
+    described by the resolved package data without saving the bundle to a
+    file of its own. Cached bundles are opened directly from the cache.
+    Otherwise the remote bundle is streamed into a spooled buffer, which is
+    only rolled over to disk for bundles larger than the `SPOOL_SIZE`.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param data:
+        Package data as returned by the `parse_package_id` function.
+    :return
+        A binary file object positioned at the start of the bundle, which
+        the caller is responsible for closing.
+    """
+    if 'url' not in data and not env.args.get('no_cache'):
+        return open(
+            cache.fetch_bundle(env.s3_client, data['bucket'], data['key']),
+            'rb'
+        )
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        if 'url' in data:
+            stream_url(data['url'], buffer)
+        else:
+            response = env.s3_client.get_object(
+                Bucket=data['bucket'],
+                Key=data['key']
+            )
+            shutil.copyfileobj(response['Body'], buffer, CHUNK_SIZE)
+    except Exception:
+        buffer.close()
+        raise
+
+    buffer.seek(0)
+    return buffer
+
+
+def read_bundle_metadata(zipper: zipfile.ZipFile) -> dict:
+    """Reads the package metadata from an opened pipper bundle."""
+    return json.loads(zipper.read('package.meta'))
+
+
+def copy_verified(
+        source: typing.BinaryIO,
+        destination: typing.BinaryIO,
+        expected_sha256: str = None
+) -> str:
+    """
+    Copies the source file object into the destination file object while
+    computing the SHA-256 digest of the copied bytes, which is verified
+    against the expected digest if one is specified.
+
+    :return
+        The hex SHA-256 digest of the copied bytes.
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        destination.write(chunk)
+
+    result = digest.hexdigest()
+    if expected_sha256 and result != expected_sha256:
+        raise ValueError(
+            'Wheel digest {} does not match the bundle digest {}'.format(
+                result,
+                expected_sha256
+            )
+        )
+    return result
+
+
+def write_wheel(
+        zipper: zipfile.ZipFile,
+        metadata: dict,
+        directory: str
+) -> str:
+    """
+    Writes the wheel member of an opened pipper bundle into the specified
+    directory under its final wheel file name. If the bundle metadata
+    includes the digest of the wheel, the wheel is verified while it is
+    written and removed again if it does not match.
+
+    :return
+        The path of the written wheel file.
+    """
+    wheel_path = os.path.join(directory, metadata['wheel_name'])
+    try:
+        with zipper.open('package.whl') as source:
+            with open(wheel_path, 'wb') as f:
+                copy_verified(source, f, metadata.get('wheel_sha256'))
+    except Exception:
+        if os.path.exists(wheel_path):
+            os.remove(wheel_path)
+        raise
+
+    return wheel_path
+
+
+def extract_wheel(
+        source: typing.Union[str, typing.BinaryIO],
+        directory: str
+) -> dict:
+    """
+    Extracts the wheel file from a pipper bundle into the specified
+    directory under its final wheel file name. The bundle is only opened
+    once, the wheel is the only file written to disk and it is verified
+    against the digest in the bundle metadata while it is written.
+
+    :param source:
+        Either the path to a local pipper bundle file or a readable and
+        seekable file object containing the bundle.
+    :param directory:
+        Directory where the wheel file will be written.
+    :return
+        A dictionary containing the `wheel_path` of the extracted wheel and
+        the package `metadata` from the bundle.
+    """
+    with zipfile.ZipFile(source, 'r') as zipper:
+        metadata = read_bundle_metadata(zipper)
+        wheel_path = write_wheel(zipper, metadata, directory)
+
+    return dict(wheel_path=wheel_path, metadata=metadata)
+
+
+def verify_bundle(path: str) -> dict:
+    """
+    Verifies the wheel of a downloaded pipper bundle against the digest in
+    the bundle metadata without extracting it. Bundles whose metadata does
+    not include the digest of their wheel cannot be verified.
+
+    :param path:
+        Path to a local pipper bundle file.
+    :return
+        The package metadata from the bundle.
+    """
+    with zipfile.ZipFile(path, 'r') as zipper:
+        metadata = read_bundle_metadata(zipper)
+        if metadata.get('wheel_sha256'):
+            with zipper.open('package.whl') as source:
+                with open(os.devnull, 'wb') as f:
+                    copy_verified(source, f, metadata['wheel_sha256'])
+
+    return metadata
+
+
+def extract_to_store(
+        source: typing.Union[str, typing.BinaryIO]
+) -> typing.Union[dict, None]:
+    """
+    Extracts the wheel file from a pipper bundle into the local wheel store,
+    where wheels are stored once per digest. A wheel that is already stored,
+    such as the same wheel published under another version or repository,
+    is not extracted again.
+
+    :param source:
+        Either the path to a local pipper bundle file or a readable and
+        seekable file object containing the bundle.
+    :return
+        A dictionary containing the `wheel_path` of the stored wheel and the
+        package `metadata` from the bundle, or `None` if the bundle metadata
+        does not include the digest of its wheel.
+    """
+    with zipfile.ZipFile(source, 'r') as zipper:
+        metadata = read_bundle_metadata(zipper)
+        digest = metadata.get('wheel_sha256')
+        if not digest:
+            return None
+
+        path = cache.get_wheel_path(digest, metadata['wheel_name'])
+        if cache.get_wheel_entry(digest, metadata['wheel_name']):
+            cache.update_wheel_entry(digest, metadata['wheel_name'])
+            cache.protect(path)
+            output.echo('[CACHED]: {}'.format(metadata['wheel_name']))
+            return dict(wheel_path=path, metadata=metadata)
+
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        temp_directory = tempfile.mkdtemp(dir=directory, prefix='.partial-')
+        try:
+            os.replace(write_wheel(zipper, metadata, temp_directory), path)
+        finally:
+            shutil.rmtree(temp_directory)
+
+    cache.update_wheel_entry(
+        digest,
+        metadata['wheel_name'],
+        size=os.path.getsize(path)
+    )
+    cache.prune_after(path)
+    return dict(wheel_path=path, metadata=metadata)
+
+
 def extract_pipper_file(
         local_bundle_path: str,
         extract_directory: str = None
@@ -118,12 +518,8 @@ def extract_pipper_file(
     """ """
 
     directory = extract_directory or os.path.dirname(local_bundle_path)
-
-    with zipfile.ZipFile(local_bundle_path, 'r') as zipper:
-        contents = zipper.read('package.meta')
-
-    metadata = json.loads(contents)
-    wheel_path = os.path.join(directory, metadata['wheel_name'])
+    extracted = extract_wheel(local_bundle_path, directory)
+    metadata = extracted['metadata']
     metadata_path = os.path.join(
         directory,
         '{}.meta.json'.format(metadata['wheel_name'])
@@ -132,21 +528,30 @@ def extract_pipper_file(
     with open(metadata_path, 'w') as f:
         json.dump(metadata, f)
 
-    with zipfile.ZipFile(local_bundle_path, 'r') as zipper:
-        zipper.extract('package.whl', directory)
-        shutil.move(os.path.join(directory, 'package.whl'), wheel_path)
-
     return dict(
         meta_path=metadata_path,
-        wheel_path=wheel_path,
+        wheel_path=extracted['wheel_path'],
         metadata=metadata,
         bundle_path=local_bundle_path
     )
 
 
-def download_package(env: Environment, package_id: str) -> str:
-    """..."""
-    data = parse_package_id(env, package_id)
+def fetch_package(env: Environment, data: dict) -> dict:
+    """
+    Downloads the pipper bundle of the resolved package data into the save
+    directory and extracts it if the extract argument is set. The wheel is
+    verified against the digest in the bundle metadata either way, and a
+    bundle that fails verification is removed again.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param data:
+        Package data as returned by the `parse_package_id` function.
+    :return
+        A dictionary containing the local `path` of the downloaded bundle,
+        its `size` in bytes and the number of seconds the download took.
+    """
+    started = time.time()
     directory = os.path.realpath(env.args.get('save_directory') or '.')
     path = os.path.join(directory, '{}-{}.pipper'.format(
         data['name'],
@@ -154,33 +559,94 @@ def download_package(env: Environment, package_id: str) -> str:
     ))
 
     if not os.path.exists(directory):
-        os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
 
     if 'url' in data:
-        save(package_id, path)
-    else:
-        env.s3_client.download_file(
-            Bucket=data['bucket'],
-            Key=data['key'],
-            Filename=path
+        save(data['url'], path)
+    elif not env.args.get('no_cache'):
+        shutil.copyfile(
+            cache.fetch_bundle(env.s3_client, data['bucket'], data['key']),
+            path
         )
+    else:
+        s3.download_file(env.s3_client, data['bucket'], data['key'], path)
+
+    size = os.path.getsize(path)
+    elapsed = time.time() - started
+    output.echo('[DOWNLOADED]: {} -> {} ({} in {:.2f}s, {})'.format(
+        data['name'],
+        path,
+        cache.to_size_label(size),
+        elapsed,
+        cache.to_throughput_label(size, elapsed)
+    ))
 
-    print('[DOWNLOADED]: {} -> {}'.format(data['name'], path))
+    try:
+        if not env.args.get('extract'):
+            verify_bundle(path)
+            return dict(path=path, size=size, elapsed=elapsed)
 
-    if env.args.get('extract'):
         paths = extract_pipper_file(path, directory)
-        print(
-            '[EXTRACTED]:',
-            '\n  *', paths['wheel_path'],
-            '\n  *', paths['meta_path']
-        )
+    except Exception:
+        os.remove(path)
+        raise
 
-    return path
+    output.echo(
+        '[EXTRACTED]:',
+        '\n  *', paths['wheel_path'],
+        '\n  *', paths['meta_path']
+    )
 
+    return dict(path=path, size=size, elapsed=elapsed)
 
-def download_many(env: Environment, package_ids: list) -> dict:
+
+def download_package(env: Environment, package_id: str) -> str:
     """..."""
-    return {pid: download_package(env, pid) for pid in package_ids}
+    data = parse_package_id(env, package_id)
+    return fetch_package(env, data)['path']
+
+
+def download_many(env: Environment, package_ids: list) -> dict:
+    """
+    Downloads the specified packages. All of the package identifiers are
+    resolved against the shared version index first, after which the
+    bundles are downloaded concurrently on a worker pool whose size is set
+    by the jobs argument. The throughput of each download and of all of the
+    downloads combined is reported.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations to
+        download.
+    :return
+        A dictionary mapping each package identifier to the local path of
+        its downloaded bundle.
+    """
+    started = time.time()
+    jobs = max(1, int(env.args.get('jobs') or 1))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        resolved = list(pool.map(
+            lambda pid: parse_package_id(env, pid),
+            package_ids
+        ))
+        with cache.deferred_pruning():
+            results = list(pool.map(
+                lambda data: fetch_package(env, data),
+                resolved
+            ))
+
+    total = sum(result['size'] for result in results)
+    elapsed = time.time() - started
+    output.echo('[TOTAL]: Downloaded {} packages, {} in {:.2f}s ({})'.format(
+        len(results),
+        cache.to_size_label(total),
+        elapsed,
+        cache.to_throughput_label(total, elapsed)
+    ))
+
+    return {pid: r['path'] for pid, r in zip(package_ids, results)}
 
 
 def download_from_configs(env: Environment, configs_path: str = None) -> dict:
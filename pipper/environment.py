@@ -1,12 +1,14 @@
 import os
 import json
+import hashlib
+import time
 import typing
 
-from boto3.session import Session
-from botocore.client import BaseClient
-from botocore.credentials import Credentials
+from pipper import output
 
-from pipper import s3
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from boto3.session import Session
+    from botocore.client import BaseClient
 
 REPOSITORY_CONFIGS_PATH = os.path.join(
     os.path.expanduser('~'),
@@ -14,23 +16,140 @@ REPOSITORY_CONFIGS_PATH = os.path.join(
     'repositories.json'
 )
 
+#: Directory where temporary AWS credentials, such as those of SSO and
+#: assume-role profiles, are cached until shortly before they expire.
+CREDENTIALS_DIRECTORY = os.path.join(
+    os.path.expanduser('~'),
+    '.pipper',
+    'credentials'
+)
+
+#: Number of seconds before their expiry after which cached credentials are
+#: no longer used, which leaves them valid for the rest of the command.
+EXPIRY_MARGIN = int(os.environ.get('PIPPER_CREDENTIALS_EXPIRY_MARGIN') or 900)
+
+#: Upper bound in seconds of the lifetime of temporary credentials, beyond
+#: which credentials are treated as long-lived and are never cached.
+MAX_LIFETIME = 7 * 24 * 3600
+
+#: Names of the S3 client options, which can be set for a repository and
+#: overridden by the command arguments of the same names.
+CLIENT_OPTIONS = [
+    'region',
+    'endpoint_url',
+    'max_pool_connections',
+    'accelerate',
+    'dualstack',
+    'retry_mode',
+    'max_attempts',
+    'connect_timeout',
+    'read_timeout',
+]
+
+#: Environment variables that select or supply credentials, which are part
+#: of the inputs from which cached credentials were resolved.
+CREDENTIAL_VARIABLES = [
+    'PIPPER_AWS_ACCESS_KEY_ID',
+    'PIPPER_AWS_SECRET_ACCESS_KEY',
+    'PIPPER_AWS_SESSION_TOKEN',
+    'AWS_ACCESS_KEY_ID',
+    'AWS_SECRET_ACCESS_KEY',
+    'AWS_SESSION_TOKEN',
+    'AWS_PROFILE',
+    'AWS_DEFAULT_PROFILE',
+    'AWS_CONFIG_FILE',
+    'AWS_SHARED_CREDENTIALS_FILE',
+]
+
 
 class Environment:
 
-    def __init__(self, args: dict = None):
+    def __init__(self, args: dict = None, shared: dict = None):
+        """
+        :param args:
+            Parsed command line arguments of the command invocation.
+        :param shared:
+            State shared by all of the command invocations of a batch, in
+            which the loaded repository configs and the AWS sessions and S3
+            clients created for each set of credential inputs are kept so
+            that they are only created once per batch.
+        """
         self.args = clean_args(args or {})
+        self.shared = shared if shared is not None else {}
 
-        repository = load_repository(self.args.get('repository_name'))
-        default_repository = load_repository(None, True)
-        self.repository = repository or default_repository
+        if 'repositories' not in self.shared:
+            self.shared['repositories'] = load_repositories()
+        configs = self.shared['repositories']
 
-        self.aws_session = get_session(
-            self.args,
-            repository,
-            default_repository
+        repository = load_repository(
+            self.args.get('repository_name'),
+            configs=configs
         )
+        default_repository = load_repository(None, True, configs)
+        self.repository = repository or default_repository
+        self._repositories = (repository, default_repository)
+        self._aws_session = None
+        self._s3_client = None
 
-        self.s3_client = self.aws_session.client('s3')  # type: BaseClient
+    @property
+    def session_key(self) -> str:
+        """
+        Identifies the credential inputs from which the AWS session of the
+        command invocation is created.
+        """
+        return json.dumps([
+            self.args.get('aws_profile'),
+            self.args.get('aws_credentials') or [],
+            self._repositories
+        ], sort_keys=True)
+
+    @property
+    def aws_session(self) -> 'Session':
+        """
+        The AWS session for the command invocation, which is created on
+        first use so that actions that do not access S3 never load boto3.
+        """
+        if self._aws_session is None:
+            sessions = self.shared.setdefault('sessions', {})
+            key = self.session_key
+            if key not in sessions:
+                sessions[key] = get_session(self.args, *self._repositories)
+            self._aws_session = sessions[key]
+        return self._aws_session
+
+    @property
+    def client_options(self) -> dict:
+        """
+        The S3 client options for the command invocation, where options
+        that are not specified as command arguments are taken from the
+        repository configuration.
+        """
+        return {
+            name: (
+                self.args[name]
+                if self.args.get(name) is not None else
+                self.repository.get(name)
+            )
+            for name in CLIENT_OPTIONS
+        }
+
+    @property
+    def s3_client(self) -> 'BaseClient':
+        """The S3 client for the command invocation, created on first use."""
+        if self._s3_client is None:
+            from pipper import s3
+
+            clients = self.shared.setdefault('s3_clients', {})
+            options = self.client_options
+            key = json.dumps([self.session_key, options], sort_keys=True)
+            if key not in clients:
+                clients[key] = s3.create_client(self.aws_session, **options)
+            self._s3_client = clients[key]
+        return self._s3_client
+
+    @s3_client.setter
+    def s3_client(self, value: 'BaseClient'):
+        self._s3_client = value
 
     @property
     def quiet(self) -> bool:
@@ -90,10 +209,11 @@ def save_repositories(config_data: dict) -> dict:
 
 def load_repository(
         repository_name: typing.Union[str, None],
-        allow_default: bool = False
+        allow_default: bool = False,
+        configs: dict = None
 ) -> dict:
     """ """
-    results = load_repositories()
+    results = configs if configs is not None else load_repositories()
 
     try:
         return results['repositories'][repository_name]
@@ -121,15 +241,157 @@ def load_configs(configs_path: str = None):
         return json.load(f)
 
 
+def get_credentials_path(
+        args: dict,
+        repository: dict,
+        default_repository: dict
+) -> str:
+    """
+    Returns the path of the cached credentials for the credential inputs,
+    which are the credential arguments of the command, the repositories and
+    the credential environment variables.
+    """
+    inputs = json.dumps([
+        args.get('aws_profile'),
+        args.get('aws_credentials') or [],
+        repository,
+        default_repository,
+        [os.environ.get(name) for name in CREDENTIAL_VARIABLES]
+    ], sort_keys=True)
+    return os.path.join(
+        CREDENTIALS_DIRECTORY,
+        '{}.json'.format(hashlib.sha256(inputs.encode()).hexdigest())
+    )
+
+
+def read_cached_credentials(path: str) -> typing.Union[dict, None]:
+    """
+    Returns the cached credentials at the specified path unless they are
+    missing, unreadable or expire within the expiry margin.
+    """
+    try:
+        with open(path, 'r') as f:
+            cached = json.load(f)
+    except Exception:
+        return None
+
+    if cached.get('expiry', 0) - time.time() <= EXPIRY_MARGIN:
+        return None
+    return cached
+
+
+def get_lifetime(credentials) -> typing.Union[int, None]:
+    """
+    Returns the number of seconds until the resolved credentials expire, or
+    `None` if they do not expire. The lifetime is found with a binary search
+    on the public `refresh_needed` check of refreshable credentials, which
+    is whether or not they expire within a number of seconds.
+    """
+    refresh_needed = getattr(credentials, 'refresh_needed', None)
+    if refresh_needed is None or not refresh_needed(MAX_LIFETIME):
+        return None
+
+    low, high = 0, MAX_LIFETIME
+    while low < high:
+        middle = (low + high + 1) // 2
+        if refresh_needed(middle):
+            high = middle - 1
+        else:
+            low = middle
+    return low
+
+
+def write_cached_credentials(
+        path: str,
+        session: 'Session'
+) -> typing.Union[dict, None]:
+    """
+    Caches the resolved credentials of the session if they are temporary.
+    Long-lived credentials are never written to disk. The cache file is
+    only readable by the current user.
+    """
+    credentials = session.get_credentials()
+    if credentials is None:
+        return None
+
+    # Deferred credentials, such as those of SSO and assume-role profiles,
+    # only know their expiry once they have been resolved.
+    frozen = credentials.get_frozen_credentials()
+    lifetime = get_lifetime(credentials)
+    if lifetime is None:
+        return None
+
+    cached = dict(
+        access_key=frozen.access_key,
+        secret_key=frozen.secret_key,
+        token=frozen.token,
+        expiry=time.time() + lifetime,
+        region=session.region_name,
+        profile=session.profile_name,
+        method=getattr(credentials, 'method', None)
+    )
+
+    os.makedirs(CREDENTIALS_DIRECTORY, mode=0o700, exist_ok=True)
+    temp_path = '{}.{}.partial'.format(path, os.getpid())
+    handle = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(handle, 'w') as f:
+        json.dump(cached, f)
+    os.replace(temp_path, path)
+    return cached
+
+
+def print_credentials(session: 'Session', method: str = None):
+    """Prints the loaded credentials of the session in redacted form."""
+    credentials = session.get_credentials()
+
+    access_key = getattr(credentials, 'access_key', None)
+    secret = getattr(credentials, 'secret_key', 'NONE')[:8]
+    token = getattr(credentials, 'token', None)
+
+    output.echo('\n[LOADED]: AWS Credentials')
+    output.echo('    PROFILE: {}'.format(session.profile_name))
+    output.echo('    ACCESS: {}'.format(access_key))
+    output.echo('    SECRET: {}...'.format(secret))
+    output.echo('     TOKEN: {}{}'.format(
+        token[:12] if token else 'NONE',
+        '...' if token else ''
+    ))
+    output.echo('    METHOD: {}'.format(
+        method or getattr(credentials, 'method', 'NONE')
+    ))
+
+
 def get_session(
         args: dict,
         repository: dict,
         default_repository: dict
-) -> Session:
+) -> 'Session':
     """
     Creates an S3 session using AWS credentials, which can be specified in a 
-    myriad of potential ways.
+    myriad of potential ways. Temporary credentials are cached on disk, so
+    that later invocations with the same credential inputs reuse them until
+    they expire instead of resolving them again.
     """
+    from boto3.session import Session
+    from pipper import s3
+
+    credentials_path = get_credentials_path(
+        args,
+        repository,
+        default_repository
+    )
+    cached = read_cached_credentials(credentials_path)
+    if cached:
+        session = Session(
+            aws_access_key_id=cached['access_key'],
+            aws_secret_access_key=cached['secret_key'],
+            aws_session_token=cached['token'],
+            region_name=cached['region']
+        )
+        if not args.get('quiet'):
+            print_credentials(session, 'cached {}'.format(cached['method']))
+        return session
+
     aws_profile = args.get('aws_profile')
     command_credentials = args.get('aws_credentials') or []
 
@@ -171,20 +433,15 @@ def get_session(
         yield Session()
 
     session = next(s for s in generate_session() if s is not None)
-    credentials: Credentials = session.get_credentials()
 
-    access_key = getattr(credentials, 'access_key', None)
-    secret = getattr(credentials, 'secret_key', 'NONE')[:8]
-    token = getattr(credentials, 'token', None)
+    try:
+        write_cached_credentials(credentials_path, session)
+    except Exception as error:
+        output.echo(
+            '[WARNING]: Unable to cache AWS credentials. {}'.format(error)
+        )
 
-    print('\n[LOADED]: AWS Credentials')
-    print('    PROFILE: {}'.format(session.profile_name))
-    print('    ACCESS: {}'.format(access_key))
-    print('    SECRET: {}...'.format(secret))
-    print('     TOKEN: {}{}'.format(
-        token[:12] if token else 'NONE',
-        '...' if token else ''
-    ))
-    print('    METHOD: {}'.format(getattr(credentials, 'method', 'NONE')))
+    if not args.get('quiet'):
+        print_credentials(session)
 
     return session
@@ -4,6 +4,7 @@ import functools
 
 import semver
 
+from pipper import output
 from pipper import wrapper
 from pipper import versioning
 from pipper.environment import Environment
@@ -26,57 +27,101 @@ def get_package_metadata(
     return {key: value for key, value in response['Metadata'].items()}
 
 
-def print_local_only(package_name: str):
-    """ """
-    print('[PACKAGE]: {}'.format(package_name))
-
+def get_info(
+        env: Environment,
+        package_name: str,
+        local_only: bool = False
+) -> dict:
+    """
+    Returns information about the installed and the latest remote versions
+    of the specified package.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_name:
+        Name of the package about which to retrieve information.
+    :param local_only:
+        Whether or not to skip looking up the remote versions.
+    :return
+        A dictionary with the package `name`, the `installed` version or
+        `None`, the `latest` remote version entry or `None`, and the
+        `status` of the installed version, which is one of `missing`,
+        `behind`, `ahead` or `current`. Without the remote versions, the
+        status is `installed` instead of whether or not it is current.
+    """
     local_data = wrapper.status(package_name)
-    if local_data is None:
-        print('[MISSING]: The package is not installed locally')
-        return
-
-    print('[EXISTS]: Installed version is {}'.format(
-        package_name,
-        local_data.version
-    ))
-
+    installed = local_data.version if local_data else None
+    result = dict(
+        name=package_name,
+        installed=installed,
+        latest=None,
+        status='missing' if installed is None else 'installed'
+    )
+    if local_only:
+        return result
 
-def print_with_remote(env: Environment, package_name: str):
-    """ """
     remote_versions = versioning.list_versions(env, package_name)
-
-    try:
-        latest = get_package_metadata(
+    if remote_versions:
+        result['latest'] = versioning.index.get_entry(
+            env,
+            package_name,
+            remote_versions[-1].key
+        ) or get_package_metadata(
             env,
             package_name,
             remote_versions[-1].version
         )
-    except IndexError:
-        latest = dict(
-            version='None',
-            timestamp='Never'
-        )
 
-    local_data = wrapper.status(package_name)
-    comparison = (
-        0
-        if local_data is None else
-        semver.compare(local_data.version, latest['version'])
+    if installed is None or result['latest'] is None:
+        return result
+
+    comparison = semver.compare(installed, result['latest']['version'])
+    result['status'] = (
+        'behind' if comparison < 0 else
+        'ahead' if comparison > 0 else
+        'current'
     )
+    return result
+
+
+def print_local_only(env: Environment, package_name: str) -> dict:
+    """ """
+    info = get_info(env, package_name, local_only=True)
+    output.echo('[PACKAGE]: {}'.format(package_name))
+
+    if info['installed'] is None:
+        output.echo('[MISSING]: The package is not installed locally')
+        return info
 
-    if local_data is None:
+    output.echo('[EXISTS]: Installed version is {}'.format(info['installed']))
+    return info
+
+
+def print_with_remote(env: Environment, package_name: str) -> dict:
+    """ """
+    info = get_info(env, package_name)
+    latest = info['latest'] or dict(
+        version='None',
+        timestamp='Never'
+    )
+
+    if info['status'] == 'missing':
         message = '[MISSING]: The package is not installed locally'
-    elif comparison < 0:
+    elif info['status'] == 'behind':
         message = '[BEHIND]: local {} version is older than {}'.format(
-            local_data.version,
+            info['installed'],
             latest['version']
         )
-    elif comparison > 0:
+    elif info['status'] == 'installed':
+        message = '[EXISTS]: Installed version {} is not published'.format(
+            info['installed']
+        )
+    elif info['status'] == 'ahead':
         message = '[AHEAD]: Local version is newer than the released version'
     else:
         message = '[CURRENT]: The most recent version is already installed'
 
-    print(textwrap.dedent(
+    output.echo(textwrap.dedent(
         """
         [PACKAGE]: {name}
         
@@ -91,6 +136,7 @@ def print_with_remote(env: Environment, package_name: str):
             message=message
         )
     ))
+    return info
 
 
 def run(env: Environment):
@@ -99,6 +145,6 @@ def run(env: Environment):
     package_name = env.args.get('package_name')
 
     if local_only:
-        return print_local_only(package_name)
+        return print_local_only(env, package_name)
     return print_with_remote(env, package_name)
 
@@ -1,40 +1,55 @@
+import collections
 import os
 import shutil
+import subprocess
 import tempfile
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
+from pipper import cache
 from pipper import downloader
 from pipper import environment
+from pipper import locker
+from pipper import output
+from pipper import publisher
 from pipper import s3
+from pipper import versioning
 from pipper import wrapper
 from pipper.environment import Environment
 
+#: Minimum number of locked bundles that are downloaded concurrently when
+#: installing from a lock file, where no resolution is needed beforehand.
+LOCKED_DOWNLOAD_JOBS = 4
+
 
 def install_pipper_file(
-        local_source_path: str,
+        local_source_path: typing.Union[str, typing.BinaryIO],
         to_user: bool = False,
-        target_directory: str = None
+        target_directory: str = None,
+        use_store: bool = False
 ) -> dict:
     """
     Installs the specified local pipper bundle file.
     
     :param local_source_path:
-        An absolute path to the pipper bundle file to install
+        An absolute path to the pipper bundle file to install, or a readable
+        and seekable file object containing the bundle. Only the wheel is
+        extracted from the bundle before it is installed.
     :param to_user:
         Whether or not to install the package for the user or not. If not a
         user package, the package will be installed globally.
     :param target_directory:
         Alternate installation location if specified.
+    :param use_store:
+        Whether or not to extract the wheel into the local wheel store, where
+        it is only extracted once for all bundles containing the same wheel.
     :return
         The package metadata from the pipper bundle
     """
     directory = tempfile.mkdtemp(prefix='pipper-install-')
 
     try:
-        extracted = downloader.extract_pipper_file(
-            local_source_path,
-            directory
-        )
+        extracted = extract_wheel(local_source_path, directory, use_store)
         wrapper.install_wheel(
             wheel_path=extracted['wheel_path'],
             to_user=to_user,
@@ -47,6 +62,20 @@ def install_pipper_file(
         shutil.rmtree(directory)
 
 
+def extract_wheel(
+        source: typing.Union[str, typing.BinaryIO],
+        directory: str,
+        use_store: bool = False
+) -> dict:
+    """
+    Extracts and verifies the wheel from the pipper bundle. If the wheel
+    store is used and the bundle metadata includes the wheel digest, the
+    wheel is taken from the local wheel store instead of the directory.
+    """
+    stored = downloader.extract_to_store(source) if use_store else None
+    return stored or downloader.extract_wheel(source, directory)
+
+
 def install_dependencies(env: Environment, dependencies: typing.List[str]):
     """
     
@@ -58,23 +87,32 @@ def install_dependencies(env: Environment, dependencies: typing.List[str]):
         (NAME:VERSION) combination, but this version information is ignored for
         dependencies.
     """
+    target_directory = env.args.get('target_directory')
+
     def do_install(package_name: str):
         try:
             data = downloader.parse_package_id(env, package_name)
-            existing = wrapper.status(data['name'])
+            existing = wrapper.status(data['name'], target_directory)
         except Exception:
-            existing = wrapper.status(package_name)
+            existing = wrapper.status(package_name, target_directory)
         return install(env, package_name) if not existing else None
 
     for name in dependencies:
         do_install(name)
 
 
-def install(env: Environment, package_id: str):
+def resolve_install(
+        env: Environment,
+        package_id: str
+) -> typing.Union[dict, None]:
     """
-    Installs the specified pipper package, which is specified by either a
-    url or a path to a wheel file.
-    
+    Resolves the specified package identifier into the remote package data
+    that should be installed for it. If the package does not need to be
+    installed, because it is already installed at the requested version or
+    the remote version does not exist, a `None` value is returned instead.
+    If the fail missing argument is set, a remote version that does not
+    exist raises a ValueError instead.
+
     :param env:
         Command environment in which this function is being executed
     :param package_id:
@@ -82,69 +120,543 @@ def install(env: Environment, package_id: str):
         name, or a package name and version (NAME:VERSION) combination.
     """
     upgrade = env.args.get('upgrade')
+    target_directory = env.args.get('target_directory')
     data = downloader.parse_package_id(env, package_id)
     is_url = 'url' in data
+    existing = wrapper.status(data['name'], target_directory)
 
-    if not upgrade and not data['version'] and wrapper.status(data['name']):
-        print((
+    if not upgrade and not data['version'] and existing:
+        output.echo((
             '[SKIPPED]: "{}" already installed. '
             'Use the upgrade flag or specify a version if you want to '
             'change the installed version.'
         ).format(data['name']))
-        return
+        return None
 
-    if not wrapper.update_required(data['name'], data['version']):
-        print('[SKIPPED]: "{}" already installed at version {}'.format(
+    if not wrapper.update_required(
+            data['name'],
+            data['version'],
+            target_directory
+    ):
+        output.echo('[SKIPPED]: "{}" already installed at version {}'.format(
             data['name'],
             data['version']
         ))
-        return
+        return None
 
     remote_version_exists = (
         is_url
+        or (use_cache(env) and cache.is_fresh(data['bucket'], data['key']))
+        or versioning.index.contains(env, data['name'], data['key'])
         or s3.key_exists(env.s3_client, data['bucket'], data['key'])
     )
 
     if not remote_version_exists:
-        print('[ERROR]: Version {} not available for {} package'.format(
+        message = 'Version {} not available for {} package'.format(
             data['version'],
             data['name']
+        )
+        if env.args.get('fail_missing'):
+            raise ValueError(message)
+        output.echo('[ERROR]: {}'.format(message))
+        return None
+
+    return data
+
+
+def use_cache(env: Environment) -> bool:
+    """Whether or not the local bundle cache should be used."""
+    return not env.args.get('no_cache')
+
+
+def fetch_bundle(env: Environment, data: dict, path: str) -> str:
+    """
+    Downloads the remote pipper bundle described by the resolved package
+    data to the specified local path. If the local bundle cache is enabled,
+    the path of the cached bundle is returned instead and nothing is written
+    to the specified path.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param data:
+        Resolved package data as returned by the `resolve_install` function.
+    :param path:
+        Local file path where the downloaded bundle will be saved.
+    :return
+        The local path where the bundle was saved.
+    """
+    if 'url' in data:
+        downloader.save(data['url'], path)
+    elif use_cache(env):
+        return cache.fetch_bundle(env.s3_client, data['bucket'], data['key'])
+    else:
+        s3.download_file(env.s3_client, data['bucket'], data['key'], path)
+
+    return path
+
+
+def install(env: Environment, package_id: str):
+    """
+    Installs the specified pipper package, which is specified by either a
+    url or a path to a wheel file. The remote bundle is streamed into memory
+    instead of being saved to disk so that only its wheel is written to
+    disk before installation.
+    
+    :param env:
+        Command environment in which this function is being executed
+    :param package_id:
+        Identifier for the package to be loaded. This can be either a package
+        name, or a package name and version (NAME:VERSION) combination.
+    """
+    data = resolve_install(env, package_id)
+    if data is None:
+        return
+
+    with downloader.open_bundle(env, data) as source:
+        metadata = install_pipper_file(
+            local_source_path=source,
+            to_user=env.args.get('pip_user'),
+            target_directory=env.args.get('target_directory'),
+            use_store=use_cache(env)
+        )
+
+    dependencies = metadata.get('dependencies') or []
+    install_dependencies(env, dependencies)
+
+
+def fetch_node(
+        env: Environment,
+        directory: str,
+        package_id: str,
+        is_dependency: bool = False
+) -> typing.Union[dict, None]:
+    """
+    Resolves and downloads a single node of the dependency graph. Dependency
+    nodes are skipped if they are already installed, which mirrors the
+    behavior of the `install_dependencies` function.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param directory:
+        Directory where the downloaded bundle will be saved.
+    :param package_id:
+        Identifier for the package to be resolved and downloaded.
+    :param is_dependency:
+        Whether or not the package was discovered as a dependency of another
+        package in the graph instead of being requested directly.
+    :return
+        A dictionary containing the resolved package data along with the
+        local bundle path, its metadata and its dependencies, or `None` if
+        the package does not need to be installed.
+    """
+    if is_dependency:
+        target_directory = env.args.get('target_directory')
+        try:
+            data = downloader.parse_package_id(env, package_id)
+            existing = wrapper.status(data['name'], target_directory)
+        except Exception:
+            existing = wrapper.status(package_id, target_directory)
+
+        if existing:
+            return None
+
+    data = resolve_install(env, package_id)
+    if data is None:
+        return None
+
+    path = fetch_bundle(env, data, os.path.join(
+        directory,
+        '{}-{}.pipper'.format(data['name'], data['version'])
+    ))
+    metadata = publisher.read_metadata(path)
+    output.echo('[DOWNLOADED]: {} -> {}'.format(data['name'], path))
+
+    return dict(
+        data,
+        package_id=package_id,
+        path=path,
+        metadata=metadata,
+        dependencies=metadata.get('dependencies') or []
+    )
+
+
+def resolve_graph(
+        env: Environment,
+        package_ids: typing.List[str],
+        directory: str,
+        jobs: int = 1
+) -> typing.List[dict]:
+    """
+    Resolves the complete dependency graph for the specified package
+    identifiers. Each level of the graph is resolved and downloaded
+    concurrently on a bounded worker pool before the dependencies of that
+    level are discovered from the downloaded bundle metadata.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations
+        that form the roots of the dependency graph.
+    :param directory:
+        Directory where the downloaded bundles will be saved.
+    :param jobs:
+        Maximum number of concurrent resolutions and downloads.
+    :return
+        A list of the graph nodes that need to be installed in the order in
+        which they were discovered.
+    """
+    nodes = collections.OrderedDict()
+    seen = set()
+    frontier = [(package_id, False) for package_id in package_ids]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while frontier:
+            entries = []
+            for package_id, is_dependency in frontier:
+                if package_id not in seen:
+                    seen.add(package_id)
+                    entries.append((package_id, is_dependency))
+
+            results = pool.map(
+                lambda entry: fetch_node(env, directory, *entry),
+                entries
+            )
+
+            frontier = []
+            for node in results:
+                if node is None or node['name'] in nodes:
+                    continue
+                nodes[node['name']] = node
+                frontier.extend((d, True) for d in node['dependencies'])
+
+    return list(nodes.values())
+
+
+def to_install_levels(nodes: typing.List[dict]) -> typing.List[list]:
+    """
+    Sorts the resolved graph nodes topologically into levels, where every
+    node in a level only depends on nodes in previous levels. Dependency
+    cycles are broken by installing the earliest discovered node of the
+    cycle first.
+
+    :param nodes:
+        Resolved graph nodes as returned by the `resolve_graph` function.
+    """
+    names = {node['name'] for node in nodes}
+    aliases = {node['package_id']: node['name'] for node in nodes}
+
+    def to_name(package_id: str) -> str:
+        return aliases.get(package_id) or package_id.split(':')[0]
+
+    requires = {
+        node['name']: (
+            {to_name(d) for d in node['dependencies']} & names
+        ) - {node['name']}
+        for node in nodes
+    }
+
+    levels = []
+    installed = set()
+    remaining = list(nodes)
+    while remaining:
+        ready = [n for n in remaining if requires[n['name']] <= installed]
+        ready = ready or remaining[:1]
+        levels.append(ready)
+        installed.update(n['name'] for n in ready)
+        remaining = [n for n in remaining if n['name'] not in installed]
+
+    return levels
+
+
+def install_nodes(env: Environment, nodes: typing.List[dict]):
+    """
+    Installs the downloaded bundles of the resolved graph nodes in
+    topological order. The packages are installed one at a time, because
+    concurrent pip invocations in the same environment race to write the
+    files of the dependencies that the packages share.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param nodes:
+        Graph nodes with the local `path` of each downloaded bundle.
+    """
+    for level in to_install_levels(nodes):
+        output.echo('[INSTALLING]: {}'.format(
+            ', '.join(node['name'] for node in level)
         ))
+        for node in level:
+            install_pipper_file(
+                local_source_path=node['path'],
+                to_user=env.args.get('pip_user'),
+                target_directory=env.args.get('target_directory'),
+                use_store=use_cache(env)
+            )
+
+
+def install_graph(
+        env: Environment,
+        package_ids: typing.List[str],
+        jobs: int
+):
+    """
+    Installs a list of package identifiers and all of their dependencies by
+    first resolving and downloading the complete dependency graph and then
+    installing the downloaded bundles one at a time in topological order.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations to
+        install
+    :param jobs:
+        Maximum number of concurrent downloads.
+    """
+    directory = tempfile.mkdtemp(prefix='pipper-download-')
+
+    try:
+        nodes = resolve_graph(env, package_ids, directory, jobs)
+        install_nodes(env, nodes)
+    finally:
+        shutil.rmtree(directory)
+
+
+def install_nodes_batch(
+        env: Environment,
+        nodes: typing.List[dict],
+        directory: str,
+        pypi_packages: typing.List[str] = None
+):
+    """
+    Installs the downloaded bundles of the resolved graph nodes and any
+    additional pypi packages with a single pip invocation. If the batched
+    pip invocation fails, each package is installed individually instead,
+    with pipper packages installed in dependency order.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param nodes:
+        Graph nodes with the local `path` of each downloaded bundle.
+    :param directory:
+        Directory where the wheels of the bundles will be extracted.
+    :param pypi_packages:
+        A list of pypi requirement specifiers to install alongside the
+        pipper packages.
+    """
+    to_user = env.args.get('pip_user')
+    target_directory = env.args.get('target_directory')
+    pypi_packages = pypi_packages or []
+
+    wheel_paths = [
+        extract_wheel(
+            node['path'],
+            directory,
+            use_cache(env)
+        )['wheel_path']
+        for level in to_install_levels(nodes)
+        for node in level
+    ]
+
+    try:
+        wrapper.install_requirements(
+            requirements=pypi_packages + wheel_paths,
+            to_user=to_user,
+            target_directory=target_directory
+        )
         return
+    except subprocess.CalledProcessError:
+        output.echo('[FALLBACK]: Batched install failed. Installing packages '
+              'individually instead.')
+
+    for package in pypi_packages:
+        wrapper.install_pypi(
+            package_name=package,
+            to_user=to_user,
+            target_directory=target_directory
+        )
+
+    for wheel_path in wheel_paths:
+        wrapper.install_wheel(
+            wheel_path=wheel_path,
+            to_user=to_user,
+            target_directory=target_directory
+        )
+
+
+def install_batch(
+        env: Environment,
+        package_ids: typing.List[str],
+        pypi_packages: typing.List[str] = None
+):
+    """
+    Installs a list of package identifiers, all of their dependencies and
+    any additional pypi packages with a single pip invocation. The complete
+    dependency graph is resolved and extracted first.
 
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations to
+        install
+    :param pypi_packages:
+        A list of pypi requirement specifiers to install alongside the
+        pipper packages.
+    """
+    jobs = int(env.args.get('jobs') or 1)
     directory = tempfile.mkdtemp(prefix='pipper-download-')
-    path = os.path.join(directory, 'package.pipper')
 
-    if is_url:
-        downloader.save(package_id, path)
+    try:
+        nodes = resolve_graph(env, package_ids, directory, jobs)
+        install_nodes_batch(env, nodes, directory, pypi_packages)
+    finally:
+        shutil.rmtree(directory)
+
+
+def fetch_locked(env: Environment, entry: dict, directory: str) -> dict:
+    """
+    Downloads the bundle of a lock file entry without resolving any
+    versions. Bundles downloaded from S3 must still have the ETag that was
+    recorded in the lock and every bundle is verified against the digests
+    recorded in the lock, which guarantees that every machine installs the
+    same bundle.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param entry:
+        Package entry of the lock file.
+    :param directory:
+        Directory where the downloaded bundle will be saved.
+    :return
+        A graph node for the entry with the local `path` of its bundle.
+    """
+    path = os.path.join(
+        directory,
+        '{}-{}.pipper'.format(entry['name'], entry['version'])
+    )
+    etag = entry.get('etag')
+
+    if entry.get('url'):
+        downloader.save(entry['url'], path)
+    elif use_cache(env):
+        path = cache.fetch_bundle(env.s3_client, entry['bucket'], entry['key'])
+        cached = cache.get_entry(entry['bucket'], entry['key']) or {}
+        if etag and cached.get('etag') != etag:
+            raise ValueError(
+                'Bundle "{}" has changed since it was locked'.format(
+                    entry['key']
+                )
+            )
     else:
-        env.s3_client.download_file(
-            Bucket=data['bucket'],
-            Key=data['key'],
-            Filename=path
+        s3.download_file(
+            env.s3_client,
+            entry['bucket'],
+            entry['key'],
+            path,
+            etag=etag
         )
 
-    print('DOWNLOAD PATH:', os.path.exists(path), path)
+    verify_locked(entry, path)
+    output.echo('[DOWNLOADED]: {} -> {}'.format(entry['name'], path))
+    return dict(entry, package_id=entry['name'], path=path)
 
-    try:
-        metadata = install_pipper_file(
-            local_source_path=path,
-            to_user=env.args.get('pip_user'),
-            target_directory=env.args.get('target_directory')
+
+def verify_locked(entry: dict, path: str):
+    """
+    Verifies the downloaded bundle against the bundle and wheel digests
+    recorded in its lock file entry. The wheel itself is verified against
+    the wheel digest of the bundle metadata when it is extracted, so the
+    bundle metadata must record the locked wheel digest.
+
+    :param entry:
+        Package entry of the lock file.
+    :param path:
+        Local path of the downloaded bundle.
+    """
+    sha256 = entry.get('sha256')
+    if sha256 and publisher.hash_file(path) != sha256:
+        raise ValueError(
+            'Bundle "{}" does not match the locked digest {}'.format(
+                entry['key'],
+                sha256
+            )
         )
-    except Exception:
-        raise
+
+    wheel_sha256 = entry.get('wheel_sha256')
+    metadata = publisher.read_metadata(path) if wheel_sha256 else {}
+    if wheel_sha256 and metadata.get('wheel_sha256') != wheel_sha256:
+        raise ValueError(
+            'Wheel of bundle "{}" does not match the locked digest {}'.format(
+                entry['key'],
+                wheel_sha256
+            )
+        )
+
+
+def install_locked(
+        env: Environment,
+        lock_path: str,
+        dependencies: typing.List[str] = None,
+        pypi_packages: typing.List[str] = None
+):
+    """
+    Installs the packages recorded in a lock file. No versions are listed
+    or resolved. Every locked package that is not already installed at its
+    locked version is downloaded concurrently from its recorded key and the
+    downloaded bundles are then installed in dependency order.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param lock_path:
+        Path of the lock file created by the lock command.
+    :param dependencies:
+        Dependencies of the pipper configs file, which must match the
+        dependencies from which the lock file was created.
+    :param pypi_packages:
+        A list of pypi requirement specifiers to install alongside the
+        pipper packages when the batch argument is set.
+    """
+    lock = locker.load(lock_path)
+    if dependencies is not None and dependencies != lock['dependencies']:
+        raise ValueError(
+            'Lock file "{}" is out of date. Run "pipper lock" to update '
+            'it.'.format(lock_path)
+        )
+
+    target_directory = env.args.get('target_directory')
+    entries = [
+        entry for entry in lock['packages'].values()
+        if wrapper.update_required(
+            entry['name'],
+            entry['version'],
+            target_directory
+        )
+    ]
+    jobs = int(env.args.get('jobs') or 1)
+    directory = tempfile.mkdtemp(prefix='pipper-download-')
+
+    try:
+        with ThreadPoolExecutor(
+                max_workers=max(jobs, LOCKED_DOWNLOAD_JOBS)
+        ) as pool:
+            nodes = list(pool.map(
+                lambda entry: fetch_locked(env, entry, directory),
+                entries
+            ))
+
+        if env.args.get('batch'):
+            install_nodes_batch(env, nodes, directory, pypi_packages)
+        else:
+            install_nodes(env, nodes)
     finally:
         shutil.rmtree(directory)
 
-    dependencies = metadata.get('dependencies') or []
-    install_dependencies(env, dependencies)
-
 
 def install_many(env: Environment, package_ids: typing.List[str]):
     """
     Installs a list of package identifiers, which can be either package names
-    or package name and version combinations.
+    or package name and version combinations. If the jobs argument is greater
+    than one, the complete dependency graph is resolved up front and the
+    packages are downloaded and installed concurrently. If the batch argument
+    is set, all packages are installed with a single pip invocation instead.
     
     :param env:
         Command environment in which this function is being executed
@@ -152,8 +664,16 @@ def install_many(env: Environment, package_ids: typing.List[str]):
         A list of package names or package name and version combinations to
         install
     """
-    for package_id in (package_ids or []):
-        install(env, package_id)
+    with cache.deferred_pruning():
+        if env.args.get('batch'):
+            return install_batch(env, package_ids or [])
+
+        jobs = int(env.args.get('jobs') or 1)
+        if jobs > 1:
+            return install_graph(env, package_ids or [], jobs)
+
+        for package_id in (package_ids or []):
+            install(env, package_id)
 
 
 def install_from_configs(env: Environment, configs_path: str = None):
@@ -161,7 +681,10 @@ def install_from_configs(env: Environment, configs_path: str = None):
     Installs pipper dependencies specified in a pipper configs file. If the
     path to the configs file is not specified, the default path will be used
     instead. The default location is a pipper.json file in the current
-    working directory.
+    working directory. If the batch argument is set, the pypi packages are
+    installed in the same pip invocation as the pipper packages. If the
+    locked argument is set, the pipper packages are installed from the lock
+    file next to the configs file instead of being resolved.
     
     :param env:
         Command environment in which this function is being executed
@@ -172,9 +695,11 @@ def install_from_configs(env: Environment, configs_path: str = None):
     to_user = env.args.get('pip_user')
     target_directory = env.args.get('target_directory')
     configs = environment.load_configs(configs_path)
+    batch = env.args.get('batch')
+    pypi_packages = configs.get('pypi') or []
 
-    for package in configs.get('pypi', []):
-        print('\n=== PYPI {} ==='.format(package))
+    for package in ([] if batch else pypi_packages):
+        output.echo('\n=== PYPI {} ==='.format(package))
         wrapper.install_pypi(
             package_name=package,
             to_user=to_user,
@@ -182,14 +707,31 @@ def install_from_configs(env: Environment, configs_path: str = None):
         )
 
     for package in configs.get('conda', []):
-        print('\n=== CONDA {} ==='.format(package))
+        output.echo('\n=== CONDA {} ==='.format(package))
         wrapper.install_conda(
             package=package,
             to_user=to_user,
             target_directory=target_directory
         )
 
-    return install_many(env, configs.get('dependencies'))
+    with cache.deferred_pruning():
+        if env.args.get('locked'):
+            return install_locked(
+                env,
+                env.args.get('lock_path')
+                or locker.get_lock_path(configs_path),
+                configs.get('dependencies') or [],
+                pypi_packages
+            )
+
+        if batch:
+            return install_batch(
+                env,
+                configs.get('dependencies') or [],
+                pypi_packages
+            )
+
+        return install_many(env, configs.get('dependencies'))
 
 
 def run(env: Environment):
@@ -205,6 +747,11 @@ def run(env: Environment):
         Command environment in which this function is being executed
     """
     packages = env.args.get('packages')
+    if packages and env.args.get('locked'):
+        raise ValueError(
+            'Locked installs only install the packages in the lock file'
+        )
+
     if packages:
         return install_many(env, packages)
 
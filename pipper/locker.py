@@ -0,0 +1,230 @@
+import json
+import os
+import typing
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from pipper import downloader
+from pipper import environment
+from pipper import output
+from pipper import versioning
+from pipper.environment import Environment
+from pipper.versioning import manifest
+
+LOCK_FILENAME = 'pipper.lock'
+
+#: Version of the lock file format, which is increased whenever the format
+#: changes in a way that older pipper versions cannot read.
+LOCK_VERSION = 1
+
+
+def get_lock_path(configs_path: str = None) -> str:
+    """
+    Returns the path of the lock file that belongs to the specified pipper
+    configs file, which is stored alongside it. If no configs path is
+    specified, the lock file in the current working directory is used.
+    """
+    directory = os.path.dirname(os.path.realpath(
+        configs_path or os.path.join(os.curdir, 'pipper.json')
+    ))
+    return os.path.join(directory, LOCK_FILENAME)
+
+
+def load(lock_path: str) -> dict:
+    """Loads the lock file at the specified path."""
+    if not os.path.exists(lock_path):
+        raise FileNotFoundError(
+            'Missing lock file "{}". Run "pipper lock" to create it.'.format(
+                lock_path
+            )
+        )
+
+    with open(lock_path, 'r') as f:
+        lock = json.load(f)
+
+    if lock.get('lock_version', 0) > LOCK_VERSION:
+        raise ValueError(
+            'Lock file "{}" requires a newer version of pipper'.format(
+                lock_path
+            )
+        )
+    return lock
+
+
+def save(lock_path: str, lock: dict) -> dict:
+    """
+    Writes the lock file to the specified path with sorted keys so that
+    locking unchanged dependencies produces an identical file.
+    """
+    with open(lock_path, 'w') as f:
+        json.dump(lock, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return lock
+
+
+def read_remote_entry(env: Environment, data: dict) -> dict:
+    """
+    Returns the manifest entry of the resolved remote bundle. The entry is
+    read from the cached package manifest when it includes the dependencies
+    and the wheel digest, and from the metadata stored with the object
+    otherwise. Bundles published without that metadata, and bundles
+    specified by URL, are opened to read their package metadata instead.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param data:
+        Package data as returned by the `parse_package_id` function.
+    """
+    entry = None
+    if 'url' not in data:
+        entry = versioning.index.get_entry(env, data['name'], data['key'])
+        is_complete = (
+            entry
+            and entry.get('dependencies') is not None
+            and entry.get('wheel_sha256')
+        )
+        if not is_complete:
+            entry = manifest.from_head(
+                env.s3_client,
+                data['bucket'],
+                data['key']
+            )
+
+    if entry and entry.get('dependencies') is not None:
+        return entry
+
+    with downloader.open_bundle(env, data) as source:
+        with zipfile.ZipFile(source, 'r') as zipper:
+            metadata = downloader.read_bundle_metadata(zipper)
+
+    return dict(
+        entry or {},
+        dependencies=metadata.get('dependencies') or [],
+        wheel_sha256=metadata.get('wheel_sha256')
+    )
+
+
+def lock_package(env: Environment, package_id: str) -> dict:
+    """
+    Resolves the package identifier to the latest matching remote version
+    and returns its lock entry. Locally installed versions are ignored so
+    that the lock does not depend on the machine where it was created.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_id:
+        Identifier for the package to be locked. This can be either a
+        package name, or a package name and version (NAME:VERSION)
+        combination.
+    """
+    data = downloader.parse_package_id(
+        env,
+        package_id,
+        use_latest_version=True
+    )
+    entry = read_remote_entry(env, data)
+
+    return dict(
+        name=data['name'],
+        version=data['version'],
+        bucket=data['bucket'],
+        key=data['key'],
+        url=data.get('url'),
+        etag=entry.get('etag'),
+        size=entry.get('size'),
+        sha256=entry.get('sha256'),
+        wheel_sha256=entry.get('wheel_sha256'),
+        dependencies=entry['dependencies']
+    )
+
+
+def resolve_locked(
+        env: Environment,
+        package_ids: typing.List[str],
+        jobs: int = 1
+) -> typing.List[dict]:
+    """
+    Resolves the complete transitive dependency graph of the specified
+    package identifiers into lock entries. Each level of the graph is
+    resolved concurrently. As with installation, the first resolved entry
+    of a package name is used for all later references to that package.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param package_ids:
+        A list of package names or package name and version combinations
+        that form the roots of the dependency graph.
+    :param jobs:
+        Maximum number of packages that are resolved concurrently.
+    :return
+        The lock entries in the order in which they were discovered.
+    """
+    entries = {}
+    seen = set()
+    frontier = list(package_ids)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while frontier:
+            pending = [
+                pid for pid in dict.fromkeys(frontier) if pid not in seen
+            ]
+            seen.update(pending)
+            versioning.index.prefetch(
+                env,
+                [pid.split(':')[0] for pid in pending if '://' not in pid]
+            )
+
+            frontier = []
+            for entry in pool.map(lambda p: lock_package(env, p), pending):
+                if entry['name'] in entries:
+                    continue
+                entries[entry['name']] = entry
+                frontier.extend(entry['dependencies'])
+
+    return list(entries.values())
+
+
+def create_lock(
+        env: Environment,
+        package_ids: typing.List[str],
+        jobs: int = 1
+) -> dict:
+    """
+    Creates the lock for the specified package identifiers, which records
+    the exact key, ETag, size and digests of every package in their
+    dependency graph.
+    """
+    entries = resolve_locked(env, package_ids, jobs)
+    return dict(
+        lock_version=LOCK_VERSION,
+        bucket=env.bucket,
+        root_prefix=env.root_prefix,
+        dependencies=list(package_ids),
+        packages={entry['name']: entry for entry in entries}
+    )
+
+
+def run(env: Environment) -> dict:
+    """
+    Executes the lock command action, which resolves the packages specified
+    as arguments, or the dependencies in the pipper configs file otherwise,
+    and writes the resulting lock file.
+
+    :param env:
+        Command environment in which this function is being executed
+    """
+    configs_path = env.args.get('configs_path')
+    package_ids = (
+        env.args.get('packages')
+        or environment.load_configs(configs_path).get('dependencies')
+        or []
+    )
+    lock_path = env.args.get('lock_path') or get_lock_path(configs_path)
+
+    lock = create_lock(env, package_ids, int(env.args.get('jobs') or 1))
+    for entry in lock['packages'].values():
+        output.echo('[LOCKED]: {} {}'.format(entry['name'], entry['version']))
+
+    save(lock_path, lock)
+    output.echo('[SAVED]: {}'.format(lock_path))
+    return lock
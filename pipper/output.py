@@ -0,0 +1,73 @@
+"""
+Output of the pipper commands. Progress messages are written to the `pipper`
+logger instead of directly to stdout, so that applications embedding pipper
+through the `api` module decide whether and where the messages appear. The
+pipper command attaches a handler that writes the messages to stdout while
+it runs.
+"""
+import contextlib
+import logging
+import sys
+import threading
+
+logger = logging.getLogger('pipper')
+
+_lock = threading.Lock()
+_depth = 0
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    Writes log records to the current stdout, which may be redirected
+    after the handler was created.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter('%(message)s'))
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_handler = StdoutHandler()
+
+
+def echo(*values):
+    """Writes the values to the pipper output in the same way as print."""
+    logger.info(' '.join(str(value) for value in values))
+
+
+@contextlib.contextmanager
+def to_stdout(enabled: bool = True):
+    """
+    Writes the pipper output to stdout while the context is active unless
+    not enabled. The contexts can be nested and can be active in multiple
+    threads at once, in which case the output is written to stdout until
+    the last of them exits. Nothing else written to stdout is affected.
+    """
+    global _depth
+
+    if not enabled:
+        yield
+        return
+
+    with _lock:
+        if _depth == 0:
+            logger.addHandler(_handler)
+            logger.setLevel(logging.INFO)
+        _depth += 1
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0:
+                logger.removeHandler(_handler)
+                logger.setLevel(logging.NOTSET)
@@ -83,6 +83,113 @@ def populate_with_credentials(parser: ArgumentParser) -> ArgumentParser:
         help='Root repository prefix in S3 where the packages reside.'
     )
 
+    return populate_with_client_options(parser)
+
+
+def populate_with_client_options(parser: ArgumentParser) -> ArgumentParser:
+    """
+    Adds the S3 client options, which are stored in repository
+    configurations by the repository add and modify actions and override
+    the repository configuration for all other actions.
+    """
+    parser.add_argument(
+        '--region',
+        dest='region',
+        help='AWS region of the bucket containing the pipper packages.'
+    )
+
+    parser.add_argument(
+        '--endpoint-url',
+        dest='endpoint_url',
+        help=' '.join([
+            'Alternate S3 endpoint URL, such as that of a local',
+            'S3-compatible mirror.'
+        ])
+    )
+
+    parser.add_argument(
+        '--max-pool-connections',
+        dest='max_pool_connections',
+        type=int,
+        help='Maximum number of pooled S3 connections. Defaults to 32.'
+    )
+
+    parser.add_argument(
+        '--accelerate',
+        dest='accelerate',
+        action='store_true',
+        default=None,
+        help='Use the S3 transfer acceleration endpoint.'
+    )
+
+    parser.add_argument(
+        '--no-accelerate',
+        dest='accelerate',
+        action='store_false',
+        default=None,
+        help='Do not use the S3 transfer acceleration endpoint.'
+    )
+
+    parser.add_argument(
+        '--dualstack',
+        dest='dualstack',
+        action='store_true',
+        default=None,
+        help='Use the IPv4 and IPv6 dualstack S3 endpoint.'
+    )
+
+    parser.add_argument(
+        '--no-dualstack',
+        dest='dualstack',
+        action='store_false',
+        default=None,
+        help='Do not use the IPv4 and IPv6 dualstack S3 endpoint.'
+    )
+
+    parser.add_argument(
+        '--retry-mode',
+        dest='retry_mode',
+        choices=['legacy', 'standard', 'adaptive'],
+        help='Retry mode of failed S3 requests.'
+    )
+
+    parser.add_argument(
+        '--max-attempts',
+        dest='max_attempts',
+        type=int,
+        help='Maximum number of attempts of each S3 request.'
+    )
+
+    parser.add_argument(
+        '--connect-timeout',
+        dest='connect_timeout',
+        type=float,
+        help='Number of seconds to wait for an S3 connection.'
+    )
+
+    parser.add_argument(
+        '--read-timeout',
+        dest='read_timeout',
+        type=float,
+        help='Number of seconds to wait for data from an S3 connection.'
+    )
+
+    return parser
+
+
+def populate_with_cache(parser: ArgumentParser) -> ArgumentParser:
+    """ """
+    parser.add_argument(
+        '--no-cache',
+        dest='no_cache',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Download bundles directly from S3 instead of using the local',
+            'bundle cache.'
+        ])
+    )
+
     return parser
 
 
@@ -130,19 +237,148 @@ def populate_install(parser: ArgumentParser) -> ArgumentParser:
         help='Upgrade existing packages to latest version'
     )
 
-    return populate_with_credentials(parser)
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help=' '.join([
+            'Number of packages to download concurrently. When greater than',
+            'one, the complete dependency graph is resolved and downloaded',
+            'before the packages are installed one at a time.'
+        ])
+    )
+
+    parser.add_argument(
+        '--batch',
+        dest='batch',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Install all pipper packages and pypi packages with a single pip',
+            'invocation. Packages are installed individually only if the',
+            'batched installation fails.'
+        ])
+    )
+
+    parser.add_argument(
+        '--locked',
+        dest='locked',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Install the exact packages recorded in the lock file created by',
+            'the lock command instead of resolving the dependencies in the',
+            'pipper configs file.'
+        ])
+    )
+
+    parser.add_argument(
+        '--lock-file',
+        dest='lock_path',
+        help=' '.join([
+            'Path of the lock file to install from. Defaults to a',
+            'pipper.lock file next to the pipper configs file.'
+        ])
+    )
+
+    return populate_with_cache(populate_with_credentials(parser))
+
+
+def populate_lock(parser: ArgumentParser) -> ArgumentParser:
+    """ """
+    parser.description = read_file('resources', 'lock_action.txt')
+
+    parser.add_argument(
+        'packages',
+        nargs='*'
+    )
+
+    parser.add_argument(
+        '-i', '--input',
+        dest='configs_path'
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        dest='lock_path',
+        help=' '.join([
+            'Path where the lock file will be written. Defaults to a',
+            'pipper.lock file next to the pipper configs file.'
+        ])
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=8,
+        help='Maximum number of packages that are resolved concurrently.'
+    )
+
+    return populate_with_cache(populate_with_credentials(parser))
 
 
 def populate_bundle(parser: ArgumentParser) -> ArgumentParser:
     """ """
     parser.description = read_file('resources', 'bundle_action.txt')
 
-    parser.add_argument('package_directory')
+    parser.add_argument(
+        'package_directories',
+        nargs='+',
+        help='Directories of the packages to bundle'
+    )
     parser.add_argument(
         '-o', '--output',
         dest='output_directory'
     )
 
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help=' '.join([
+            'Maximum number of package directories that are bundled in',
+            'parallel.'
+        ])
+    )
+
+    parser.add_argument(
+        '-f', '--force',
+        dest='force',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Bundle the package even if the output directory already',
+            'contains a bundle created from identical package sources.'
+        ])
+    )
+
+    parser.add_argument(
+        '--compression',
+        dest='compression',
+        choices=['auto', 'stored', 'deflated'],
+        default='auto',
+        help=' '.join([
+            'How the members of the bundle are compressed. By default the',
+            'package metadata is deflated and the wheel, which is already',
+            'compressed, is stored as is.'
+        ])
+    )
+
+    parser.add_argument(
+        '--no-build-isolation',
+        dest='no_build_isolation',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Build the wheel with the build backend installed in the current',
+            'environment instead of installing the build requirements into',
+            'an isolated environment.'
+        ])
+    )
+
     return parser
 
 
@@ -187,6 +423,52 @@ def populate_publish(parser: ArgumentParser) -> ArgumentParser:
         ])
     )
 
+    parser.add_argument(
+        '--all',
+        dest='publish_all',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Publish every pipper file in the target directory instead of',
+            'only the most recently created one. Versions that have already',
+            'been published are skipped unless the force flag is set.'
+        ])
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=4,
+        help=' '.join([
+            'Maximum number of pipper files that are read and uploaded',
+            'concurrently when publishing all pipper files in a directory.'
+        ])
+    )
+
+    parser.add_argument(
+        '--part-size',
+        dest='part_size',
+        type=float,
+        default=None,
+        help=' '.join([
+            'Size in megabytes of each part of the multipart upload used to',
+            'publish large pipper files. Files smaller than this size are',
+            'uploaded in a single request. Defaults to 16 megabytes.'
+        ])
+    )
+
+    parser.add_argument(
+        '--threads',
+        dest='upload_threads',
+        type=int,
+        default=None,
+        help=' '.join([
+            'Maximum number of parts of a multipart upload that are sent',
+            'concurrently. Defaults to 8.'
+        ])
+    )
+
     return populate_with_credentials(parser)
 
 
@@ -236,7 +518,15 @@ def populate_download(parser: ArgumentParser) -> ArgumentParser:
         default=False
     )
 
-    return populate_with_credentials(parser)
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=4,
+        help='Maximum number of packages that are downloaded concurrently.'
+    )
+
+    return populate_with_cache(populate_with_credentials(parser))
 
 
 def populate_repository(parser: ArgumentParser) -> ArgumentParser:
@@ -275,6 +565,75 @@ def populate_repository(parser: ArgumentParser) -> ArgumentParser:
     )
     populate_with_credentials(modify_parser)
 
+    reindex_parser = subparsers.add_parser('reindex')
+    reindex_parser.add_argument(
+        'packages',
+        nargs='*',
+        help=' '.join([
+            'Names of the packages to reindex. All packages in the',
+            'repository are reindexed if none are specified.'
+        ])
+    )
+    reindex_parser.add_argument(
+        '--acl',
+        dest='s3_object_acl',
+        default='private',
+        help='ACL to apply to the rebuilt manifests.'
+    )
+    populate_with_credentials(reindex_parser)
+
+    return parser
+
+
+def populate_cache(parser: ArgumentParser) -> ArgumentParser:
+    """ """
+    parser.description = read_file('resources', 'cache_action.txt')
+
+    subparsers = parser.add_subparsers(
+        help='Cache actions',
+        dest='cache_action'
+    )
+
+    subparsers.add_parser('list')
+    subparsers.add_parser('clear')
+
+    prune_parser = subparsers.add_parser('prune')
+    prune_parser.add_argument(
+        '--max-size',
+        dest='max_size',
+        type=float,
+        help=' '.join([
+            'Maximum size of the cache in megabytes after pruning. Defaults',
+            'to the configured maximum cache size.'
+        ])
+    )
+
+    return parser
+
+
+def populate_batch(parser: ArgumentParser) -> ArgumentParser:
+    """ """
+    parser.description = read_file('resources', 'batch_action.txt')
+
+    parser.add_argument(
+        'commands_path',
+        help=' '.join([
+            'Path of the file containing the pipper commands to run, one',
+            'per line. Use "-" to read the commands from stdin.'
+        ])
+    )
+
+    parser.add_argument(
+        '-k', '--keep-going',
+        dest='keep_going',
+        action='store_true',
+        default=False,
+        help=' '.join([
+            'Run the remaining commands after a command fails instead of',
+            'stopping the batch.'
+        ])
+    )
+
     return parser
 
 
@@ -341,12 +700,15 @@ def parse(cli_args: list = None) -> dict:
 
     parsers = [
         populate_install(subparsers.add_parser('install')),
+        populate_lock(subparsers.add_parser('lock')),
         populate_bundle(subparsers.add_parser('bundle')),
         populate_publish(subparsers.add_parser('publish')),
         populate_info(subparsers.add_parser('info')),
         populate_download(subparsers.add_parser('download')),
         populate_authorize(subparsers.add_parser('authorize')),
-        populate_repository(subparsers.add_parser('repository'))
+        populate_repository(subparsers.add_parser('repository')),
+        populate_cache(subparsers.add_parser('cache')),
+        populate_batch(subparsers.add_parser('batch'))
     ]
 
     for p in parsers:
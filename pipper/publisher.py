@@ -1,10 +1,18 @@
+import collections
+import hashlib
 import os
+import time
+import typing
 import zipfile
 import json
+from concurrent.futures import ThreadPoolExecutor
 
+from pipper import cache
+from pipper import output
 from pipper import s3
 from pipper import versioning
 from pipper.environment import Environment
+from pipper.versioning import manifest
 
 
 def is_already_published(env: Environment, metadata: dict) -> bool:
@@ -30,6 +38,15 @@ def read_metadata(bundle_path: str) -> dict:
     return json.loads(contents)
 
 
+def hash_file(path: str) -> str:
+    """Returns the hex SHA-256 digest of the file at the specified path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def get_pipper_files_in(target_directory: str) -> list:
     """ """
 
@@ -49,55 +66,345 @@ def get_pipper_files_in(target_directory: str) -> list:
     return [e['path'] for e in path_entries if os.path.isfile(e['path'])]
 
 
-def from_pipper_file(env: Environment, bundle_path: str):
-    """ """
+def upload_bundle(env: Environment, bundle_path: str, metadata: dict) -> dict:
+    """
+    Uploads the pipper bundle to its key in the S3 bucket without updating
+    the package manifest.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param bundle_path:
+        Path of the local pipper bundle file to upload.
+    :param metadata:
+        Package metadata read from the bundle.
+    :return
+        The manifest entry of the uploaded bundle.
+    """
+    content_length = os.path.getsize(bundle_path)
+    sha256 = hash_file(bundle_path)
+    acl = env.args.get('s3_object_acl') or 'private'
+    key = versioning.make_s3_key(
+        metadata['name'],
+        metadata['version'],
+        root_prefix=env.root_prefix,
+    )
+
+    part_size = env.args.get('part_size')
+    response = s3.upload_file(
+        s3_client=env.s3_client,
+        bucket=env.bucket,
+        key=key,
+        path=bundle_path,
+        extra_args={
+            # Allow overriding the ACL from the command.
+            'ACL': acl,
+            'ContentType': 'application/zip',
+            'Metadata': {
+                'package': json.dumps(metadata),
+                'version': metadata['version'],
+                'safe_version': metadata['safe_version'],
+                'name': metadata['name'],
+                'timestamp': metadata['timestamp'],
+                'sha256': sha256
+            }
+        },
+        part_size=int(part_size * 1024 * 1024) if part_size else None,
+        threads=env.args.get('upload_threads')
+    )
+    versioning.index.invalidate(env, metadata['name'])
+
+    return manifest.from_metadata(
+        metadata=metadata,
+        key=key,
+        size=content_length,
+        etag=response.get('ETag'),
+        sha256=sha256
+    )
+
+
+def update_manifest(env: Environment, package_name: str, entries: list):
+    """Adds the uploaded bundle entries to the package's manifest."""
+    output.echo('[INDEXING]: Updating "{}" manifest'.format(package_name))
+    manifest.update_package(
+        s3_client=env.s3_client,
+        bucket=env.bucket,
+        root_prefix=env.root_prefix,
+        package_name=package_name,
+        entries=entries,
+        acl=env.args.get('s3_object_acl') or 'private'
+    )
+
+
+def index_published(
+        env: Environment,
+        package_name: str,
+        metadatas: typing.List[dict]
+) -> list:
+    """
+    Adds already published bundles that are missing from the package's
+    manifest to the manifest, which happens when a previous publish uploaded
+    the bundles but failed to update the manifest. Packages without a
+    manifest are left as they are.
+
+    :return
+        The manifest entries that were added.
+    """
+    existing = manifest.fetch(
+        s3_client=env.s3_client,
+        bucket=env.bucket,
+        key=manifest.get_package_key(env.root_prefix, package_name)
+    )
+    if existing is None:
+        return []
+
+    versions = existing['manifest'].get('versions') or {}
+    entries = [
+        manifest.from_head(
+            env.s3_client,
+            env.bucket,
+            versioning.make_s3_key(
+                package_name,
+                metadata['version'],
+                root_prefix=env.root_prefix
+            )
+        )
+        for metadata in metadatas
+        if metadata['safe_version'] not in versions
+    ]
+    if entries:
+        update_manifest(env, package_name, entries)
+    return entries
+
+
+def from_pipper_file(env: Environment, bundle_path: str) -> dict:
+    """
+    Publishes a single pipper bundle unless its version has already been
+    published.
+
+    :return
+        The result for the package version with its `name`, `version`,
+        `status`, uploaded `size` and upload time `elapsed` in the same
+        form as the results of the `publish_all` function.
+    """
+    started = time.time()
     metadata = read_metadata(bundle_path)
+    result = dict(
+        name=metadata['name'],
+        version=metadata['version'],
+        status='skipped',
+        size=0,
+        elapsed=0,
+        entry=None
+    )
 
-    print('[SYNCING]: "{}"'.format(metadata['name']))
+    output.echo('[SYNCING]: "{}"'.format(metadata['name']))
 
     force = env.args.get('force')
     if not force and is_already_published(env, metadata):
-        print('[SKIPPED]: "{}" version {} is already published'.format(
-            metadata['name'],
-            metadata['version']
-        ))
+        output.echo(
+            '[SKIPPED]: "{}" version {} is already published'.format(
+                metadata['name'],
+                metadata['version']
+            )
+        )
+        index_published(env, metadata['name'], [metadata])
 
         if env.args.get('skip_fails'):
             raise ValueError(
                 'Failed because this version and published version match.'
             )
 
-        return
+        return result
 
-    print('[PUBLISHING]: "{}" version {}'.format(
+    output.echo('[PUBLISHING]: "{}" version {}'.format(
         metadata['name'],
         metadata['version']
     ))
 
-    content_length = os.path.getsize(bundle_path)
+    entry = upload_bundle(env, bundle_path, metadata)
+    update_manifest(env, metadata['name'], [entry])
+    return dict(
+        result,
+        status='published',
+        size=entry['size'],
+        elapsed=time.time() - started,
+        entry=entry
+    )
 
-    with open(bundle_path, 'rb') as f:
-        env.s3_client.put_object(
-            # Allow overriding the ACL from the command.
-            ACL=env.args.get('s3_object_acl') or 'private',
-            Body=f,
-            Bucket=env.bucket,
-            Key=versioning.make_s3_key(
+
+def print_summary(results: typing.List[dict], elapsed: float):
+    """Prints a table summarizing the results of a batch publish."""
+    uploaded = [r for r in results if r['status'] == 'published']
+    total = sum(r['size'] for r in uploaded)
+    row = '  {:<30} {:<16} {:<10} {:>10} {:>8} {:>12}'
+
+    output.echo('\n[SUMMARY]:')
+    output.echo(row.format(
+        'PACKAGE', 'VERSION', 'STATUS', 'SIZE', 'SECONDS', 'THROUGHPUT'
+    ))
+    for r in results:
+        is_uploaded = r['status'] == 'published'
+        output.echo(row.format(
+            r['name'],
+            r['version'],
+            r['status'],
+            cache.to_size_label(r['size']) if is_uploaded else '-',
+            '{:.2f}'.format(r['elapsed']) if is_uploaded else '-',
+            cache.to_throughput_label(r['size'], r['elapsed'])
+            if is_uploaded else '-'
+        ))
+    message = '[TOTAL]: Published {} of {} bundles, {} in {:.2f}s ({})'
+    output.echo(message.format(
+        len(uploaded),
+        len(results),
+        cache.to_size_label(total),
+        elapsed,
+        cache.to_throughput_label(total, elapsed)
+    ))
+
+
+def publish_all(env: Environment, directory: str) -> typing.List[dict]:
+    """
+    Publishes every pipper bundle in the specified directory. The metadata
+    of the bundles is read in parallel and the published versions of each
+    package are determined with a single listing per package. Only the
+    bundles that have not been published yet are uploaded, concurrently on
+    a bounded worker pool, after which each package's manifest is updated
+    once with all of its newly published versions. A failed upload does
+    not stop the other uploads, and the manifests are updated with every
+    bundle that was uploaded before the failures are raised together.
+
+    :param env:
+        Command environment in which this function is being executed
+    :param directory:
+        Directory containing the pipper bundles to publish. If multiple
+        bundles contain the same package version, the most recently created
+        one is published.
+    :return
+        A list of results for each package version with its `name`,
+        `version`, `status`, uploaded `size` and upload time `elapsed`.
+        The status is one of `published`, `skipped` or `failed`.
+    """
+    started = time.time()
+    jobs = max(1, int(env.args.get('jobs') or 1))
+    force = env.args.get('force')
+    paths = get_pipper_files_in(directory)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        bundles = collections.OrderedDict()
+        for path, metadata in zip(paths, pool.map(read_metadata, paths)):
+            key = (metadata['name'], metadata['version'])
+            bundles.pop(key, None)
+            bundles[key] = dict(path=path, metadata=metadata)
+
+        names = list(collections.OrderedDict.fromkeys(
+            name for name, _ in bundles.keys()
+        ))
+        keys = [
+            versioning.make_s3_key(name, version, env.root_prefix)
+            for name, version in bundles.keys()
+        ]
+        published = {} if force else s3.keys_exist(
+            s3_client=env.s3_client,
+            bucket=env.bucket,
+            keys=keys,
+            jobs=jobs
+        )
+
+        def publish(bundle: dict) -> dict:
+            metadata = bundle['metadata']
+            result = dict(
+                name=metadata['name'],
+                version=metadata['version'],
+                status='skipped',
+                size=0,
+                elapsed=0,
+                entry=None
+            )
+            key = versioning.make_s3_key(
                 metadata['name'],
                 metadata['version'],
                 root_prefix=env.root_prefix,
-            ),
-            ContentType='application/zip',
-            ContentLength=content_length,
-            Metadata={
-                'package': json.dumps(metadata),
-                'version': metadata['version'],
-                'safe_version': metadata['safe_version'],
-                'name': metadata['name'],
-                'timestamp': metadata['timestamp']
-            }
+            )
+            if published.get(key):
+                output.echo(
+                    '[SKIPPED]: "{}" version {} is already published'.format(
+                        metadata['name'],
+                        metadata['version']
+                    )
+                )
+                return result
+
+            output.echo('[PUBLISHING]: "{}" version {}'.format(
+                metadata['name'],
+                metadata['version']
+            ))
+            upload_started = time.time()
+            try:
+                entry = upload_bundle(env, bundle['path'], metadata)
+            except Exception as error:
+                output.echo('[FAILED]: "{}" version {}: {}'.format(
+                    metadata['name'],
+                    metadata['version'],
+                    error
+                ))
+                return dict(result, status='failed', error=error)
+
+            return dict(
+                result,
+                status='published',
+                size=entry['size'],
+                elapsed=time.time() - upload_started,
+                entry=entry
+            )
+
+        results = list(pool.map(publish, bundles.values()))
+
+    failures = [r for r in results if r['status'] == 'failed']
+    for name in names:
+        entries = [
+            r['entry'] for r in results
+            if r['name'] == name and r['entry'] is not None
+        ]
+        skipped = [
+            bundle['metadata'] for (bundle_name, _), bundle in bundles.items()
+            if bundle_name == name and published.get(versioning.make_s3_key(
+                name,
+                bundle['metadata']['version'],
+                root_prefix=env.root_prefix
+            ))
+        ]
+        try:
+            if entries:
+                update_manifest(env, name, entries)
+            if skipped:
+                index_published(env, name, skipped)
+        except Exception as error:
+            output.echo(
+                '[FAILED]: Updating "{}" manifest: {}'.format(name, error)
+            )
+            failures.append(dict(name=name, error=error))
+
+    print_summary(results, time.time() - started)
+
+    if failures:
+        raise RuntimeError('Failed to publish {} bundles: {}'.format(
+            len(failures),
+            '; '.join(
+                '"{}": {}'.format(f['name'], f['error']) for f in failures
+            )
+        ))
+
+    skipped = [r for r in results if r['status'] == 'skipped']
+    if skipped and env.args.get('skip_fails'):
+        raise ValueError(
+            'Failed because {} versions were already published.'.format(
+                len(skipped)
+            )
         )
 
+    return results
+
 
 def run(env: Environment):
     """ """
@@ -106,6 +413,15 @@ def run(env: Environment):
     if not os.path.exists(target_path):
         raise FileNotFoundError('No such path "{}"'.format(target_path))
 
+    if env.args.get('publish_all'):
+        if not os.path.isdir(target_path):
+            raise NotADirectoryError(
+                'Publishing all bundles requires a directory "{}"'.format(
+                    target_path
+                )
+            )
+        return publish_all(env, target_path)
+
     bundle_path = (
         get_pipper_files_in(target_path)[-1]
         if os.path.isdir(target_path) else
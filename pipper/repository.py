@@ -1,6 +1,7 @@
 import copy
 
 from pipper import environment
+from pipper import output
 from pipper.environment import Environment
 
 
@@ -16,6 +17,15 @@ def explode_credentials(credentials: list = None) -> dict:
     )
 
 
+def get_client_options(env: Environment) -> dict:
+    """Returns the S3 client options that were specified as arguments."""
+    return {
+        name: env.args[name]
+        for name in environment.CLIENT_OPTIONS
+        if env.args.get(name) is not None
+    }
+
+
 def add(env: Environment) -> dict:
     """..."""
     configs = environment.load_repositories()
@@ -46,12 +56,15 @@ def add(env: Environment) -> dict:
             session_token=credentials[2] if credentials else None
         )
 
+    repo.update(get_client_options(env))
     configs['repositories'][name] = repo
     configs['default'] = name if is_default else configs['default']
 
     result = environment.save_repositories(configs)
 
-    print('[ADDED]: Created new "{}" repository configuration'.format(name))
+    output.echo(
+        '[ADDED]: Created new "{}" repository configuration'.format(name)
+    )
     return result
 
 
@@ -84,15 +97,23 @@ def modify(env: Environment):
             profile=profile or existing['profile'],
             access_key_id=creds['access_key_id'],
             secret_access_key=creds['secret_access_key'],
-            session_token=creds['session_token']
+            session_token=creds['session_token'],
+            **{
+                option: existing.get(option)
+                for option in environment.CLIENT_OPTIONS
+                if existing.get(option) is not None
+            }
         )
 
+    modified.update(get_client_options(env))
     configs['repositories'][name] = modified
     configs['default'] = name if is_default else configs['default']
 
     result = environment.save_repositories(configs)
 
-    print('[MODIFIED]: "{}" repository configuration changed'.format(name))
+    output.echo(
+        '[MODIFIED]: "{}" repository configuration changed'.format(name)
+    )
     return result
 
 
@@ -110,7 +131,7 @@ def remove(env: Environment):
 
         environment.save_repositories(configs)
 
-    print('[REMOVED]: "{}" configuration has been removed'.format(name))
+    output.echo('[REMOVED]: "{}" configuration has been removed'.format(name))
     return None
 
 
@@ -121,9 +142,9 @@ def repo_exists(env: Environment) -> bool:
     exists = name in configs['repositories']
 
     if exists:
-        print('[YES]: {} does exist'.format(name))
+        output.echo('[YES]: {} does exist'.format(name))
     else:
-        print('[NO]: {} does not exist'.format(name))
+        output.echo('[NO]: {} does not exist'.format(name))
 
     return exists
 
@@ -133,10 +154,48 @@ def list_repos():
     configs = environment.load_repositories()
 
     for name in configs['repositories'].keys():
-        print('  * {}'.format(name))
+        output.echo('  * {}'.format(name))
 
     if configs['default']:
-        print('Default configuration is: {}'.format(configs['default']))
+        output.echo('Default configuration is: {}'.format(configs['default']))
+
+
+def reindex(env: Environment) -> list:
+    """..."""
+    # Imported here so that the other repository actions, which only read
+    # and write local configuration files, do not load boto3.
+    from pipper.versioning import manifest
+
+    package_names = env.args.get('packages') or manifest.list_package_names(
+        s3_client=env.s3_client,
+        bucket=env.bucket,
+        root_prefix=env.root_prefix
+    )
+    acl = env.args.get('s3_object_acl') or 'private'
+
+    manifests = []
+    for name in package_names:
+        manifests.append(manifest.rebuild_package(
+            s3_client=env.s3_client,
+            bucket=env.bucket,
+            root_prefix=env.root_prefix,
+            package_name=name,
+            acl=acl
+        ))
+        output.echo('[REINDEXED]: "{}" with {} versions'.format(
+            name,
+            len(manifests[-1]['versions'])
+        ))
+
+    manifest.update_repository(
+        s3_client=env.s3_client,
+        bucket=env.bucket,
+        root_prefix=env.root_prefix,
+        manifests=manifests,
+        acl=acl,
+        replace=not env.args.get('packages')
+    )
+    return manifests
 
 
 def run(env: Environment):
@@ -152,5 +211,7 @@ def run(env: Environment):
         return list_repos()
     elif action == 'exists':
         return repo_exists(env)
+    elif action == 'reindex':
+        return reindex(env)
 
     raise ValueError('Unknown repository action "{}"'.format(action))
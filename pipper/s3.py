@@ -1,7 +1,12 @@
+import os
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
+from boto3.s3.transfer import TransferConfig
 from boto3.session import Session
 from botocore.client import BaseClient
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 
 def session_from_credentials_list(
@@ -39,17 +44,285 @@ def session_from_profile_name(
     return Session(profile_name=profile_name)
 
 
-def key_exists(s3_client, bucket: str, key: str) -> bool:
-    """ """
-    try:
-        response = s3_client.list_objects(
+#: Default maximum number of pooled connections of S3 clients, which is
+#: larger than the botocore default of 10 so that concurrent transfers and
+#: listings do not wait for connections.
+MAX_POOL_CONNECTIONS = 32
+
+
+def create_client(
+        session: Session,
+        region: str = None,
+        endpoint_url: str = None,
+        max_pool_connections: int = None,
+        accelerate: bool = None,
+        dualstack: bool = None,
+        retry_mode: str = None,
+        max_attempts: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None
+) -> BaseClient:
+    """
+    Creates the S3 client of the session with the specified client options.
+    Options that are not specified use the botocore defaults, except for
+    the connection pool size, which defaults to `MAX_POOL_CONNECTIONS`.
+
+    :param session:
+        AWS session whose credentials are used by the client.
+    :param region:
+        Region of the S3 bucket, which avoids redirects to the region of
+        the bucket.
+    :param endpoint_url:
+        Alternate S3 endpoint, such as a local S3-compatible mirror.
+    :param max_pool_connections:
+        Maximum number of connections kept open in the connection pool.
+    :param accelerate:
+        Whether or not to use the S3 transfer acceleration endpoint.
+    :param dualstack:
+        Whether or not to use the IPv4 and IPv6 dualstack endpoint.
+    :param retry_mode:
+        The botocore retry mode, which is one of `legacy`, `standard` or
+        `adaptive`.
+    :param max_attempts:
+        Maximum number of attempts of each request, including retries.
+    :param connect_timeout:
+        Number of seconds to wait for a connection to be established.
+    :param read_timeout:
+        Number of seconds to wait for data to be read from a connection.
+    """
+    retries = {
+        key: value
+        for key, value in [
+            ('mode', retry_mode),
+            ('max_attempts', max_attempts)
+        ]
+        if value is not None
+    }
+    endpoints = {
+        key: value
+        for key, value in [
+            ('use_accelerate_endpoint', accelerate),
+            ('use_dualstack_endpoint', dualstack)
+        ]
+        if value is not None
+    }
+    timeouts = {
+        key: value
+        for key, value in [
+            ('connect_timeout', connect_timeout),
+            ('read_timeout', read_timeout)
+        ]
+        if value is not None
+    }
+
+    config = Config(
+        max_pool_connections=max_pool_connections or MAX_POOL_CONNECTIONS,
+        retries=retries or None,
+        s3=endpoints or None,
+        **timeouts
+    )
+    return session.client(
+        's3',
+        region_name=region or None,
+        endpoint_url=endpoint_url or None,
+        config=config
+    )
+
+
+#: Default size in bytes of the parts of multipart uploads.
+PART_SIZE = 16 * 1024 * 1024
+
+#: Default number of parts of a multipart upload sent concurrently.
+THREADS = 8
+
+
+def upload_file(
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        path: str,
+        extra_args: dict = None,
+        part_size: int = None,
+        threads: int = None
+) -> dict:
+    """
+    Uploads the local file to the specified key in the S3 bucket. Files
+    larger than the part size are uploaded as multipart uploads, whose parts
+    are sent concurrently and retried individually on failure.
+
+    :param s3_client:
+        S3 client used to upload the file.
+    :param bucket:
+        Name of the S3 bucket to upload the file into.
+    :param key:
+        S3 key where the file will be stored.
+    :param path:
+        Path of the local file to upload.
+    :param extra_args:
+        Additional object arguments, such as the ACL, ContentType and
+        Metadata of the uploaded object.
+    :param part_size:
+        Size in bytes of each part of a multipart upload, which is also the
+        size above which multipart uploads are used. Defaults to the
+        `PART_SIZE` setting.
+    :param threads:
+        Maximum number of parts uploaded concurrently. Defaults to the
+        `THREADS` setting.
+    :return
+        The response of a HEAD request on the uploaded object, which
+        includes its ETag and content length.
+    """
+    part_size = part_size or PART_SIZE
+    config = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max(1, threads or THREADS),
+        use_threads=(threads or THREADS) > 1
+    )
+
+    with open(path, 'rb') as f:
+        s3_client.upload_fileobj(
+            Fileobj=f,
             Bucket=bucket,
-            Prefix=key,
-            MaxKeys=1
+            Key=key,
+            ExtraArgs=extra_args or {},
+            Config=config
+        )
+
+    return s3_client.head_object(Bucket=bucket, Key=key)
+
+
+def download_file(
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        path: str,
+        extra_args: dict = None,
+        part_size: int = None,
+        threads: int = None,
+        etag: str = None
+):
+    """
+    Downloads the object at the specified key to the local path. Objects
+    larger than the part size are downloaded with concurrent ranged GET
+    requests that are retried individually on failure.
+
+    :param s3_client:
+        S3 client used to download the object.
+    :param bucket:
+        Name of the S3 bucket where the object resides.
+    :param key:
+        S3 key of the object to download.
+    :param path:
+        Local path where the object will be saved.
+    :param extra_args:
+        Additional request arguments allowed by the S3 transfer manager.
+    :param part_size:
+        Size in bytes of each ranged request, which is also the size above
+        which ranged requests are used. Defaults to the `PART_SIZE` setting.
+    :param threads:
+        Maximum number of concurrent ranged requests. Defaults to the
+        `THREADS` setting.
+    :param etag:
+        Expected ETag of the object. The transfer manager does not accept
+        conditional request arguments, so the ETag is checked with a HEAD
+        request after the download instead and the downloaded file is
+        removed if the object changed.
+    """
+    part_size = part_size or PART_SIZE
+    config = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max(1, threads or THREADS),
+        use_threads=(threads or THREADS) > 1
+    )
+    s3_client.download_file(
+        Bucket=bucket,
+        Key=key,
+        Filename=path,
+        ExtraArgs=extra_args or {},
+        Config=config
+    )
+
+    if not etag:
+        return
+
+    remote_etag = s3_client.head_object(Bucket=bucket, Key=key).get('ETag')
+    if remote_etag != etag:
+        os.remove(path)
+        raise ValueError(
+            'Object "{}" has ETag {} instead of the expected {}'.format(
+                key,
+                remote_etag,
+                etag
+            )
         )
-        return len(response['Contents']) > 0
-    except Exception:
-        return False
+
+
+def is_not_found(error: ClientError) -> bool:
+    """
+    Whether or not the client error was caused by a missing object rather
+    than by a failed request, such as throttling or denied access.
+    """
+    code = error.response.get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+
+def key_exists(s3_client, bucket: str, key: str) -> bool:
+    """
+    Whether or not an object exists at the specified key, which is
+    determined with a single HEAD request. Errors other than the object not
+    being found are raised instead of being treated as a missing object.
+    """
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as error:
+        if is_not_found(error):
+            return False
+        raise
+
+
+def keys_exist(
+        s3_client: BaseClient,
+        bucket: str,
+        keys: typing.List[str],
+        jobs: int = 8
+) -> typing.Dict[str, bool]:
+    """
+    Determines whether or not objects exist at each of the specified keys
+    with a single listing per key directory, such as a package directory
+    within a pipper repository, instead of one request per key. The
+    directories are listed concurrently.
+
+    :param s3_client:
+        S3 client used to list the objects.
+    :param bucket:
+        Name of the S3 bucket where the objects reside.
+    :param keys:
+        S3 keys of the objects to check.
+    :param jobs:
+        Maximum number of directories listed concurrently.
+    :return
+        A dictionary mapping each of the keys to whether or not it exists.
+    """
+    directories = sorted({
+        '{}/'.format(key.rsplit('/', 1)[0]) if '/' in key else ''
+        for key in keys
+    })
+
+    def list_keys(prefix: str) -> typing.List[str]:
+        entries = list_all_objects(s3_client, bucket, prefix)
+        return [entry['Key'] for entry in entries]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        listed = {
+            key
+            for listing in pool.map(list_keys, directories)
+            for key in listing
+        }
+
+    return {key: key in listed for key in keys}
 
 
 def list_objects(
@@ -64,3 +337,34 @@ def list_objects(
         Prefix=prefix,
         **kwargs
     )
+
+
+def list_all_objects(
+        s3_client: BaseClient,
+        bucket: str,
+        prefix: str,
+        **kwargs
+) -> typing.List[dict]:
+    """
+    Lists all of the objects within the specified prefix, paging through the
+    results as needed, and returns the combined object entries.
+    """
+    responses = []
+    while not responses or responses[-1].get('NextContinuationToken'):
+        continuation_kwargs = (
+            {'ContinuationToken': responses[-1].get('NextContinuationToken')}
+            if responses else
+            kwargs
+        )
+        responses.append(list_objects(
+            s3_client=s3_client,
+            bucket=bucket,
+            prefix=prefix,
+            **continuation_kwargs
+        ))
+
+    return [
+        entry
+        for response in responses
+        for entry in response.get('Contents') or []
+    ]
@@ -0,0 +1,81 @@
+import os
+import tempfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from pipper import command
+from pipper.test import utils
+
+
+def _write_commands(*lines: str) -> str:
+    """..."""
+    handle, path = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(handle, 'w') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+@patch('pipper.installer.install')
+@patch('pipper.environment.get_session')
+def test_batch(get_session: MagicMock, install: MagicMock):
+    """Should share one session and S3 client across all commands."""
+    install.side_effect = lambda env, package_id: env.s3_client
+    path = _write_commands(
+        '# Comments and blank lines are ignored',
+        'pipper install foo',
+        '',
+        'install bar --upgrade',
+    )
+
+    try:
+        with utils.PatchCache():
+            command.run(['batch', path])
+    finally:
+        os.remove(path)
+
+    assert ['foo', 'bar'] == [c[0][1] for c in install.call_args_list]
+    get_session.assert_called_once()
+    assert 1 == get_session.return_value.client.call_count
+    assert ('s3',) == get_session.return_value.client.call_args[0]
+
+
+@patch('pipper.installer.install')
+@utils.PatchSession()
+def test_batch_failure(boto_mocks: utils.BotoMocks, install: MagicMock):
+    """Should stop at the first failed command unless told to keep going."""
+    path = _write_commands(
+        'install foo --not-an-option',
+        'install bar',
+    )
+
+    try:
+        with pytest.raises(RuntimeError):
+            command.run(['batch', path])
+        assert 0 == install.call_count
+
+        with pytest.raises(RuntimeError):
+            command.run(['batch', path, '--keep-going'])
+        assert 1 == install.call_count
+    finally:
+        os.remove(path)
+
+
+@patch('pipper.installer.install')
+@utils.PatchSession()
+def test_batch_stdin(boto_mocks: utils.BotoMocks, install: MagicMock):
+    """Should run each command read from stdin before reading the next."""
+    lines = ['install foo\n', '\n', 'install bar\n', '']
+    installed_before_read = []
+
+    def readline() -> str:
+        installed_before_read.append(install.call_count)
+        return lines.pop(0)
+
+    with patch('sys.stdin') as stdin:
+        stdin.readline.side_effect = readline
+        command.run(['batch', '-'])
+
+    assert ['foo', 'bar'] == [c[0][1] for c in install.call_args_list]
+    assert [0, 1, 1, 2] == installed_before_read
@@ -1,9 +1,16 @@
+import json
 import os
 import pathlib
 import shutil
 import tempfile
+import zipfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
 
 import pipper
+from pipper import bundler
 from pipper import command
 
 
@@ -22,6 +29,9 @@ def test_bundle():
         .joinpath('hello_pipper')
         .absolute()
     )
+    build_directory = project_directory.joinpath('build')
+    has_build_directory = build_directory.exists()
+
     try:
         command.run([
             'bundle',
@@ -33,7 +43,178 @@ def test_bundle():
             None
         )
         assert filename
-        assert filename.startswith('hello_pipper-v')
+        # Named after the distribution in the wheel metadata.
+        assert filename.startswith('hello-pipper-v')
     finally:
         shutil.rmtree(directory)
         os.chdir(str(current_directory))
+        if not has_build_directory:
+            shutil.rmtree(str(build_directory), ignore_errors=True)
+
+
+@patch('pipper.bundler.bundle')
+def test_bundle_jobs(bundle: MagicMock):
+    """Should bundle each of the package directories in parallel."""
+    bundle.side_effect = lambda directory, *args: '{}.pipper'.format(
+        directory
+    )
+    command.run(['bundle', 'foo', 'bar', '--jobs=2', '--output=out'])
+    bundled = sorted(c[0][:2] for c in bundle.call_args_list)
+    assert [('bar', 'out'), ('foo', 'out')] == bundled
+
+
+@patch('pipper.bundler.subprocess.run')
+def test_create_wheel(run: MagicMock):
+    """
+    Should name the package after the wheel metadata instead of the
+    normalized wheel filename and only disable build isolation on request.
+    """
+    def build_wheel(cmd: list, **kwargs):
+        wheel_directory = cmd[cmd.index('--wheel-dir') + 1]
+        path = os.path.join(wheel_directory, 'my_pkg-1.0.0-py3-none-any.whl')
+        with zipfile.ZipFile(path, 'w') as zipper:
+            zipper.writestr(
+                'my_pkg-1.0.0.dist-info/METADATA',
+                'Metadata-Version: 2.1\nName: my-pkg\nVersion: 1.0.0\n\n'
+            )
+        return MagicMock(returncode=0)
+
+    run.side_effect = build_wheel
+    directory = tempfile.mkdtemp()
+    open(os.path.join(directory, 'setup.py'), 'w').close()
+
+    try:
+        result = bundler.create_wheel(directory, directory)
+        bundler.create_wheel(directory, directory, build_isolation=False)
+    finally:
+        shutil.rmtree(directory)
+
+    assert 'my-pkg' == result['package_name']
+    assert '1.0.0' == result['version']
+    commands = [c[0][0] for c in run.call_args_list]
+    assert '--no-build-isolation' not in commands[0]
+    assert '--no-build-isolation' in commands[1]
+
+
+def test_bundle_unchanged():
+    """
+    Should reuse an existing bundle created from identical sources with the
+    same build options and rebuild it otherwise.
+    """
+    directory = tempfile.mkdtemp()
+    package_directory = os.path.join(directory, 'package')
+    shutil.copytree(
+        str(pathlib.Path(pipper.__file__).parent.parent.joinpath(
+            'hello_pipper'
+        )),
+        package_directory,
+        ignore=shutil.ignore_patterns('build', '*.egg-info')
+    )
+    output_directory = os.path.join(directory, 'output')
+    os.makedirs(output_directory)
+
+    try:
+        first = bundler.bundle(package_directory, output_directory)
+        with patch('pipper.bundler.create_wheel') as create_wheel:
+            second = bundler.bundle(package_directory, output_directory)
+            create_wheel.assert_not_called()
+        assert first == second
+
+        with patch('pipper.bundler.create_wheel') as create_wheel:
+            create_wheel.side_effect = RuntimeError('Rebuilt')
+            with pytest.raises(RuntimeError):
+                bundler.bundle(
+                    package_directory,
+                    output_directory,
+                    compression='stored'
+                )
+            with pytest.raises(RuntimeError):
+                bundler.bundle(
+                    package_directory,
+                    output_directory,
+                    build_isolation=False
+                )
+
+        with open(os.path.join(package_directory, 'pipper.json'), 'w') as f:
+            f.write('{"dependencies": ["foo"]}')
+        source_hash = bundler.hash_source_tree(package_directory)
+        assert bundler.find_existing_bundle(
+            output_directory,
+            source_hash
+        ) is None
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_zip_bundle_reproducible():
+    """Should create identical bytes with per-member compression."""
+    directory = tempfile.mkdtemp()
+    bundle_directory = os.path.join(directory, 'bundle')
+    os.makedirs(bundle_directory)
+    data = dict(package_name='foo', safe_version='v0-0-1')
+
+    try:
+        with open(os.path.join(bundle_directory, 'package.whl'), 'wb') as f:
+            f.write(b'WHEEL' * 100)
+        with open(os.path.join(bundle_directory, 'package.meta'), 'w') as f:
+            f.write('{"name": "foo"}' * 100)
+
+        contents = []
+        for index in range(2):
+            for filename in os.listdir(bundle_directory):
+                os.utime(
+                    os.path.join(bundle_directory, filename),
+                    (1e9 + index * 1000, 1e9 + index * 1000)
+                )
+            output = os.path.join(directory, str(index))
+            os.makedirs(output)
+            path = bundler.zip_bundle(bundle_directory, output, data)
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+
+        assert contents[0] == contents[1]
+        with zipfile.ZipFile(path) as zipper:
+            infos = zipper.infolist()
+        assert ['package.meta', 'package.whl'] == [i.filename for i in infos]
+        assert zipfile.ZIP_DEFLATED == infos[0].compress_type
+        assert zipfile.ZIP_STORED == infos[1].compress_type
+        assert (1980, 1, 1, 0, 0, 0) == infos[0].date_time
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_create_meta_timestamp():
+    """
+    Should record the modification time of the newest source file as the
+    bundle timestamp unless a source date epoch is specified.
+    """
+    directory = tempfile.mkdtemp()
+    data = dict(
+        package_name='foo',
+        wheel_name='foo-0.0.1-py3-none-any.whl',
+        version='0.0.1',
+        safe_version='v0-0-1'
+    )
+
+    try:
+        for filename, mtime in [('pipper.json', 1e9), ('setup.py', 2e9)]:
+            path = os.path.join(directory, filename)
+            with open(path, 'w') as f:
+                f.write('{}')
+            os.utime(path, (mtime, mtime))
+
+        with patch.dict(os.environ, {'SOURCE_DATE_EPOCH': ''}):
+            path = bundler.create_meta(directory, directory, data)
+        with open(path) as f:
+            first = json.load(f)['timestamp']
+        os.remove(path)
+
+        with patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '1500000000'}):
+            path = bundler.create_meta(directory, directory, data)
+        with open(path) as f:
+            second = json.load(f)['timestamp']
+    finally:
+        shutil.rmtree(directory)
+
+    assert '2033-05-18T03:33:20' == first
+    assert '2017-07-14T02:40:00' == second
@@ -0,0 +1,30 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from pipper import command
+from pipper.test import utils
+
+
+@patch('pipper.downloader.fetch_package')
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_download_many(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock,
+        fetch_package: MagicMock
+):
+    """Should resolve every package before downloading concurrently."""
+    calls = []
+    parse_package_id.side_effect = lambda env, pid: (
+        calls.append(('resolve', pid)) or dict(name=pid)
+    )
+    fetch_package.side_effect = lambda env, data: (
+        calls.append(('fetch', data['name']))
+        or dict(path='{}.pipper'.format(data['name']), size=10, elapsed=1)
+    )
+
+    command.run(['download', 'foo', 'bar', '--jobs=2'])
+
+    assert {'resolve'} == {kind for kind, _ in calls[:2]}
+    assert {'fetch'} == {kind for kind, _ in calls[2:]}
+    assert {'foo', 'bar'} == {name for _, name in calls[2:]}
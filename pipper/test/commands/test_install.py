@@ -1,7 +1,14 @@
+import io
+import json
+import os
+import subprocess
+import time
+import zipfile
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from pipper import command
+from pipper import installer
 from pipper.test import utils
 
 
@@ -13,3 +20,192 @@ def test_install(
 ):
     """..."""
     command.run(['install', 'foo'])
+
+
+def _make_node(name: str, dependencies: list = None) -> dict:
+    """..."""
+    return dict(
+        name=name,
+        package_id=name,
+        path='{}.pipper'.format(name),
+        dependencies=dependencies or []
+    )
+
+
+def test_install_levels():
+    """Should sort graph nodes so that dependencies install first."""
+    nodes = [
+        _make_node('app', ['lib-a', 'lib-b:1.0.0']),
+        _make_node('lib-a', ['lib-c']),
+        _make_node('lib-b'),
+        _make_node('lib-c'),
+    ]
+    levels = [
+        [node['name'] for node in level]
+        for level in installer.to_install_levels(nodes)
+    ]
+    assert [['lib-b', 'lib-c'], ['lib-a'], ['app']] == levels
+
+
+def test_install_levels_cycle():
+    """Should break dependency cycles in discovery order."""
+    nodes = [_make_node('a', ['b']), _make_node('b', ['a'])]
+    levels = [
+        [node['name'] for node in level]
+        for level in installer.to_install_levels(nodes)
+    ]
+    assert [['a'], ['b']] == levels
+
+
+@patch('pipper.installer.install_pipper_file')
+@patch('pipper.installer.fetch_node')
+@utils.PatchSession()
+def test_install_jobs(
+        boto_mocks: utils.BotoMocks,
+        fetch_node: MagicMock,
+        install_pipper_file: MagicMock
+):
+    """Should resolve the graph before installing dependencies first."""
+    graph = {
+        'foo': _make_node('foo', ['bar']),
+        'bar': _make_node('bar'),
+    }
+    fetch_node.side_effect = lambda env, directory, pid, *args: graph[pid]
+
+    command.run(['install', 'foo', '--jobs=4'])
+
+    assert 2 == fetch_node.call_count
+    installed = [
+        c[1]['local_source_path']
+        for c in install_pipper_file.call_args_list
+    ]
+    assert ['bar.pipper', 'foo.pipper'] == installed
+
+
+@patch('pipper.installer.install_pipper_file')
+@patch('pipper.installer.fetch_node')
+@utils.PatchSession()
+def test_install_jobs_sequential(
+        boto_mocks: utils.BotoMocks,
+        fetch_node: MagicMock,
+        install_pipper_file: MagicMock
+):
+    """Should never run pip for independent packages at the same time."""
+    running = []
+    overlapped = []
+
+    def install(**kwargs):
+        overlapped.append(bool(running))
+        running.append(kwargs['local_source_path'])
+        time.sleep(0.01)
+        running.remove(kwargs['local_source_path'])
+
+    fetch_node.side_effect = lambda env, directory, pid, *args: (
+        _make_node(pid)
+    )
+    install_pipper_file.side_effect = install
+
+    command.run(['install', 'foo', 'bar', 'baz', '--jobs=4'])
+
+    assert [False, False, False] == overlapped
+
+
+@patch('pipper.wrapper.install_wheel')
+@patch('pipper.wrapper.install_requirements')
+@patch('pipper.installer.extract_wheel')
+@patch('pipper.installer.fetch_node')
+@utils.PatchSession()
+def test_install_batch(
+        boto_mocks: utils.BotoMocks,
+        fetch_node: MagicMock,
+        extract_wheel: MagicMock,
+        install_requirements: MagicMock,
+        install_wheel: MagicMock
+):
+    """Should install all wheels with a single pip invocation."""
+    graph = {
+        'foo': _make_node('foo', ['bar']),
+        'bar': _make_node('bar'),
+    }
+    fetch_node.side_effect = lambda env, directory, pid, *args: graph[pid]
+    extract_wheel.side_effect = lambda path, directory, use_store: {
+        'wheel_path': path.replace('.pipper', '.whl')
+    }
+
+    command.run(['install', 'foo', '--batch'])
+
+    install_requirements.assert_called_once()
+    requirements = install_requirements.call_args[1]['requirements']
+    assert ['bar.whl', 'foo.whl'] == requirements
+    install_wheel.assert_not_called()
+
+
+@patch('pipper.wrapper.install_wheel')
+@patch('pipper.wrapper.install_requirements')
+@patch('pipper.installer.extract_wheel')
+@patch('pipper.installer.fetch_node')
+@utils.PatchSession()
+def test_install_batch_fallback(
+        boto_mocks: utils.BotoMocks,
+        fetch_node: MagicMock,
+        extract_wheel: MagicMock,
+        install_requirements: MagicMock,
+        install_wheel: MagicMock
+):
+    """Should install wheels individually when the batch install fails."""
+    fetch_node.side_effect = lambda env, directory, pid, *args: (
+        _make_node(pid)
+    )
+    extract_wheel.side_effect = lambda path, directory, use_store: {
+        'wheel_path': path.replace('.pipper', '.whl')
+    }
+    install_requirements.side_effect = subprocess.CalledProcessError(1, [])
+
+    command.run(['install', 'foo', 'bar', '--batch'])
+
+    installed = [c[1]['wheel_path'] for c in install_wheel.call_args_list]
+    assert ['foo.whl', 'bar.whl'] == installed
+
+
+@patch('pipper.wrapper.install_wheel')
+@patch('pipper.installer.resolve_install')
+@utils.PatchSession()
+def test_install_streaming(
+        boto_mocks: utils.BotoMocks,
+        resolve_install: MagicMock,
+        install_wheel: MagicMock
+):
+    """Should install from the S3 body writing only the named wheel."""
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, 'w') as zipper:
+        zipper.writestr('package.meta', json.dumps({
+            'wheel_name': 'foo-1.0.0-py3-none-any.whl',
+            'dependencies': []
+        }))
+        zipper.writestr('package.whl', b'WHEEL')
+
+    boto_mocks.s3_client.get_object.side_effect = None
+    boto_mocks.s3_client.get_object.return_value = {
+        'Body': io.BytesIO(bundle.getvalue())
+    }
+    resolve_install.return_value = dict(
+        name='foo',
+        version='1.0.0',
+        bucket='bucket',
+        key='pipper/foo/v1-0-0.pipper'
+    )
+
+    def check_wheel(wheel_path: str, **kwargs):
+        assert 'foo-1.0.0-py3-none-any.whl' == os.path.basename(wheel_path)
+        assert [os.path.basename(wheel_path)] == os.listdir(
+            os.path.dirname(wheel_path)
+        )
+        with open(wheel_path, 'rb') as f:
+            assert b'WHEEL' == f.read()
+
+    install_wheel.side_effect = check_wheel
+
+    command.run(['install', 'foo', '--no-cache'])
+
+    install_wheel.assert_called_once()
+    boto_mocks.s3_client.download_file.assert_not_called()
@@ -0,0 +1,198 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from pipper import command
+from pipper import locker
+from pipper.test import utils
+
+
+def _make_data(package_id: str, **kwargs) -> dict:
+    """..."""
+    name = package_id.split(':')[0]
+    return dict(
+        name=name,
+        version='1.0.0',
+        bucket='FAKE',
+        key='pipper/{}/v1-0-0.pipper'.format(name)
+    )
+
+
+def _make_head(key: str, dependencies: list) -> dict:
+    """..."""
+    name = key.split('/')[1]
+    return dict(
+        ContentLength=42,
+        ETag='"{}"'.format(name),
+        Metadata={
+            'package': json.dumps(dict(
+                name=name,
+                version='1.0.0',
+                safe_version='v1-0-0',
+                dependencies=dependencies,
+                wheel_sha256='wheel-{}'.format(name)
+            )),
+            'sha256': 'bundle-{}'.format(name)
+        }
+    )
+
+
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_lock(boto_mocks: utils.BotoMocks, parse_package_id: MagicMock):
+    """Should lock the transitive dependency graph with exact bundles."""
+    parse_package_id.side_effect = lambda env, pid, **kwargs: _make_data(pid)
+    graph = {'foo': ['bar:1.*'], 'bar': []}
+    boto_mocks.s3_client.head_object.side_effect = lambda **kwargs: (
+        _make_head(kwargs['Key'], graph[kwargs['Key'].split('/')[1]])
+    )
+    directory = tempfile.mkdtemp()
+    lock_path = os.path.join(directory, 'pipper.lock')
+
+    try:
+        command.run(['lock', 'foo', '-o', lock_path])
+        lock = locker.load(lock_path)
+    finally:
+        os.remove(lock_path)
+        os.rmdir(directory)
+
+    assert ['foo'] == lock['dependencies']
+    assert {'foo', 'bar'} == set(lock['packages'].keys())
+    bar = lock['packages']['bar']
+    assert 'pipper/bar/v1-0-0.pipper' == bar['key']
+    assert '"bar"' == bar['etag']
+    assert 42 == bar['size']
+    assert 'bundle-bar' == bar['sha256']
+    assert 'wheel-bar' == bar['wheel_sha256']
+    assert ['bar:1.*'] == lock['packages']['foo']['dependencies']
+    assert parse_package_id.call_args[1]['use_latest_version']
+
+
+def _make_bundle(name: str) -> bytes:
+    """..."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as zipper:
+        zipper.writestr('package.meta', json.dumps(dict(
+            name=name,
+            wheel_sha256='wheel-{}'.format(name)
+        )))
+    return output.getvalue()
+
+
+def _write_lock(directory: str, corrupt: str = None) -> str:
+    """..."""
+    packages = {
+        name: dict(
+            _make_data(name),
+            etag='"{}"'.format(name),
+            size=42,
+            sha256=hashlib.sha256(_make_bundle(name)).hexdigest(),
+            wheel_sha256='wheel-{}'.format(name),
+            dependencies=dependencies
+        )
+        for name, dependencies in [('foo', ['bar']), ('bar', [])]
+    }
+    if corrupt:
+        packages['bar'][corrupt] = 'corrupt'
+
+    with open(os.path.join(directory, 'pipper.json'), 'w') as f:
+        json.dump({'dependencies': ['foo']}, f)
+    return locker.save(
+        locker.get_lock_path(os.path.join(directory, 'pipper.json')),
+        dict(lock_version=1, dependencies=['foo'], packages=packages)
+    )
+
+
+def _run_locked(boto_mocks: utils.BotoMocks, corrupt: str = None):
+    """..."""
+    def download_file(Key: str, Filename: str, **kwargs):
+        with open(Filename, 'wb') as f:
+            f.write(_make_bundle(Key.split('/')[1]))
+
+    boto_mocks.s3_client.download_file.side_effect = download_file
+    boto_mocks.s3_client.head_object.side_effect = lambda Key, **kwargs: dict(
+        ETag='"{}"'.format(Key.split('/')[1])
+    )
+    directory = tempfile.mkdtemp()
+    _write_lock(directory, corrupt)
+    configs_path = os.path.join(directory, 'pipper.json')
+
+    try:
+        command.run(['install', '-i', configs_path, '--locked', '--no-cache'])
+    finally:
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+
+@patch('pipper.wrapper.update_required')
+@patch('pipper.downloader.parse_package_id')
+@patch('pipper.installer.install_pipper_file')
+@utils.PatchSession()
+def test_install_locked(
+        boto_mocks: utils.BotoMocks,
+        install_pipper_file: MagicMock,
+        parse_package_id: MagicMock,
+        update_required: MagicMock
+):
+    """Should install locked bundles without resolving any versions."""
+    update_required.return_value = True
+
+    _run_locked(boto_mocks)
+
+    parse_package_id.assert_not_called()
+    boto_mocks.s3_client.list_objects_v2.assert_not_called()
+    checked = [
+        c[1]['Key'] for c in boto_mocks.s3_client.head_object.call_args_list
+    ]
+    assert 'pipper/foo/v1-0-0.pipper' in checked
+    installed = [
+        os.path.basename(c[1]['local_source_path'])
+        for c in install_pipper_file.call_args_list
+    ]
+    assert ['bar-1.0.0.pipper', 'foo-1.0.0.pipper'] == installed
+
+
+@pytest.mark.parametrize('corrupt', ['sha256', 'wheel_sha256'])
+@patch('pipper.wrapper.update_required')
+@patch('pipper.installer.install_pipper_file')
+def test_install_locked_digest(
+        install_pipper_file: MagicMock,
+        update_required: MagicMock,
+        corrupt: str
+):
+    """Should abort when a bundle does not match its locked digests."""
+    update_required.return_value = True
+
+    @utils.PatchSession()
+    def run_locked(boto_mocks: utils.BotoMocks):
+        with pytest.raises(ValueError):
+            _run_locked(boto_mocks, corrupt)
+
+    run_locked()
+    install_pipper_file.assert_not_called()
+
+
+@utils.PatchSession()
+def test_install_locked_outdated(boto_mocks: utils.BotoMocks):
+    """Should refuse lock files created from other dependencies."""
+    directory = tempfile.mkdtemp()
+    _write_lock(directory)
+    configs_path = os.path.join(directory, 'pipper.json')
+    with open(configs_path, 'w') as f:
+        json.dump({'dependencies': ['foo', 'baz']}, f)
+
+    try:
+        with pytest.raises(ValueError):
+            command.run(['install', '-i', configs_path, '--locked'])
+    finally:
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
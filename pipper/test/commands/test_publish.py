@@ -0,0 +1,181 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from pipper import command
+from pipper.test import utils
+
+
+def _make_bundle(
+        directory: str,
+        name: str = 'foo',
+        version: str = '0.0.1'
+) -> str:
+    """..."""
+    safe_version = 'v{}'.format(version.replace('.', '-'))
+    path = os.path.join(directory, '{}-{}.pipper'.format(name, safe_version))
+    with zipfile.ZipFile(path, 'w') as zipper:
+        zipper.writestr('package.meta', json.dumps({
+            'name': name,
+            'version': version,
+            'safe_version': safe_version,
+            'timestamp': '2020-01-01T00:00:00',
+            'wheel_name': '{}-{}-py3-none-any.whl'.format(name, version),
+        }))
+        zipper.writestr('package.whl', b'WHEEL')
+    return path
+
+
+@patch('pipper.s3.list_objects')
+@utils.PatchSession()
+def test_publish_multipart(
+        boto_mocks: utils.BotoMocks,
+        list_objects: MagicMock
+):
+    """Should publish with a tuned multipart upload and keep metadata."""
+    list_objects.return_value = utils.make_list_objects_response()
+    boto_mocks.s3_client.head_object.side_effect = [
+        utils.make_client_error('404', 'HeadObject'),
+        {'ETag': '"abc-2"'}
+    ]
+    directory = tempfile.mkdtemp()
+
+    try:
+        path = _make_bundle(directory)
+        command.run([
+            'publish', path,
+            '--acl=bucket-owner-full-control',
+            '--part-size=8',
+            '--threads=2'
+        ])
+    finally:
+        shutil.rmtree(directory)
+
+    kwargs = boto_mocks.s3_client.upload_fileobj.call_args[1]
+    assert 'pipper/foo/v0-0-1.pipper' == kwargs['Key']
+    assert 'bucket-owner-full-control' == kwargs['ExtraArgs']['ACL']
+    assert 'application/zip' == kwargs['ExtraArgs']['ContentType']
+    metadata = kwargs['ExtraArgs']['Metadata']
+    assert 'foo' == json.loads(metadata['package'])['name']
+    assert 'v0-0-1' == metadata['safe_version']
+    assert 8 * 1024 * 1024 == kwargs['Config'].multipart_chunksize
+    assert 2 == kwargs['Config'].max_concurrency
+    manifests = {
+        c[1]['Key']: c[1]['ACL']
+        for c in boto_mocks.s3_client.put_object.call_args_list
+    }
+    assert 'bucket-owner-full-control' == manifests['pipper/foo/index.json']
+
+
+@patch('pipper.versioning.manifest.update_package')
+@patch('pipper.s3.list_objects')
+@utils.PatchSession()
+def test_publish_all(
+        boto_mocks: utils.BotoMocks,
+        list_objects: MagicMock,
+        update_package: MagicMock
+):
+    """Should list each package once and upload only missing bundles."""
+    def list_package(prefix: str, **kwargs) -> dict:
+        existing = {'pipper/foo/': [{'Key': 'pipper/foo/v0-0-1.pipper'}]}
+        return utils.make_list_objects_response(existing.get(prefix))
+
+    list_objects.side_effect = lambda s3_client, bucket, prefix, **kwargs: (
+        list_package(prefix, **kwargs)
+    )
+    boto_mocks.s3_client.head_object.side_effect = None
+    boto_mocks.s3_client.head_object.return_value = {'ETag': '"abc"'}
+    directory = tempfile.mkdtemp()
+
+    try:
+        _make_bundle(directory, 'foo', '0.0.1')
+        _make_bundle(directory, 'foo', '0.0.2')
+        _make_bundle(directory, 'bar', '1.0.0')
+        command.run(['publish', directory, '--all', '--jobs=3'])
+    finally:
+        shutil.rmtree(directory)
+
+    listed = sorted(c[1]['prefix'] for c in list_objects.call_args_list)
+    assert ['pipper/bar/', 'pipper/foo/'] == listed
+
+    uploaded = sorted(
+        c[1]['Key'] for c in boto_mocks.s3_client.upload_fileobj.call_args_list
+    )
+    assert ['pipper/bar/v1-0-0.pipper', 'pipper/foo/v0-0-2.pipper'] == uploaded
+
+    indexed = sorted(
+        (c[1]['package_name'], len(c[1]['entries']))
+        for c in update_package.call_args_list
+    )
+    assert [('bar', 1), ('foo', 1)] == indexed
+
+
+@patch('pipper.versioning.manifest.update_package')
+@patch('pipper.s3.list_objects')
+@utils.PatchSession()
+def test_publish_all_failure(
+        boto_mocks: utils.BotoMocks,
+        list_objects: MagicMock,
+        update_package: MagicMock
+):
+    """Should index the uploaded bundles before raising failed uploads."""
+    def upload_fileobj(Fileobj, Bucket: str, Key: str, **kwargs):
+        if Key == 'pipper/foo/v0-0-2.pipper':
+            raise IOError('Upload failed')
+
+    list_objects.return_value = utils.make_list_objects_response()
+    boto_mocks.s3_client.upload_fileobj.side_effect = upload_fileobj
+    boto_mocks.s3_client.head_object.side_effect = None
+    boto_mocks.s3_client.head_object.return_value = {'ETag': '"abc"'}
+    directory = tempfile.mkdtemp()
+
+    try:
+        _make_bundle(directory, 'foo', '0.0.1')
+        _make_bundle(directory, 'foo', '0.0.2')
+        _make_bundle(directory, 'bar', '1.0.0')
+        with pytest.raises(RuntimeError):
+            command.run(['publish', directory, '--all', '--jobs=3'])
+    finally:
+        shutil.rmtree(directory)
+
+    indexed = sorted(
+        (c[1]['package_name'], len(c[1]['entries']))
+        for c in update_package.call_args_list
+    )
+    assert [('bar', 1), ('foo', 1)] == indexed
+
+
+@patch('pipper.versioning.manifest.update_package')
+@utils.PatchSession()
+def test_publish_unindexed(
+        boto_mocks: utils.BotoMocks,
+        update_package: MagicMock
+):
+    """Should add published bundles missing from the manifest to it."""
+    contents = json.dumps({'package': 'foo', 'versions': {}})
+    boto_mocks.s3_client.get_object.side_effect = lambda **kwargs: dict(
+        Body=io.BytesIO(contents.encode()),
+        ETag='"abc"'
+    )
+    boto_mocks.s3_client.head_object.side_effect = None
+    boto_mocks.s3_client.head_object.return_value = {
+        'ContentLength': 42,
+        'ETag': '"abc"'
+    }
+    directory = tempfile.mkdtemp()
+
+    try:
+        command.run(['publish', _make_bundle(directory)])
+    finally:
+        shutil.rmtree(directory)
+
+    boto_mocks.s3_client.upload_fileobj.assert_not_called()
+    entries = update_package.call_args[1]['entries']
+    assert ['pipper/foo/v0-0-1.pipper'] == [e['key'] for e in entries]
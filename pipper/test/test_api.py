@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import io
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from pipper import api
+from pipper import output
+from pipper.test import utils
+
+
+def _make_data(env, package_id: str, **kwargs) -> dict:
+    """Resolves the package identifier and writes pipper output."""
+    output.echo('[PACKAGE]:', package_id)
+    return dict(
+        name=package_id.split(':')[0],
+        version='1.0.0',
+        unstable=env.args.get('unstable')
+    )
+
+
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_resolve(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock
+):
+    """Should return the resolved data without printing anything."""
+    parse_package_id.side_effect = _make_data
+    client = api.Client(bucket='FAKE')
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        result = client.resolve('foo:1.*', include_prereleases=True)
+        many = client.resolve_many(['foo', 'bar'])
+
+    assert 'foo' == result['name']
+    assert result['unstable']
+    assert ['foo', 'bar'] == [r['name'] for r in many]
+    assert '' == output.getvalue()
+    assert 1 == boto_mocks.session.client.call_count
+    assert ('s3',) == boto_mocks.session.client.call_args[0]
+
+
+@patch('pipper.wrapper.status')
+@patch('pipper.installer.install')
+@utils.PatchSession()
+def test_install(
+        boto_mocks: utils.BotoMocks,
+        install: MagicMock,
+        status: MagicMock
+):
+    """Should return the installed version of each package."""
+    status.side_effect = lambda name, target_directory: (
+        MagicMock(version='1.0.0') if name == 'foo' else None
+    )
+
+    result = api.Client(bucket='FAKE').install(['foo:1.*', 'bar'])
+
+    assert {'foo': '1.0.0', 'bar': None} == result
+    assert 2 == install.call_count
+
+
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_resolve_verbose(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock
+):
+    """Should write the output of verbose clients to stdout."""
+    parse_package_id.side_effect = _make_data
+
+    with contextlib.redirect_stdout(io.StringIO()) as output_buffer:
+        api.Client(bucket='FAKE', verbose=True).resolve('foo')
+        print('host output')
+
+    assert '[PACKAGE]: foo' in output_buffer.getvalue()
+    assert 'host output' in output_buffer.getvalue()
+
+
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_resolve_host_output(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock
+):
+    """Should not hide output of the host application during calls."""
+    def resolve(env, package_id: str, **kwargs) -> dict:
+        print('host output')
+        return _make_data(env, package_id)
+
+    parse_package_id.side_effect = resolve
+
+    with contextlib.redirect_stdout(io.StringIO()) as output_buffer:
+        api.Client(bucket='FAKE').resolve('foo')
+
+    assert 'host output\n' == output_buffer.getvalue()
+
+
+@patch('pipper.installer.s3.key_exists')
+@patch('pipper.versioning.index.contains')
+@patch('pipper.wrapper.update_required')
+@patch('pipper.wrapper.status')
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_install_missing(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock,
+        status: MagicMock,
+        update_required: MagicMock,
+        contains: MagicMock,
+        key_exists: MagicMock
+):
+    """Should raise when a requested version is not available."""
+    parse_package_id.return_value = dict(
+        name='foo',
+        version='9.9.9',
+        bucket='FAKE',
+        key='pipper/foo/v9-9-9.pipper'
+    )
+    status.return_value = None
+    update_required.return_value = True
+    contains.return_value = False
+    key_exists.return_value = False
+
+    with pytest.raises(ValueError):
+        api.Client(bucket='FAKE', use_cache=False).install(['foo:9.9.9'])
+
+
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_async_resolve(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock
+):
+    """Should resolve packages concurrently from an event loop."""
+    parse_package_id.side_effect = _make_data
+    names = ['package-{}'.format(i) for i in range(20)]
+
+    async def resolve_all() -> list:
+        async with api.AsyncClient(bucket='FAKE', max_workers=4) as client:
+            return await asyncio.gather(*[client.resolve(n) for n in names])
+
+    loop = asyncio.new_event_loop()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        results = loop.run_until_complete(resolve_all())
+    loop.close()
+
+    assert names == [r['name'] for r in results]
+    assert '' == output.getvalue()
+    assert 1 == boto_mocks.session.client.call_count
+    assert ('s3',) == boto_mocks.session.client.call_args[0]
@@ -1,5 +1,11 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
 import pytest
 
+from pipper import command
+from pipper.test import utils
+
 
 scenarios = [
     ('72s', 72),
@@ -16,4 +22,29 @@ scenarios = [
 
 @pytest.mark.parametrize('age,total_seconds')
 def to_time_delta(age: str, total_seconds: int):
-    """Should convert the age to the expected number of seconds"""
\ No newline at end of file
+    """Should convert the age to the expected number of seconds"""
+
+
+@patch('pipper.versioning.index.prefetch')
+@patch('pipper.downloader.parse_package_id')
+@utils.PatchSession()
+def test_create_many_urls(
+        boto_mocks: utils.BotoMocks,
+        parse_package_id: MagicMock,
+        prefetch: MagicMock
+):
+    """Should resolve all packages in one pass and then sign every URL."""
+    parse_package_id.side_effect = lambda env, package_id, **kwargs: dict(
+        name=package_id.split(':')[0],
+        key='pipper/{}.pipper'.format(package_id.split(':')[0])
+    )
+    boto_mocks.s3_client.generate_presigned_url.side_effect = (
+        lambda **kwargs: 'https://{}'.format(kwargs['Params']['Key'])
+    )
+
+    command.run(['authorize', 'foo', 'bar:1.*', '--quiet'])
+
+    prefetch.assert_called_once()
+    assert ['foo', 'bar'] == prefetch.call_args[0][1]
+    assert 2 == boto_mocks.s3_client.generate_presigned_url.call_count
+    boto_mocks.s3_client.list_objects_v2.assert_not_called()
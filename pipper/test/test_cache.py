@@ -0,0 +1,156 @@
+import io
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from pipper import cache
+from pipper import command
+from pipper import s3
+from pipper.test import utils
+
+
+def _make_client(contents: bytes = b'bundle', etag: str = '"abc"'):
+    """..."""
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = lambda **kwargs: dict(
+        Body=io.BytesIO(contents),
+        ETag=etag
+    )
+    return s3_client
+
+
+def test_fetch_bundle():
+    """Should download a bundle once and reuse it while it is fresh."""
+    s3_client = _make_client()
+    with utils.PatchCache():
+        path = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+        again = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+        assert path == again
+        assert 1 == s3_client.get_object.call_count
+        with open(path, 'rb') as f:
+            assert b'bundle' == f.read()
+
+
+def test_fetch_bundle_revalidate():
+    """Should revalidate stale bundles with a conditional request."""
+    s3_client = _make_client()
+    with utils.PatchCache():
+        path = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+        s3_client.get_object.side_effect = ClientError(
+            {'Error': {'Code': '304'}},
+            'GetObject'
+        )
+        again = cache.fetch_bundle(
+            s3_client,
+            'FAKE',
+            'pipper/a/v1.pipper',
+            max_age=0
+        )
+        assert path == again
+        kwargs = s3_client.get_object.call_args[1]
+        assert '"abc"' == kwargs['IfNoneMatch']
+
+
+def test_fetch_bundle_ranged():
+    """Should download large bundles through the transfer manager."""
+    s3_client, stubber = utils.make_stubbed_client()
+    stubber.add_response(
+        'get_object',
+        {
+            'Body': StreamingBody(io.BytesIO(b''), 0),
+            'ContentLength': s3.PART_SIZE,
+            'ETag': '"abc"'
+        },
+        {'Bucket': 'FAKE', 'Key': 'pipper/a/v1.pipper'}
+    )
+    utils.add_download_responses(
+        stubber,
+        'FAKE',
+        'pipper/a/v1.pipper',
+        b'large bundle',
+        '"abc"'
+    )
+
+    with utils.PatchCache():
+        path = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+        with open(path, 'rb') as f:
+            assert b'large bundle' == f.read()
+
+    stubber.assert_no_pending_responses()
+
+
+def test_prune():
+    """Should evict the least recently used bundles first."""
+    s3_client = _make_client(contents=b'0123456789')
+    with utils.PatchCache():
+        old = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+        new = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/b/v1.pipper')
+        cache.update_entry('FAKE', 'pipper/a/v1.pipper', last_used=0)
+
+        removed = cache.prune(max_size=15)
+
+        assert ['pipper/a/v1.pipper'] == [entry['key'] for entry in removed]
+        assert not os.path.exists(old)
+        assert os.path.exists(new)
+
+
+def test_deferred_pruning():
+    """Should only prune once all bundles of an operation were fetched."""
+    s3_client = _make_client(contents=b'0123456789')
+    with utils.PatchCache(), patch('pipper.cache.MAX_SIZE', 15):
+        with cache.deferred_pruning():
+            first = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/a/v1.pipper')
+            with cache.deferred_pruning():
+                second = cache.fetch_bundle(
+                    s3_client,
+                    'FAKE',
+                    'pipper/b/v1.pipper'
+                )
+            assert os.path.exists(first) and os.path.exists(second)
+        assert os.path.exists(first) and os.path.exists(second)
+
+        third = cache.fetch_bundle(s3_client, 'FAKE', 'pipper/c/v1.pipper')
+        assert os.path.exists(third)
+        assert 1 == len(cache.list_entries())
+
+
+def test_locked_across_processes():
+    """Should hold a file lock that other processes cannot acquire."""
+    script = '\n'.join([
+        'import fcntl, sys',
+        'f = open(sys.argv[1], "a+")',
+        'try:',
+        '    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)',
+        'except OSError:',
+        '    sys.exit(1)',
+    ])
+    with utils.PatchCache():
+        with cache.locked():
+            path = cache.get_path('cache.lock')
+            held = subprocess.run([sys.executable, '-c', script, path])
+        released = subprocess.run([sys.executable, '-c', script, path])
+
+    assert 1 == held.returncode
+    assert 0 == released.returncode
+
+
+@utils.PatchSession()
+def test_cache_commands(boto_mocks: utils.BotoMocks):
+    """Should list and clear the cached bundles."""
+    boto_mocks.s3_client.get_object.side_effect = (
+        _make_client().get_object.side_effect
+    )
+    path = cache.fetch_bundle(
+        boto_mocks.s3_client,
+        'FAKE',
+        'pipper/a/v1.pipper'
+    )
+    command.run(['cache', 'list'])
+    command.run(['cache', 'clear'])
+    assert not os.path.exists(path)
+    assert [] == cache.list_entries()
@@ -0,0 +1,229 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from pipper import cache
+from pipper import downloader
+from pipper.test import utils
+
+WHEEL = b'WHEEL' * 100
+
+
+def _make_bundle(version: str, digest: str = None) -> io.BytesIO:
+    """..."""
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, 'w') as zipper:
+        zipper.writestr('package.meta', json.dumps({
+            'name': 'foo',
+            'version': version,
+            'wheel_name': 'foo-1.0.0-py3-none-any.whl',
+            'wheel_sha256': digest or hashlib.sha256(WHEEL).hexdigest()
+        }))
+        zipper.writestr('package.whl', WHEEL)
+    bundle.seek(0)
+    return bundle
+
+
+def test_extract_wheel_verified():
+    """Should extract a wheel that matches the bundle digest."""
+    directory = tempfile.mkdtemp()
+    try:
+        result = downloader.extract_wheel(_make_bundle('1.0.0'), directory)
+        with open(result['wheel_path'], 'rb') as f:
+            assert WHEEL == f.read()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_extract_wheel_mismatch():
+    """Should remove the wheel and raise if the digest does not match."""
+    directory = tempfile.mkdtemp()
+    try:
+        with pytest.raises(ValueError):
+            downloader.extract_wheel(_make_bundle('1.0.0', 'abc'), directory)
+        assert [] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_extract_to_store():
+    """Should store identical wheels from different bundles once."""
+    with utils.PatchCache():
+        first = downloader.extract_to_store(_make_bundle('1.0.0'))
+        second = downloader.extract_to_store(_make_bundle('1.0.1'))
+
+        assert first['wheel_path'] == second['wheel_path']
+        assert '1.0.1' == second['metadata']['version']
+        wheels = cache.list_wheel_entries()
+        assert 1 == len(wheels)
+        assert len(WHEEL) == wheels[0]['size']
+
+        cache.prune(max_size=0)
+        assert not os.path.exists(first['wheel_path'])
+        assert [] == cache.list_wheel_entries()
+
+
+@pytest.mark.parametrize('digest,is_valid', [
+    (None, True),
+    ('abc', False),
+])
+@patch('pipper.downloader.save')
+def test_fetch_package_verified(save: MagicMock, digest: str, is_valid: bool):
+    """
+    Should verify downloaded bundles that are not extracted and remove them
+    if their wheel does not match the bundle digest.
+    """
+    def write_bundle(url: str, path: str):
+        with open(path, 'wb') as f:
+            f.write(_make_bundle('1.0.0', digest).read())
+
+    save.side_effect = write_bundle
+    directory = tempfile.mkdtemp()
+    env = MagicMock()
+    env.args = {'save_directory': directory}
+    data = {'name': 'foo', 'version': '1.0.0', 'url': 'https://fake.url'}
+
+    try:
+        if is_valid:
+            result = downloader.fetch_package(env, data)
+            assert os.path.exists(result['path'])
+        else:
+            with pytest.raises(ValueError):
+                downloader.fetch_package(env, data)
+            assert [] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+def _make_response(
+        status_code: int,
+        chunks: list,
+        headers: dict = None
+) -> MagicMock:
+    """..."""
+    def iter_content(chunk_size: int):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {'ETag': '"v1"'}
+    response.iter_content.side_effect = iter_content
+    return response
+
+
+def _write_partial(path: str, contents: bytes, etag: str = None):
+    """..."""
+    with open('{}.partial'.format(path), 'wb') as f:
+        f.write(contents)
+    if etag:
+        with open('{}.partial.etag'.format(path), 'w') as f:
+            f.write(etag)
+
+
+@patch('pipper.downloader.time.sleep')
+@patch('pipper.downloader.get_http_session')
+def test_save_resume(get_http_session: MagicMock, sleep: MagicMock):
+    """Should resume partial and interrupted downloads with Range requests."""
+    session = get_http_session.return_value
+    session.get.side_effect = [
+        _make_response(206, [b'def', requests.ConnectionError()]),
+        _make_response(206, [b'ghi']),
+    ]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'foo.pipper')
+
+    try:
+        _write_partial(path, b'abc', '"v1"')
+
+        downloader.save('https://fake.url/foo.pipper', path)
+
+        with open(path, 'rb') as f:
+            assert b'abcdefghi' == f.read()
+        ranges = [c[1]['headers'] for c in session.get.call_args_list]
+        assert [
+            {'Range': 'bytes=3-', 'If-Range': '"v1"'},
+            {'Range': 'bytes=6-', 'If-Range': '"v1"'}
+        ] == ranges
+        assert ['foo.pipper'] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+@patch('pipper.downloader.get_http_session')
+def test_save_error(get_http_session: MagicMock):
+    """Should raise instead of saving error responses."""
+    session = get_http_session.return_value
+    session.get.return_value = _make_response(403, [b'Access Denied'])
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'foo.pipper')
+
+    try:
+        with pytest.raises(IOError):
+            downloader.save('https://fake.url/foo.pipper', path)
+        assert [] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+@pytest.mark.parametrize('etag, response, expected', [
+    # The remote file changed, so If-Range returns the complete file.
+    ('"v1"', _make_response(200, [b'xyz1'], {'ETag': '"v2"'}), b'xyz1'),
+    # The partial file was complete before it was moved into place.
+    (
+        '"v1"',
+        _make_response(416, [], {'Content-Range': 'bytes */3'}),
+        b'abc'
+    ),
+    # Partial files without an ETag cannot be validated and are replaced.
+    (None, _make_response(200, [b'xyz1']), b'xyz1'),
+])
+@patch('pipper.downloader.get_http_session')
+def test_save_stale_partial(
+        get_http_session: MagicMock,
+        etag: str,
+        response: MagicMock,
+        expected: bytes
+):
+    """Should only append to partial files of the same remote file."""
+    get_http_session.return_value.get.return_value = response
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'foo.pipper')
+
+    try:
+        _write_partial(path, b'abc', etag)
+        downloader.save('https://fake.url/foo.pipper', path)
+
+        with open(path, 'rb') as f:
+            assert expected == f.read()
+        assert ['foo.pipper'] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+@patch('pipper.downloader.get_http_session')
+def test_save_error_partial(get_http_session: MagicMock):
+    """Should remove partial files when the download is rejected."""
+    session = get_http_session.return_value
+    session.get.return_value = _make_response(403, [b'Access Denied'])
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'foo.pipper')
+
+    try:
+        _write_partial(path, b'abc', '"v1"')
+        with pytest.raises(IOError):
+            downloader.save('https://fake.url/foo.pipper', path)
+        assert [] == os.listdir(directory)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,134 @@
+import os
+import shutil
+import stat
+import tempfile
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from botocore.credentials import Credentials
+from botocore.credentials import DeferredRefreshableCredentials
+
+from pipper import command
+from pipper import environment
+
+
+def _make_session(expires_in: float = None) -> MagicMock:
+    """..."""
+    def refresh() -> dict:
+        expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        return dict(
+            access_key='ACCESS',
+            secret_key='SECRET',
+            token='TOKEN',
+            expiry_time=expiry.isoformat()
+        )
+
+    session = MagicMock()
+    session.region_name = 'us-west-2'
+    session.profile_name = 'sso-profile'
+    session.get_credentials.return_value = (
+        DeferredRefreshableCredentials(refresh, 'sso')
+        if expires_in is not None else
+        Credentials('ACCESS', 'SECRET')
+    )
+    return session
+
+
+class PatchCredentials:
+    """Redirects the credentials cache into a temporary directory."""
+
+    def __enter__(self) -> str:
+        self.directory = tempfile.mkdtemp(prefix='pipper-test-credentials-')
+        self._patch = patch(
+            'pipper.environment.CREDENTIALS_DIRECTORY',
+            os.path.join(self.directory, 'credentials')
+        )
+        self._patch.start()
+        return self.directory
+
+    def __exit__(self, *args):
+        self._patch.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@patch('pipper.s3.session_from_profile_name')
+def test_get_session_cached(session_from_profile_name: MagicMock):
+    """Should reuse cached temporary credentials until they expire."""
+    session_from_profile_name.return_value = _make_session(3600)
+    args = {'aws_profile': 'sso-profile', 'quiet': True}
+
+    with PatchCredentials():
+        environment.get_session(args, {}, {})
+        path = environment.get_credentials_path(args, {}, {})
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        session = environment.get_session(args, {}, {})
+        other = environment.get_credentials_path({'quiet': True}, {}, {})
+
+    assert 1 == session_from_profile_name.call_count
+    assert 0o600 == mode
+    assert 'ACCESS' == session.get_credentials().access_key
+    assert 'us-west-2' == session.region_name
+    assert 3500 < environment.get_lifetime(
+        session_from_profile_name.return_value.get_credentials()
+    ) <= 3600
+    assert path != other
+
+
+@patch('pipper.s3.session_from_profile_name')
+def test_get_session_expired(session_from_profile_name: MagicMock):
+    """Should resolve credentials again when they expire soon."""
+    session_from_profile_name.return_value = _make_session(60)
+    args = {'aws_profile': 'sso-profile', 'quiet': True}
+
+    with PatchCredentials():
+        environment.get_session(args, {}, {})
+        environment.get_session(args, {}, {})
+
+    assert 2 == session_from_profile_name.call_count
+
+
+@patch('pipper.s3.session_from_profile_name')
+def test_get_session_static(session_from_profile_name: MagicMock):
+    """Should never cache long-lived credentials."""
+    session_from_profile_name.return_value = _make_session()
+    args = {'aws_profile': 'static-profile', 'quiet': True}
+
+    with PatchCredentials() as directory:
+        environment.get_session(args, {}, {})
+        assert not os.path.exists(os.path.join(directory, 'credentials'))
+
+
+@patch('pipper.environment.save_repositories')
+@patch('pipper.s3.create_client')
+@patch('pipper.environment.get_session')
+def test_client_options(
+        get_session: MagicMock,
+        create_client: MagicMock,
+        save_repositories: MagicMock
+):
+    """Should store client options and apply them to the S3 client."""
+    shared = {'repositories': {'repositories': {}, 'default': None}}
+    command.run(
+        [
+            'repository', 'add', 'mirror', '--default',
+            '--endpoint-url', 'http://localhost:9000',
+            '--max-pool-connections', '64',
+            '--accelerate'
+        ],
+        shared
+    )
+    shared['repositories'] = save_repositories.call_args[0][0]
+
+    env = environment.Environment(
+        {'action': 'info', 'region': 'eu-west-1', 'accelerate': False},
+        shared
+    )
+    assert env.s3_client is create_client.return_value
+    options = create_client.call_args[1]
+    assert 'http://localhost:9000' == options['endpoint_url']
+    assert 64 == options['max_pool_connections']
+    assert 'eu-west-1' == options['region']
+    assert options['accelerate'] is False
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from boto3.session import Session
+from botocore.exceptions import ClientError
+
+from pipper import s3
+from pipper.test import utils
+
+
+def test_key_exists():
+    """Should check existence with a HEAD request."""
+    s3_client = MagicMock()
+    assert s3.key_exists(s3_client, 'FAKE', 'pipper/foo/v0-0-1.pipper')
+    s3_client.head_object.assert_called_once_with(
+        Bucket='FAKE',
+        Key='pipper/foo/v0-0-1.pipper'
+    )
+    s3_client.list_objects.assert_not_called()
+
+
+def test_key_exists_missing():
+    """Should not exist when the HEAD request is not found."""
+    s3_client = utils.make_s3_client()
+    assert not s3.key_exists(s3_client, 'FAKE', 'pipper/foo/v0-0-1.pipper')
+
+
+def test_key_exists_error():
+    """Should raise errors that do not mean the object is missing."""
+    s3_client = MagicMock()
+    s3_client.head_object.side_effect = utils.make_client_error(
+        'SlowDown',
+        'HeadObject'
+    )
+    with pytest.raises(ClientError):
+        s3.key_exists(s3_client, 'FAKE', 'pipper/foo/v0-0-1.pipper')
+
+
+@patch('pipper.s3.list_objects')
+def test_keys_exist(list_objects: MagicMock):
+    """Should check many keys with one listing per directory."""
+    list_objects.side_effect = lambda s3_client, bucket, prefix, **kw: (
+        utils.make_list_objects_response([
+            {'Key': '{}v0-0-1.pipper'.format(prefix)}
+        ])
+    )
+
+    result = s3.keys_exist(MagicMock(), 'FAKE', [
+        'pipper/foo/v0-0-1.pipper',
+        'pipper/foo/v0-0-2.pipper',
+        'pipper/bar/v0-0-1.pipper',
+    ])
+
+    assert {
+        'pipper/foo/v0-0-1.pipper': True,
+        'pipper/foo/v0-0-2.pipper': False,
+        'pipper/bar/v0-0-1.pipper': True,
+    } == result
+    prefixes = sorted(c[1]['prefix'] for c in list_objects.call_args_list)
+    assert ['pipper/bar/', 'pipper/foo/'] == prefixes
+
+
+def test_create_client():
+    """Should create clients with the specified client options."""
+    session = Session(
+        aws_access_key_id='ACCESS',
+        aws_secret_access_key='SECRET',
+        region_name='us-east-1'
+    )
+
+    client = s3.create_client(
+        session,
+        region='eu-west-1',
+        endpoint_url='http://localhost:9000',
+        retry_mode='adaptive',
+        max_attempts=7,
+        read_timeout=5
+    )
+    default = s3.create_client(session)
+
+    assert 'eu-west-1' == client.meta.region_name
+    assert 'http://localhost:9000' == client.meta.endpoint_url
+    assert 'adaptive' == client.meta.config.retries['mode']
+    assert 5 == client.meta.config.read_timeout
+    assert s3.MAX_POOL_CONNECTIONS == default.meta.config.max_pool_connections
+    assert 'us-east-1' == default.meta.region_name
+
+
+def test_download_file_etag():
+    """Should download through the transfer manager and check the ETag."""
+    s3_client, stubber = utils.make_stubbed_client()
+    utils.add_download_responses(stubber, 'FAKE', 'a', b'bundle', '"abc"')
+    path = os.path.join(tempfile.mkdtemp(), 'a.pipper')
+
+    try:
+        s3.download_file(
+            s3_client, 'FAKE', 'a', path, threads=1, etag='"abc"'
+        )
+        with open(path, 'rb') as f:
+            assert b'bundle' == f.read()
+    finally:
+        shutil.rmtree(os.path.dirname(path))
+    stubber.assert_no_pending_responses()
+
+
+def test_download_file_etag_changed():
+    """Should remove the download when the object changed during it."""
+    s3_client, stubber = utils.make_stubbed_client()
+    utils.add_download_responses(
+        stubber, 'FAKE', 'a', b'bundle', '"abc"', final_etag='"def"'
+    )
+    path = os.path.join(tempfile.mkdtemp(), 'a.pipper')
+
+    try:
+        with pytest.raises(ValueError):
+            s3.download_file(
+                s3_client, 'FAKE', 'a', path, threads=1, etag='"abc"'
+            )
+        assert not os.path.exists(path)
+    finally:
+        shutil.rmtree(os.path.dirname(path))
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+#: Modules that are slow to import and must not be loaded by pipper
+#: commands that do not need them.
+HEAVY_MODULES = ['boto3', 'botocore', 'requests', 'semver', 'pkg_resources']
+
+
+def _import_times(*cli_args: str) -> dict:
+    """
+    Runs the pipper command in a new interpreter with import timing enabled
+    and returns the cumulative import time in microseconds of every module
+    that was imported. Only the names of the imported modules are asserted,
+    the timings themselves are measured by `benchmarks/startup.py`.
+    """
+    script = 'from pipper import command; command.run({})'.format(
+        repr(list(cli_args))
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        universal_newlines=True
+    )
+    assert 0 == result.returncode, result.stderr
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[12:].split('|')]
+        if parts[1].isdigit():
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+@pytest.mark.parametrize('cli_args', [
+    ['--version'],
+    ['repository', 'list'],
+])
+def test_startup_imports(cli_args: list):
+    """Should not import heavy dependencies the command does not need."""
+    times = _import_times(*cli_args)
+    assert 'pipper.command' in times
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    assert [] == loaded
+
+
+def test_startup_action_imports():
+    """Should only import the dependencies of the invoked action."""
+    times = _import_times('cache', 'list')
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    assert [] == loaded
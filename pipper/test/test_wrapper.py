@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from pipper import wrapper
+
+
+def _make_distribution(directory: str, name: str, version: str):
+    """..."""
+    path = os.path.join(directory, '{}-{}.dist-info'.format(name, version))
+    os.makedirs(path)
+    with open(os.path.join(path, 'METADATA'), 'w') as f:
+        f.write('Metadata-Version: 2.1\nName: {}\nVersion: {}\n'.format(
+            name,
+            version
+        ))
+
+
+def test_status():
+    """Should find installed distributions by their normalized names."""
+    wrapper.invalidate_installed_index()
+    result = wrapper.status('PyTest')
+    assert result is not None
+    assert 'pytest' == result.project_name.lower()
+    assert wrapper.status('pipper-fake-missing-package') is None
+
+
+def test_status_target_directory():
+    """Should only look in the target directory when one is specified."""
+    directory = tempfile.mkdtemp()
+    try:
+        _make_distribution(directory, 'fake_package', '1.2.3')
+        result = wrapper.status('fake-package', directory)
+        assert '1.2.3' == result.version
+        assert wrapper.status('pytest', directory) is None
+        assert not wrapper.update_required('fake-package', '1.2.3', directory)
+        assert wrapper.update_required('fake-package', 'v1-2-4', directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+@patch('pipper.wrapper.subprocess.run')
+def test_status_invalidated(run: MagicMock):
+    """Should rebuild the index only after pip installs something."""
+    directory = tempfile.mkdtemp()
+    try:
+        assert wrapper.status('fake-package', directory) is None
+        _make_distribution(directory, 'fake_package', '1.2.3')
+        assert wrapper.status('fake-package', directory) is None
+
+        wrapper.install_wheel('fake.whl', target_directory=directory)
+        assert '1.2.3' == wrapper.status('fake-package', directory).version
+    finally:
+        shutil.rmtree(directory)
@@ -1,8 +1,16 @@
+import io
 import typing
 import functools
+import shutil
+import tempfile
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+from boto3.session import Session
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
 
 class BotoMocks(typing.NamedTuple):
     """Data structure for boto3 mocked objects"""
@@ -27,11 +35,33 @@ class PatchSession:
         def patch_session(get_session: MagicMock, *args, **kwargs):
             boto_mocks = _create_boto_mocks()
             get_session.return_value = boto_mocks.session
-            test_function(boto_mocks, *args, **kwargs)
+            with PatchCache():
+                test_function(boto_mocks, *args, **kwargs)
 
         return patch_session
 
 
+class PatchCache:
+    """
+    Context manager that redirects the local pipper cache into a temporary
+    directory that is removed on exit.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self._patch = None
+
+    def __enter__(self) -> str:
+        self.directory = tempfile.mkdtemp(prefix='pipper-test-cache-')
+        self._patch = patch('pipper.cache.CACHE_DIRECTORY', self.directory)
+        self._patch.start()
+        return self.directory
+
+    def __exit__(self, *args):
+        self._patch.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
 def make_list_objects_response(
         contents: list = None,
         next_continuation_token: str = None
@@ -43,6 +73,71 @@ def make_list_objects_response(
     )
 
 
+def make_client_error(code: str, operation: str = 'GetObject'):
+    """..."""
+    return ClientError({'Error': {'Code': code}}, operation)
+
+
+def make_s3_client() -> MagicMock:
+    """
+    Creates a mocked S3 client for an empty bucket, in which objects such as
+    pipper manifests do not exist.
+    """
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = make_client_error('NoSuchKey')
+    s3_client.head_object.side_effect = make_client_error('404', 'HeadObject')
+    return s3_client
+
+
+def make_stubbed_client() -> typing.Tuple[typing.Any, Stubber]:
+    """
+    Creates a real S3 client with stubbed responses, so that requests are
+    still validated by botocore and the S3 transfer manager.
+    """
+    s3_client = Session(
+        aws_access_key_id='FAKE',
+        aws_secret_access_key='FAKE',
+        region_name='us-east-1'
+    ).client('s3')
+    stubber = Stubber(s3_client)
+    stubber.activate()
+    return s3_client, stubber
+
+
+def add_download_responses(
+        stubber: Stubber,
+        bucket: str,
+        key: str,
+        contents: bytes,
+        etag: str,
+        final_etag: str = None
+):
+    """
+    Stubs the responses of an S3 transfer manager download of a small
+    object followed by the HEAD request that checks its ETag.
+    """
+    params = {'Bucket': bucket, 'Key': key}
+    stubber.add_response(
+        'head_object',
+        {'ContentLength': len(contents), 'ETag': etag},
+        params
+    )
+    stubber.add_response(
+        'get_object',
+        {
+            'Body': StreamingBody(io.BytesIO(contents), len(contents)),
+            'ContentLength': len(contents),
+            'ETag': etag
+        },
+        params
+    )
+    stubber.add_response(
+        'head_object',
+        {'ContentLength': len(contents), 'ETag': final_etag or etag},
+        params
+    )
+
+
 def _get_client(
         mocked_clients: typing.Dict[str, MagicMock],
         identifier: str,
@@ -54,7 +149,7 @@ def _get_client(
 
 def _create_boto_mocks() -> BotoMocks:
     """..."""
-    s3_client = MagicMock()
+    s3_client = make_s3_client()
     session = MagicMock()
     session.client.side_effect = functools.partial(
         _get_client,
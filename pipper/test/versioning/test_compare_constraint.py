@@ -6,7 +6,10 @@ comparisons = [
     ('0.0.1', '0.0.2', -1),
     ('0.0.1', '0.0.1-alpha.1', -1),
     ('0.0.1', '0.0.1-alpha.1+build.2', -1),
-    ('0.0.1', '0.0.*', 0)
+    ('0.0.1', '0.0.*', 0),
+    ('1.5.3', '1.*.4', 0),
+    ('0.10.0', '0.9.*', 1),
+    ('0.0.1-alpha.2', '0.0.1-alpha.10', -1),
 ]
 
 
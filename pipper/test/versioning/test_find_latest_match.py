@@ -1,3 +1,4 @@
+import random
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
@@ -5,7 +6,7 @@ import pytest
 
 from pipper import versioning
 
-listed_versions = list(reversed([
+listed_versions = sorted([
     versioning.to_remote_version('test', '0.0.1', 'FAKE'),
     versioning.to_remote_version('test', '0.0.1-alpha.1', 'FAKE'),
     versioning.to_remote_version('test', '0.0.1-alpha.2', 'FAKE'),
@@ -21,13 +22,17 @@ listed_versions = list(reversed([
     versioning.to_remote_version('test', '2.0.0-beta.2', 'FAKE'),
     versioning.to_remote_version('test', '2.0.0-rc.1+build.2', 'FAKE'),
     versioning.to_remote_version('test', '2.0.0-rc.1+build.3', 'FAKE')
-]))
+])
 
 validations = [
     ('=0.0.1', False, '0.0.1'),
-    ('=0.0.1', True, '0.0.1-alpha.2+build.123'),
+    ('=0.0.1', True, '0.0.1'),
     ('=0.0.1+build.122', True, '0.0.1-alpha.2+build.122'),
-    ('<0.0.1+build.123', True, '0.0.1-alpha.2+build.122'),
+    ('<0.0.1+build.123', True, '0.0.1'),
+    ('=1.*.4', False, '1.0.0'),
+    ('>=0.0.3', False, '1.0.0'),
+    ('<0.0.1', False, None),
+    ('=0.0.3', False, None),
     ('=0.0.1-alpha.1', True, '0.0.1-alpha.1'),
     ('<0.0.2', False, '0.0.1'),
     ('<=0.0.2', False, '0.0.2'),
@@ -62,4 +67,30 @@ def test_find_latest_match(
         version_constraint=constraint,
         include_prereleases=unstable
     )
-    assert expected == result.version
+    assert expected == (result.version if result else None)
+
+
+@pytest.mark.parametrize('constraint', [
+    '=1.2.3', '<1.2.3', '<=1.2.3', '>1.2.3', '>=1.2.3', '=1.*', '<2.*',
+    '>=0.5.*', '=1.2.3-rc.1', '<1.2.3-rc.1', '>1.2.3+build.1', '=*',
+])
+def test_find_latest_binary_search(constraint: str):
+    """Should match the result of comparing every available version."""
+    generator = random.Random(constraint)
+    versions = sorted(
+        versioning.to_remote_version('test', '{}.{}.{}{}'.format(
+            generator.randint(0, 2),
+            generator.randint(0, 5),
+            generator.randint(0, 5),
+            generator.choice(['', '', '-rc.1', '-rc.2', '+build.1'])
+        ), 'FAKE')
+        for _ in range(300)
+    )
+    parsed = versioning.parse_constraint(constraint)
+
+    expected = next(
+        (v for v in reversed(versions) if parsed.matches(v.version)),
+        None
+    )
+    result = versioning.match_constraint(versions, constraint)
+    assert (expected and expected.key) == (result and result.key)
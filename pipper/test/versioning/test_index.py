@@ -0,0 +1,197 @@
+import io
+import json
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from pipper import versioning
+from pipper.test import utils
+from pipper.versioning import index
+
+
+def _make_environment() -> MagicMock:
+    """..."""
+    environment = MagicMock()
+    environment.s3_client = utils.make_s3_client()
+    environment.bucket = 'FAKE'
+    environment.root_prefix = 'pipper'
+    return environment
+
+
+def _make_contents(*versions: str) -> list:
+    """..."""
+    return [
+        {'Key': versioning.make_s3_key('test', version)}
+        for version in versions
+    ]
+
+
+@patch('pipper.s3.list_objects')
+def test_get_versions_cached(list_objects: MagicMock):
+    """Should list versions from S3 only once within the TTL."""
+    list_objects.return_value = utils.make_list_objects_response(
+        contents=_make_contents('0.1.0', '0.0.1', '0.0.2')
+    )
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        first = index.get_versions(environment, 'test')
+        index.clear()
+        second = index.get_versions(environment, 'test')
+
+    assert 1 == list_objects.call_count
+    assert ['0.0.1', '0.0.2', '0.1.0'] == [v.version for v in first]
+    assert [v.key for v in first] == [v.key for v in second]
+
+
+@patch('pipper.versioning.index.INCREMENTAL_MIN_KEYS', 1)
+@patch('pipper.versioning.index.TTL', 0)
+@patch('pipper.s3.list_objects')
+def test_get_versions_incremental(list_objects: MagicMock):
+    """Should refresh expired versions of large packages incrementally."""
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('0.0.1')),
+        utils.make_list_objects_response(contents=_make_contents('0.0.2')),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        result = index.get_versions(environment, 'test')
+
+    kwargs = list_objects.call_args[1]
+    assert versioning.make_s3_key('test', '0.0.1') == kwargs['StartAfter']
+    assert ['0.0.1', '0.0.2'] == [v.version for v in result]
+
+
+@patch('pipper.versioning.index.TTL', 0)
+@patch('pipper.s3.list_objects')
+def test_get_versions_lower_key(list_objects: MagicMock):
+    """Should discover new versions whose keys sort before the last key."""
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('1.9.0')),
+        utils.make_list_objects_response(
+            contents=_make_contents('1.10.0', '1.9.0')
+        ),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        result = index.get_versions(environment, 'test')
+
+    assert 'StartAfter' not in list_objects.call_args[1]
+    assert ['1.9.0', '1.10.0'] == [v.version for v in result]
+
+
+@patch('pipper.s3.list_objects')
+def test_find_latest_match_refresh(list_objects: MagicMock):
+    """Should list versions again when no cached version matches."""
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('0.0.1')),
+        utils.make_list_objects_response(
+            contents=_make_contents('0.0.1', '0.0.2')
+        ),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        index.clear()
+        result = versioning.find_latest_match(environment, 'test', '=0.0.2')
+
+    assert 2 == list_objects.call_count
+    assert '0.0.2' == result.version
+
+
+@patch('pipper.versioning.index.INCREMENTAL_MIN_KEYS', 1)
+@patch('pipper.versioning.index.TTL', 0)
+@patch('pipper.s3.list_objects')
+def test_find_latest_match_incremental(list_objects: MagicMock):
+    """
+    Should list versions completely before returning the latest version of
+    an incrementally listed package, whose listing may miss new versions.
+    """
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('1.9.0')),
+        utils.make_list_objects_response(contents=[]),
+        utils.make_list_objects_response(
+            contents=_make_contents('1.10.0', '1.9.0')
+        ),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        result = versioning.find_latest_match(environment, 'test', '=1.*')
+
+    assert 3 == list_objects.call_count
+    assert 'StartAfter' in list_objects.call_args_list[1][1]
+    assert 'StartAfter' not in list_objects.call_args_list[2][1]
+    assert '1.10.0' == result.version
+
+
+@patch('pipper.versioning.index.INCREMENTAL_MIN_KEYS', 1)
+@patch('pipper.versioning.index.TTL', 0)
+@patch('pipper.s3.list_objects')
+def test_find_latest_match_incremental_exact(list_objects: MagicMock):
+    """
+    Should trust an incremental listing that contains the exact version
+    that was requested.
+    """
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('1.9.0')),
+        utils.make_list_objects_response(contents=[]),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        result = versioning.find_latest_match(environment, 'test', '=1.9.0')
+
+    assert 2 == list_objects.call_count
+    assert '1.9.0' == result.version
+
+
+@patch('pipper.s3.list_objects')
+def test_invalidate(list_objects: MagicMock):
+    """Should refresh the versions of a package after it is invalidated."""
+    list_objects.side_effect = [
+        utils.make_list_objects_response(contents=_make_contents('0.0.1')),
+        utils.make_list_objects_response(
+            contents=_make_contents('0.0.1', '0.0.2')
+        ),
+    ]
+    environment = _make_environment()
+
+    with utils.PatchCache():
+        index.get_versions(environment, 'test')
+        index.invalidate(environment, 'test')
+        result = index.get_versions(environment, 'test')
+
+    assert 2 == list_objects.call_count
+    assert ['0.0.1', '0.0.2'] == [v.version for v in result]
+
+
+@patch('pipper.s3.list_objects')
+def test_prefetch(list_objects: MagicMock):
+    """Should refresh many packages from the repository-wide manifest."""
+    environment = _make_environment()
+    repository = {'packages': {
+        'foo': {'versions': ['0.0.1', '0.1.0']},
+        'bar': {'versions': ['1.0.0']},
+    }}
+    environment.s3_client.get_object.side_effect = lambda **kwargs: dict(
+        Body=io.BytesIO(json.dumps(repository).encode()),
+        ETag='"abc"'
+    )
+
+    with utils.PatchCache():
+        refreshed = index.prefetch(environment, ['foo', 'bar', 'baz'])
+        foo = index.get_versions(environment, 'foo')
+        bar = index.get_versions(environment, 'bar')
+
+    assert ['foo', 'bar'] == refreshed
+    assert ['0.0.1', '0.1.0'] == [v.version for v in foo]
+    assert ['1.0.0'] == [v.version for v in bar]
+    assert 1 == environment.s3_client.get_object.call_count
+    list_objects.assert_not_called()
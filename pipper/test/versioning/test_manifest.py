@@ -0,0 +1,176 @@
+import io
+import json
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from pipper import versioning
+from pipper.test import utils
+from pipper.versioning import index
+from pipper.versioning import manifest
+
+
+def _make_entry(version: str) -> dict:
+    """..."""
+    return manifest.from_metadata(
+        metadata={
+            'version': version,
+            'safe_version': versioning.serialize(version),
+            'timestamp': '2020-01-01T00:00:00',
+            'dependencies': ['bar'],
+        },
+        key=versioning.make_s3_key('foo', version),
+        size=42,
+        sha256='abc'
+    )
+
+
+def _get_saved(s3_client: MagicMock, key: str) -> dict:
+    """..."""
+    return next(
+        json.loads(c[1]['Body'])
+        for c in s3_client.put_object.call_args_list
+        if c[1]['Key'] == key
+    )
+
+
+@patch('pipper.s3.list_objects')
+def test_update_package_bootstrap(list_objects: MagicMock):
+    """Should create a missing manifest from the existing bundles."""
+    list_objects.return_value = utils.make_list_objects_response(contents=[
+        {'Key': versioning.make_s3_key('foo', '0.0.1'), 'Size': 10},
+    ])
+    s3_client = utils.make_s3_client()
+
+    manifest.update_package(
+        s3_client=s3_client,
+        bucket='FAKE',
+        root_prefix='pipper',
+        package_name='foo',
+        entries=[_make_entry('0.0.2')]
+    )
+
+    package = _get_saved(s3_client, 'pipper/foo/index.json')
+    assert {'v0-0-1', 'v0-0-2'} == set(package['versions'].keys())
+    assert ['bar'] == package['versions']['v0-0-2']['dependencies']
+
+    repository = _get_saved(s3_client, 'pipper/index.json')
+    assert '0.0.2' == repository['packages']['foo']['latest']
+
+
+@patch('pipper.s3.list_objects')
+def test_get_versions_from_manifest(list_objects: MagicMock):
+    """Should read versions from the manifest instead of listing them."""
+    contents = json.dumps(manifest.create_package_manifest('foo', [
+        _make_entry('0.0.1'),
+        _make_entry('1.0.0'),
+    ]))
+    environment = MagicMock()
+    environment.bucket = 'FAKE'
+    environment.root_prefix = 'pipper'
+    environment.s3_client.get_object.side_effect = lambda **kwargs: dict(
+        Body=io.BytesIO(contents.encode()),
+        ETag='"abc"'
+    )
+
+    with utils.PatchCache():
+        result = index.get_versions(environment, 'foo')
+        entry = index.get_entry(environment, 'foo', result[-1].key)
+
+        index.clear()
+        environment.s3_client.get_object.side_effect = (
+            utils.make_client_error('304')
+        )
+        cached = index.refresh(environment, 'foo')
+
+    list_objects.assert_not_called()
+    assert ['0.0.1', '1.0.0'] == [r.version for r in result]
+    assert 42 == entry['size']
+    assert '"abc"' == (
+        environment.s3_client.get_object.call_args[1]['IfNoneMatch']
+    )
+    assert 2 == len(cached['keys'])
+
+
+def test_update_package_conflict():
+    """Should retry conditional writes that lost to a concurrent update."""
+    existing = manifest.create_package_manifest('foo', [_make_entry('0.0.1')])
+    s3_client = utils.make_s3_client()
+    s3_client.get_object.side_effect = lambda Key, **kwargs: dict(
+        Body=io.BytesIO(json.dumps(
+            existing if Key == 'pipper/foo/index.json' else {'packages': {}}
+        ).encode()),
+        ETag='"v1"'
+    )
+    s3_client.put_object.side_effect = [
+        utils.make_client_error('PreconditionFailed', 'PutObject'),
+        None,
+        None,
+    ]
+
+    result = manifest.update_package(
+        s3_client=s3_client,
+        bucket='FAKE',
+        root_prefix='pipper',
+        package_name='foo',
+        entries=[_make_entry('0.0.2')]
+    )
+
+    puts = [c[1] for c in s3_client.put_object.call_args_list]
+    assert 3 == len(puts)
+    assert ['"v1"', '"v1"', '"v1"'] == [p['IfMatch'] for p in puts]
+    assert {'v0-0-1', 'v0-0-2'} == set(result['versions'].keys())
+
+
+def test_update_package_conflict_exhausted():
+    """Should give up after a bounded number of conflicting writes."""
+    s3_client = utils.make_s3_client()
+    s3_client.put_object.side_effect = (
+        utils.make_client_error('PreconditionFailed', 'PutObject')
+    )
+
+    with patch('pipper.s3.list_objects') as list_objects:
+        list_objects.return_value = utils.make_list_objects_response()
+        with pytest.raises(RuntimeError):
+            manifest.update_package(
+                s3_client=s3_client,
+                bucket='FAKE',
+                root_prefix='pipper',
+                package_name='foo',
+                entries=[_make_entry('0.0.2')]
+            )
+
+    puts = [c[1] for c in s3_client.put_object.call_args_list]
+    assert manifest.MAX_UPDATE_ATTEMPTS == len(puts)
+    assert all('*' == p['IfNoneMatch'] for p in puts)
+
+
+@patch('pipper.s3.list_objects')
+def test_find_latest_match_unindexed(list_objects: MagicMock):
+    """Should find bundles missing from the manifest by listing them."""
+    contents = json.dumps(manifest.create_package_manifest('foo', [
+        _make_entry('0.0.1'),
+    ]))
+    list_objects.return_value = utils.make_list_objects_response(contents=[
+        {'Key': versioning.make_s3_key('foo', '0.0.1')},
+        {'Key': versioning.make_s3_key('foo', '0.0.2')},
+    ])
+    environment = MagicMock()
+    environment.bucket = 'FAKE'
+    environment.root_prefix = 'pipper'
+    environment.s3_client.get_object.side_effect = lambda **kwargs: dict(
+        Body=io.BytesIO(contents.encode()),
+        ETag='"abc"'
+    )
+
+    with utils.PatchCache():
+        latest = versioning.find_latest_match(environment, 'foo')
+        assert 0 == list_objects.call_count
+        result = versioning.find_latest_match(environment, 'foo', '=0.0.2')
+        latest_after = versioning.find_latest_match(environment, 'foo')
+
+    assert 1 == list_objects.call_count
+    assert '0.0.1' == latest.version
+    assert '0.0.2' == result.version
+    assert '0.0.2' == latest_after.version
@@ -1,3 +1,9 @@
+import functools
+import random
+
+import pytest
+import semver
+
 from pipper import versioning
 
 
@@ -26,3 +32,67 @@ def test_comparison():
     assert not rv1 > rv2
     assert not rv1 == rv2
     assert rv1 == rv1
+
+
+precedences = [
+    ('1.0.0-alpha', '1.0.0-alpha.1', -1),
+    ('1.0.0-alpha.1', '1.0.0-alpha.beta', -1),
+    ('1.0.0-alpha.beta', '1.0.0-beta', -1),
+    ('1.0.0-beta.2', '1.0.0-beta.11', -1),
+    ('1.0.0-rc.1', '1.0.0', -1),
+    ('1.0.0', '1.0.0+build.1', 0),
+    ('1.9.0', '1.10.0', -1),
+    ('2.0.0', '1.99.99', 1),
+]
+
+
+@pytest.mark.parametrize('a,b,expected', precedences)
+def test_sort_key_precedence(a: str, b: str, expected: int):
+    """Should order versions by semantic version precedence."""
+    rv_a = versioning.to_remote_version('test', a, 'FAKE')
+    rv_b = versioning.to_remote_version('test', b, 'FAKE')
+    result = (rv_a.sort_key > rv_b.sort_key) - (rv_a.sort_key < rv_b.sort_key)
+    assert expected == result
+    assert semver.Version.parse(a).compare(b) == result
+
+
+def _legacy_compare(a: str, b: str) -> int:
+    """
+    Compares the versions of two remote version keys with semver, which is
+    how remote versions were sorted before they had sort keys.
+    """
+    return semver.Version.parse(
+        versioning.RemoteVersion('FAKE', a).version
+    ).compare(versioning.RemoteVersion('FAKE', b).version)
+
+
+def test_sorting_matches_semver():
+    """
+    Should sort remote versions in the same order as comparing their
+    versions with semver.
+    """
+    generator = random.Random(42)
+    keys = [
+        versioning.make_s3_key('test', '{}.{}.{}{}'.format(
+            generator.randint(0, 3),
+            generator.randint(0, 12),
+            generator.randint(0, 12),
+            generator.choice([
+                '',
+                '',
+                '-rc.{}'.format(generator.randint(0, 11)),
+                '-alpha',
+                '-alpha.{}'.format(generator.randint(0, 3)),
+                '-beta.x{}'.format(generator.randint(0, 3)),
+            ])
+        ))
+        for _ in range(500)
+    ]
+
+    expected = sorted(keys, key=functools.cmp_to_key(_legacy_compare))
+    result = sorted(versioning.RemoteVersion('FAKE', k) for k in keys)
+
+    assert expected == [rv.key for rv in result]
+    for a, b in zip(result, result[1:]):
+        assert (a < b) == (_legacy_compare(a.key, b.key) < 0)
+        assert (a == b) == (_legacy_compare(a.key, b.key) == 0)
@@ -1,9 +1,11 @@
+import functools
 import typing
 from urllib.parse import urlparse
 
-from pipper import s3
 from pipper.environment import Environment
+from pipper.versioning import index
 from pipper.versioning.definitions import RemoteVersion
+from pipper.versioning.definitions import VersionConstraint
 from pipper.versioning.serde import deserialize
 from pipper.versioning.serde import deserialize_prefix
 from pipper.versioning.serde import explode
@@ -64,12 +66,15 @@ def list_versions(
         version_prefix: str = None,
         include_prereleases: bool = False,
         reverse: bool = False,
+        refresh: bool = False,
 ) -> typing.List[RemoteVersion]:
     """
-    Lists the available versions of the specified package by querying the
-    remote S3 storage and returns those as keys. The results are sorted in
-    order of increasing version unless `reverse` is True in which case the
-    returned list is sorted from highest version to lowest one.
+    Lists the available versions of the specified package from the locally
+    cached version index, which is refreshed from the remote S3 storage when
+    it expires. The results are sorted in order of increasing version unless
+    `reverse` is True in which case the returned list is sorted from highest
+    version to lowest one. The returned list may be shared with the version
+    index and should not be modified.
 
     By default, only stable releases are returned, but pre-releases can be
     included as well if the `include_prereleases` argument is set to True.
@@ -87,6 +92,9 @@ def list_versions(
         Whether or not to reverse the order of the returned results.
     :param include_prereleases:
         Whether or not to include pre-release versions in the results.
+    :param refresh:
+        Whether or not to force a full refresh of the cached version index
+        for the package before listing its versions.
     """
     prefix = serialize_prefix(version_prefix or '').split('*')[0]
     key_prefix = '{}/{}/v{}'.format(
@@ -95,31 +103,17 @@ def list_versions(
         prefix,
     )
 
-    responses = []
-    while not responses or responses[-1].get('NextContinuationToken'):
-        continuation_kwargs = (
-            {'ContinuationToken': responses[-1].get('NextContinuationToken')}
-            if responses else
-            {}
-        )
-        responses.append(s3.list_objects(
-            s3_client=environment.s3_client,
-            bucket=environment.bucket,
-            prefix=key_prefix,
-            **continuation_kwargs
-        ))
-
-    results = [
-        RemoteVersion(key=entry['Key'], bucket=environment.bucket)
-        for response in responses
-        for entry in response.get('Contents') or []
-        if entry['Key'].endswith('.pipper')
-    ]
-
-    return [
-        r for r in sorted(results, reverse=reverse)
-        if not r.is_prerelease or include_prereleases
-    ]
+    results = index.get_versions(
+        environment,
+        package_name,
+        include_prereleases=include_prereleases,
+        refresh_missing=refresh
+    )
+
+    if version_prefix:
+        results = [r for r in results if r.key.startswith(key_prefix)]
+
+    return list(reversed(results)) if reverse else results
 
 
 def compare_constraint(version: str, constraint: str) -> int:
@@ -135,33 +129,17 @@ def compare_constraint(version: str, constraint: str) -> int:
     if version == constraint:
         return 0
 
-    version_parts = explode(version)
-    constraint_parts = explode(constraint)
-
-    def compare_part(v: str, c: str) -> int:
-        print(version_parts, constraint_parts)
-        is_equal = (
-            v == c  # direct match
-            or '*' in [v, c]  # one is a wildcard
-            or c == ''  # no constraint specified
-        )
-        if is_equal:
-            return 0
+    return parse_constraint(constraint).compare(version)
 
-        if v == '':
-            return -1
 
-        a = ''.join([x.zfill(32) for x in v.split('.')])
-        b = ''.join([x.zfill(32) for x in c.split('.')])
-        items = sorted([a, b])
-        return -1 if items.index(a) == 0 else 1
-
-    comparisons = (
-        compare_part(v, c)
-        for v, c in zip(version_parts, constraint_parts)
-    )
-
-    return next((c for c in comparisons if c != 0), 0)
+@functools.lru_cache(maxsize=256)
+def parse_constraint(version_constraint: str = None) -> VersionConstraint:
+    """
+    Parses the version constraint into a VersionConstraint object that can
+    be matched against many versions. Parsed constraints are cached, so
+    parsing the same constraint repeatedly is free.
+    """
+    return VersionConstraint(version_constraint)
 
 
 def find_latest_match(
@@ -175,6 +153,11 @@ def find_latest_match(
     returns the highest version that satisfies the specified version
     constraint. If no constraint is specified, the highest version available
     is returned. If no match is found, a `None` value is returned instead.
+    If no match is found in the locally cached version index, the versions
+    of the package are listed again before giving up. The versions are also
+    listed again when they were only listed incrementally and the match is
+    not the exact version constrained, because newer versions may be missing
+    from incremental listings.
 
     :param environment:
         Context object for the currently running command invocation.
@@ -191,47 +174,53 @@ def find_latest_match(
         Whether or not to include pre-release versions when looking for a
         match.
     """
-    available = list_versions(
-        environment=environment,
-        package_name=package_name,
-        reverse=True,
-        include_prereleases=include_prereleases,
+    def list_available(refresh: bool = False) -> typing.List[RemoteVersion]:
+        return list_versions(
+            environment=environment,
+            package_name=package_name,
+            include_prereleases=include_prereleases,
+            refresh=refresh,
+        )
+
+    available = list_available()
+    result = match_constraint(available, version_constraint)
+
+    is_exact = (
+        result is not None
+        and result.version == (version_constraint or '').strip().lstrip('=')
     )
+    if result is None or not (
+            is_exact or index.is_complete(environment, package_name)
+    ):
+        available = list_available(refresh=True)
+        result = match_constraint(available, version_constraint)
 
     if not available:
         raise ValueError(
             'No pipper package "{}" was found.'.format(package_name)
         )
 
-    if not version_constraint:
-        return available[0]
+    return result
 
-    comparison = version_constraint.strip('=<>')
 
-    if version_constraint.startswith('<='):
-        choices = (
-            a for a in available
-            if compare_constraint(a.version, comparison) != 1
-        )
-    elif version_constraint.startswith('<'):
-        choices = (
-            a for a in available
-            if compare_constraint(a.version, comparison) < 0
-        )
-    elif version_constraint.startswith('>='):
-        choices = (
-            a for a in available
-            if compare_constraint(a.version, comparison) != -1
-        )
-    elif version_constraint.startswith('>'):
-        choices = (
-            a for a in available
-            if compare_constraint(a.version, comparison) > 0
-        )
-    else:
-        choices = (
-            a for a in available
-            if compare_constraint(a.version, comparison) == 0
-        )
+def match_constraint(
+        available: typing.List[RemoteVersion],
+        version_constraint: str = None
+) -> typing.Union[RemoteVersion, None]:
+    """
+    Returns the highest of the available versions that satisfies the
+    specified version constraint, or `None` if none of them do. The bounds
+    of the constrained version range are found with a binary search, so the
+    available versions must be sorted in order of increasing version.
+
+    :param available:
+        Remote versions to search, sorted from lowest version to highest one.
+    :param version_constraint:
+        A constraining version or partial version, which may include wildcard
+        characters and should be prefixed by an equality such as `<`, `<=`,
+        `=`, `>=` or `>`.
+    """
+    if not version_constraint:
+        return available[-1] if available else None
 
-    return next(choices, None)
+    return parse_constraint(version_constraint).find_latest(available)
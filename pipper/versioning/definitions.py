@@ -1,13 +1,17 @@
-import semver
+import bisect
 
 from pipper.versioning import serde
 
 
 class RemoteVersion(object):
     """
-    Data structure for storing information about remote data sources.
+    Data structure for storing information about remote data sources. The
+    version is parsed from the key once, when the object is created, into a
+    sort key that is used for all version comparisons.
     """
 
+    __slots__ = ('_key', '_bucket', '_url', '_version', '_sort_key')
+
     def __init__(
             self,
             bucket: str,
@@ -18,6 +22,10 @@ class RemoteVersion(object):
         self._key = key
         self._bucket = bucket
         self._url = url
+        self._version = serde.deserialize(
+            key.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        )
+        self._sort_key = serde.to_sort_key(self._version)
 
     @property
     def key(self) -> str:
@@ -45,7 +53,15 @@ class RemoteVersion(object):
 
     @property
     def version(self) -> str:
-        return serde.deserialize(self.key.rsplit('/', 1)[-1].rsplit('.', 1)[0])
+        return self._version
+
+    @property
+    def sort_key(self) -> tuple:
+        """
+        Tuple that sorts according to semantic version precedence rules,
+        which ignore build metadata.
+        """
+        return self._sort_key
 
     @property
     def is_url_based(self) -> bool:
@@ -68,22 +84,27 @@ class RemoteVersion(object):
 
     @property
     def is_prerelease(self) -> bool:
-        return self.version.find('-') != -1
+        return self._sort_key[-1][0] == 0
 
     def __lt__(self, other):
-        return semver.compare(self.version, other.version) < 0
+        return self._sort_key < other.sort_key
 
     def __le__(self, other):
-        return semver.compare(self.version, other.version) != 1
+        return self._sort_key <= other.sort_key
 
     def __gt__(self, other):
-        return semver.compare(self.version, other.version) > 0
+        return self._sort_key > other.sort_key
 
     def __ge__(self, other):
-        return semver.compare(self.version, other.version) != -1
+        return self._sort_key >= other.sort_key
 
     def __eq__(self, other):
-        return semver.compare(self.version, other.version) == 0
+        if not isinstance(other, RemoteVersion):
+            return NotImplemented
+        return self._sort_key == other.sort_key
+
+    def __hash__(self):
+        return hash(self._sort_key)
 
     def __repr__(self):
         return '<{} {}:{}>'.format(
@@ -91,3 +112,168 @@ class RemoteVersion(object):
             self.package_name,
             self.version
         )
+
+
+class _ReleaseKeys(object):
+    """
+    Read-only sequence view of the truncated release parts of the sort keys
+    of sorted remote versions, which allows them to be binary searched
+    without copying them.
+    """
+
+    __slots__ = ('_versions', '_depth')
+
+    def __init__(self, versions: list, depth: int):
+        self._versions = versions
+        self._depth = depth
+
+    def __len__(self):
+        return len(self._versions)
+
+    def __getitem__(self, index: int) -> tuple:
+        return self._versions[index].sort_key[:self._depth]
+
+
+class VersionConstraint(object):
+    """
+    A version constraint such as `>=1.2.*` that is parsed once and can then
+    be matched against many versions. Constraints are hierarchical, which
+    means that everything after the first wildcard or missing release part
+    is ignored. Therefore, a constraint like `=1.*.4` is equivalent to `=1`.
+    """
+
+    __slots__ = ('_operator', '_release', '_extras')
+
+    OPERATORS = ('<=', '>=', '==', '<', '>', '=')
+
+    def __init__(self, constraint: str = None):
+        """_ doc..."""
+        constraint = (constraint or '').strip()
+        operator = next(
+            (o for o in self.OPERATORS if constraint.startswith(o)),
+            '='
+        )
+        parts = serde.explode(constraint.strip('=<>'))
+
+        release = []
+        for part in parts[:3]:
+            if part in ('', '*'):
+                break
+            if not part.isdigit():
+                raise ValueError(
+                    'Invalid version constraint "{}"'.format(constraint)
+                )
+            release.append(int(part))
+
+        is_complete = len(release) == 3
+        self._operator = '=' if operator == '==' else operator
+        self._release = tuple(release)
+        self._extras = tuple(
+            _pad_part(part) if is_complete and part not in ('', '*') else None
+            for part in parts[3:]
+        )
+
+    @property
+    def operator(self) -> str:
+        return self._operator
+
+    @property
+    def release(self) -> tuple:
+        """The constrained major, minor and patch values as integers."""
+        return self._release
+
+    def compare(self, version: str) -> int:
+        """
+        Returns an integer representing the sortable comparison between the
+        version and this constraint, ignoring the constraint's operator:
+            -1 (version is less than constraint)
+            0 (version satisfies the constraint exactly)
+            1 (version is greater than constraint)
+        """
+        parts = serde.explode(version)
+        release = tuple(int(p) for p in parts[:len(self._release)])
+        if release != self._release:
+            return -1 if release < self._release else 1
+        return self._compare_extras(parts[3:])
+
+    def _compare_extras(self, parts: tuple) -> int:
+        """
+        Compares the pre-release and build parts of a version with those of
+        the constraint once the release parts are known to be equal. A
+        version without a part that the constraint specifies is considered
+        to be less than the constraint.
+        """
+        for part, constraint in zip(parts, self._extras):
+            if constraint is None or part == '*':
+                continue
+            if part == '':
+                return -1
+            padded = _pad_part(part)
+            if padded != constraint:
+                return -1 if padded < constraint else 1
+        return 0
+
+    def _is_satisfied_by(self, comparison: int) -> bool:
+        """Whether or not a comparison result satisfies the operator."""
+        if self._operator == '<':
+            return comparison < 0
+        if self._operator == '<=':
+            return comparison <= 0
+        if self._operator == '>':
+            return comparison > 0
+        if self._operator == '>=':
+            return comparison >= 0
+        return comparison == 0
+
+    def matches(self, version: str) -> bool:
+        """Whether or not the version satisfies this constraint."""
+        return self._is_satisfied_by(self.compare(version))
+
+    def find_latest(self, available: list):
+        """
+        Returns the highest of the available remote versions that satisfies
+        this constraint, or `None` if none of them do. The available versions
+        must be sorted in order of increasing version, which allows the
+        bounds of the constrained release range to be found with a binary
+        search instead of comparing every version.
+
+        :param available:
+            RemoteVersion objects sorted in order of increasing version.
+        """
+        keys = _ReleaseKeys(available, len(self._release))
+        low = bisect.bisect_left(keys, self._release)
+        high = bisect.bisect_right(keys, self._release)
+
+        if self._operator in ('>', '>=') and high < len(available):
+            return available[-1]
+
+        has_extras = any(e is not None for e in self._extras)
+        for index in reversed(range(low, high)):
+            remote = available[index]
+            comparison = (
+                self._compare_extras(serde.explode(remote.version)[3:])
+                if has_extras else
+                0
+            )
+            if self._is_satisfied_by(comparison):
+                return remote
+
+        if self._operator in ('<', '<=') and low > 0:
+            return available[low - 1]
+
+        return None
+
+    def __repr__(self):
+        return '<{} {}{}>'.format(
+            self.__class__.__name__,
+            self._operator,
+            '.'.join(str(part) for part in self._release) or '*'
+        )
+
+
+def _pad_part(part: str) -> str:
+    """
+    Pads each dot-separated identifier of a pre-release or build part so
+    that the part can be compared as a string.
+    """
+    return ''.join([x.zfill(32) for x in part.split('.')])
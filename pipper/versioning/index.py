@@ -0,0 +1,368 @@
+import collections
+import os
+import threading
+import time
+import typing
+
+from pipper import cache
+from pipper import s3
+from pipper.environment import Environment
+from pipper.versioning import manifest
+from pipper.versioning import serde
+from pipper.versioning.definitions import RemoteVersion
+
+#: Number of seconds during which a package's cached version listing is used
+#: without contacting S3 at all.
+TTL = int(os.environ.get('PIPPER_VERSION_INDEX_TTL') or 300)
+
+#: Number of seconds after which a package's versions are listed completely
+#: instead of incrementally. Incremental listings only discover keys that
+#: sort after the last key seen, so new versions such as `v1-10-0` after
+#: `v1-9-0` are only discovered by a complete listing.
+FULL_TTL = int(os.environ.get('PIPPER_VERSION_INDEX_FULL_TTL') or 3600)
+
+#: Minimum number of keys of a package before its versions are listed
+#: incrementally. Packages with fewer keys are listed completely with a
+#: single request, which costs no more than an incremental listing. Because
+#: incremental listings can miss new versions, lookups of anything but an
+#: exact version list the package completely first, see `is_complete`.
+INCREMENTAL_MIN_KEYS = 1000
+
+_lock = threading.RLock()
+_indexes = {}
+_versions = {}
+_listed = set()
+
+
+def get_index_path(bucket: str, root_prefix: str) -> str:
+    """
+    Returns the path of the locally cached version index for the specified
+    pipper repository.
+    """
+    return cache.get_path('versions', '{}.json'.format(
+        cache.to_digest(bucket, root_prefix)
+    ))
+
+
+def load(bucket: str, root_prefix: str) -> dict:
+    """
+    Loads the version index for the specified pipper repository, which is
+    read from disk only once per process.
+    """
+    path = get_index_path(bucket, root_prefix)
+    with _lock:
+        if path not in _indexes:
+            _indexes[path] = cache.read_json(path, {'packages': {}})
+        return _indexes[path]
+
+
+def list_keys(
+        s3_client,
+        bucket: str,
+        prefix: str,
+        start_after: str = None
+) -> typing.List[str]:
+    """
+    Lists all of the pipper bundle keys within the specified prefix, paging
+    through the results as needed. If a `start_after` key is specified, only
+    keys that sort after it are listed.
+    """
+    kwargs = {'StartAfter': start_after} if start_after else {}
+    entries = s3.list_all_objects(s3_client, bucket, prefix, **kwargs)
+    return [e['Key'] for e in entries if e['Key'].endswith('.pipper')]
+
+
+def refresh(
+        environment: Environment,
+        package_name: str,
+        full: bool = False
+) -> dict:
+    """
+    Refreshes the cached versions of the specified package from S3 and
+    returns the updated package entry of the version index. If the package
+    has a published manifest, it is read with a single conditional request.
+    When a full refresh is requested, such as after a requested version was
+    not found, the manifest is also reconciled with a complete listing of
+    the package's bundles, so that bundles missing from the manifest are
+    found as well. Otherwise, the package's bundles are listed. Packages
+    with many keys are listed incrementally, where only the keys after the
+    last key seen in the previous listing are listed, unless a full refresh
+    is requested or due.
+
+    :param environment:
+        Context object for the currently running command invocation.
+    :param package_name:
+        Name of the pipper package to refresh.
+    :param full:
+        Whether or not to list all of the package's versions instead of
+        listing them incrementally.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    entry = index['packages'].get(package_name) or {}
+    now = time.time()
+    prefix = '{}/{}/'.format(environment.root_prefix, package_name)
+
+    result = manifest.fetch(
+        s3_client=environment.s3_client,
+        bucket=environment.bucket,
+        key=manifest.get_package_key(environment.root_prefix, package_name),
+        etag=entry.get('manifest_etag')
+    )
+
+    if result is not None:
+        entries = (
+            {v['key']: v for v in result['manifest']['versions'].values()}
+            if result['modified'] else
+            entry.get('entries') or {}
+        )
+        unindexed = (
+            [
+                key for key in list_keys(
+                    s3_client=environment.s3_client,
+                    bucket=environment.bucket,
+                    prefix=prefix
+                )
+                if key not in entries
+            ]
+            if full else
+            entry.get('unindexed') or []
+        )
+        keys = sorted(set(entries.keys()).union(unindexed))
+    else:
+        entries = None
+        unindexed = None
+        full = (
+            full
+            or len(entry.get('keys') or []) < INCREMENTAL_MIN_KEYS
+            or now - (entry.get('full_refreshed') or 0) >= FULL_TTL
+        )
+        keys = list_keys(
+            s3_client=environment.s3_client,
+            bucket=environment.bucket,
+            prefix=prefix,
+            start_after=None if full else entry.get('last_key')
+        )
+        if not full:
+            keys = sorted(set(entry.get('keys') or []).union(keys))
+
+    entry = dict(
+        keys=keys,
+        entries=entries,
+        unindexed=unindexed,
+        manifest_etag=result['etag'] if result else None,
+        last_key=max(keys) if keys else None,
+        refreshed=now,
+        full_refreshed=now if full else entry.get('full_refreshed'),
+        incremental=result is None and not full
+    )
+
+    path = get_index_path(environment.bucket, environment.root_prefix)
+    with _lock:
+        index['packages'][package_name] = entry
+        _versions.pop((path, package_name), None)
+        if full:
+            _listed.add((path, package_name))
+        elif entry['incremental']:
+            _listed.discard((path, package_name))
+        cache.write_json(path, index)
+
+    return entry
+
+
+def prefetch(
+        environment: Environment,
+        package_names: typing.List[str]
+) -> typing.List[str]:
+    """
+    Refreshes the cached versions of all of the specified packages whose
+    TTL has expired from the repository-wide manifest, which is read with a
+    single conditional request instead of one request per package. Packages
+    that are not listed in the repository-wide manifest are left to be
+    refreshed individually when their versions are requested.
+
+    :param environment:
+        Context object for the currently running command invocation.
+    :param package_names:
+        Names of the pipper packages whose versions will be needed.
+    :return
+        The names of the packages that were refreshed.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    now = time.time()
+    stale = [
+        name for name in collections.OrderedDict.fromkeys(package_names)
+        if now - ((index['packages'].get(name) or {}).get('refreshed') or 0)
+        >= TTL
+    ]
+    if not stale:
+        return []
+
+    repository = index.get('repository') or {}
+    result = manifest.fetch(
+        s3_client=environment.s3_client,
+        bucket=environment.bucket,
+        key=manifest.get_repository_key(environment.root_prefix),
+        etag=repository.get('etag')
+    )
+    if result is None:
+        return []
+
+    if result['modified']:
+        repository = dict(
+            etag=result['etag'],
+            packages={
+                name: summary.get('versions') or []
+                for name, summary in result['manifest']['packages'].items()
+            }
+        )
+
+    refreshed = []
+    path = get_index_path(environment.bucket, environment.root_prefix)
+    with _lock:
+        index['repository'] = repository
+        for name in stale:
+            versions = repository.get('packages', {}).get(name)
+            if versions is None:
+                continue
+
+            entry = index['packages'].get(name) or {}
+            keys = sorted(set(
+                '{}/{}/{}.pipper'.format(
+                    environment.root_prefix,
+                    name,
+                    serde.serialize(version)
+                )
+                for version in versions
+            ).union(entry.get('unindexed') or []))
+            # Manifest entries are only kept while they match the versions.
+            kept = entry if keys == entry.get('keys') else {}
+            index['packages'][name] = dict(
+                keys=keys,
+                entries=kept.get('entries'),
+                unindexed=entry.get('unindexed'),
+                manifest_etag=kept.get('manifest_etag'),
+                last_key=keys[-1] if keys else None,
+                refreshed=now,
+                full_refreshed=entry.get('full_refreshed'),
+                incremental=False
+            )
+            _versions.pop((path, name), None)
+            refreshed.append(name)
+        cache.write_json(path, index)
+
+    return refreshed
+
+
+def get_versions(
+        environment: Environment,
+        package_name: str,
+        include_prereleases: bool = True,
+        refresh_missing: bool = False
+) -> typing.List[RemoteVersion]:
+    """
+    Returns the available remote versions of the specified package sorted in
+    order of increasing version. The versions are read from the locally
+    cached version index, which is refreshed from S3 once its TTL expires.
+    The sorted versions are cached in memory and the returned list should
+    not be modified.
+
+    :param environment:
+        Context object for the currently running command invocation.
+    :param package_name:
+        Name of the pipper package to list versions of.
+    :param include_prereleases:
+        Whether or not to include pre-release versions in the results.
+    :param refresh_missing:
+        Whether or not to force a full refresh of the package's versions,
+        which is useful when an expected version was not found. A package is
+        fully refreshed this way at most once per process, unless it is
+        listed incrementally again in the meantime.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    entry = index['packages'].get(package_name)
+    cache_key = (
+        get_index_path(environment.bucket, environment.root_prefix),
+        package_name
+    )
+
+    is_stale = (
+        entry is None
+        or time.time() - (entry.get('refreshed') or 0) >= TTL
+    )
+    force = refresh_missing and cache_key not in _listed
+
+    if is_stale or force:
+        entry = refresh(environment, package_name, full=force)
+
+    with _lock:
+        if cache_key not in _versions:
+            remotes = sorted(
+                RemoteVersion(key=key, bucket=environment.bucket)
+                for key in entry['keys']
+            )
+            _versions[cache_key] = (
+                remotes,
+                [r for r in remotes if not r.is_prerelease]
+            )
+        remotes, stable = _versions[cache_key]
+
+    return remotes if include_prereleases else stable
+
+
+def is_complete(environment: Environment, package_name: str) -> bool:
+    """
+    Whether or not the cached versions of the package were listed completely
+    instead of incrementally, in which case they may be missing versions
+    whose keys sort before the last key of the previous listing.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    entry = index['packages'].get(package_name) or {}
+    return not entry.get('incremental')
+
+
+def invalidate(environment: Environment, package_name: str):
+    """
+    Marks the cached versions of the package as expired, such as after a
+    version of it was published, so that they are refreshed from S3 and
+    fully listed again the next time that they are requested.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    path = get_index_path(environment.bucket, environment.root_prefix)
+    with _lock:
+        entry = index['packages'].get(package_name)
+        if entry is not None:
+            entry['refreshed'] = None
+            cache.write_json(path, index)
+        _listed.discard((path, package_name))
+
+
+def contains(environment: Environment, package_name: str, key: str) -> bool:
+    """
+    Whether or not the specified key is listed in the cached version index
+    of the package without contacting S3.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    entry = index['packages'].get(package_name) or {}
+    return key in (entry.get('keys') or [])
+
+
+def get_entry(
+        environment: Environment,
+        package_name: str,
+        key: str
+) -> typing.Union[dict, None]:
+    """
+    Returns the manifest entry for the specified key from the cached version
+    index, which is only available for packages with a published manifest.
+    """
+    index = load(environment.bucket, environment.root_prefix)
+    entry = index['packages'].get(package_name) or {}
+    return (entry.get('entries') or {}).get(key)
+
+
+def clear():
+    """Clears the version indexes that are loaded in memory."""
+    with _lock:
+        _indexes.clear()
+        _versions.clear()
+        _listed.clear()
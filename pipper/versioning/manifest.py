@@ -0,0 +1,398 @@
+import json
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError
+
+from pipper import s3
+from pipper.versioning.definitions import RemoteVersion
+
+MANIFEST_FILENAME = 'index.json'
+
+#: Maximum number of times a manifest update is attempted when other
+#: publishers update the same manifest concurrently.
+MAX_UPDATE_ATTEMPTS = 5
+
+#: Error codes of conditional writes whose condition no longer holds, which
+#: means that the manifest was changed by someone else in the meantime.
+CONFLICT_CODES = (
+    '409',
+    '412',
+    'ConditionalRequestConflict',
+    'PreconditionFailed',
+)
+
+
+def get_package_key(root_prefix: str, package_name: str) -> str:
+    """Returns the S3 key of the manifest for the specified package."""
+    return '{}/{}/{}'.format(root_prefix, package_name, MANIFEST_FILENAME)
+
+
+def get_repository_key(root_prefix: str) -> str:
+    """Returns the S3 key of the repository-wide manifest."""
+    return '{}/{}'.format(root_prefix, MANIFEST_FILENAME)
+
+
+def fetch(
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        etag: str = None
+) -> typing.Union[dict, None]:
+    """
+    Fetches the manifest stored at the specified key. If an ETag is
+    specified, the request is conditional and the manifest contents are
+    only returned if they have changed.
+
+    :return
+        A dictionary with the `manifest` contents, its `etag` and whether or
+        not it was `modified` relative to the specified ETag. The `manifest`
+        value is `None` if it was not modified. If no manifest exists at
+        the key, `None` is returned instead.
+    """
+    kwargs = {'IfNoneMatch': etag} if etag else {}
+
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+    except ClientError as error:
+        code = error.response.get('Error', {}).get('Code')
+        if code in ('304', 'NotModified'):
+            return dict(manifest=None, etag=etag, modified=False)
+        if code in ('404', 'NoSuchKey'):
+            return None
+        raise
+
+    return dict(
+        manifest=json.loads(response['Body'].read()),
+        etag=response.get('ETag'),
+        modified=True
+    )
+
+
+def save(
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        manifest: dict,
+        acl: str = 'private',
+        etag: typing.Union[str, bool] = None
+) -> dict:
+    """
+    Writes the manifest to the specified key in the S3 bucket. If an ETag
+    is specified, the write is conditional and only succeeds if the stored
+    manifest still has that ETag. An ETag of `False` only writes the
+    manifest if none exists at the key yet.
+    """
+    kwargs = {}
+    if etag:
+        kwargs['IfMatch'] = etag
+    elif etag is False:
+        kwargs['IfNoneMatch'] = '*'
+
+    s3_client.put_object(
+        ACL=acl or 'private',
+        Body=json.dumps(manifest, sort_keys=True).encode(),
+        Bucket=bucket,
+        Key=key,
+        ContentType='application/json',
+        **kwargs
+    )
+    return manifest
+
+
+def update(
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        modify: typing.Callable[[typing.Union[dict, None]], dict],
+        acl: str = 'private'
+) -> dict:
+    """
+    Reads the manifest at the specified key, modifies it and writes it back
+    with a write that is conditional on the ETag that was read, so that
+    concurrent updates of the same manifest are never lost. If the manifest
+    was changed in the meantime, the update is retried with the changed
+    manifest.
+
+    :param modify:
+        Function that is called with the existing manifest, or `None` if
+        there is none yet, and returns the updated manifest.
+    :return
+        The updated manifest.
+    """
+    for attempt in range(MAX_UPDATE_ATTEMPTS):
+        existing = fetch(s3_client, bucket, key)
+        manifest = modify(existing['manifest'] if existing else None)
+
+        try:
+            return save(
+                s3_client,
+                bucket,
+                key,
+                manifest,
+                acl,
+                etag=existing['etag'] if existing else False
+            )
+        except ClientError as error:
+            code = error.response.get('Error', {}).get('Code')
+            if code not in CONFLICT_CODES:
+                raise
+
+    raise RuntimeError('Manifest "{}" changed during {} updates'.format(
+        key,
+        MAX_UPDATE_ATTEMPTS
+    ))
+
+
+def from_metadata(
+        metadata: dict,
+        key: str,
+        size: int,
+        etag: str = None,
+        sha256: str = None
+) -> dict:
+    """
+    Creates a manifest entry for a published bundle from its package
+    metadata.
+    """
+    return dict(
+        version=metadata['version'],
+        safe_version=metadata['safe_version'],
+        key=key,
+        timestamp=metadata.get('timestamp'),
+        size=size,
+        dependencies=metadata.get('dependencies') or [],
+        etag=etag,
+        sha256=sha256,
+        wheel_sha256=metadata.get('wheel_sha256')
+    )
+
+
+def from_listing(entry: dict) -> dict:
+    """
+    Creates a manifest entry for a published bundle from its S3 listing
+    entry. Listings do not include package metadata, so the dependencies
+    and hashes of these entries are unknown.
+    """
+    remote = RemoteVersion(bucket='', key=entry['Key'])
+    modified = entry.get('LastModified')
+    return dict(
+        version=remote.version,
+        safe_version=remote.safe_version,
+        key=entry['Key'],
+        timestamp=modified.isoformat() if modified else None,
+        size=entry.get('Size'),
+        dependencies=None,
+        etag=entry.get('ETag'),
+        sha256=None,
+        wheel_sha256=None
+    )
+
+
+def from_head(s3_client: BaseClient, bucket: str, key: str) -> dict:
+    """
+    Creates a manifest entry for a published bundle from the object metadata
+    that was stored when the bundle was published.
+    """
+    response = s3_client.head_object(Bucket=bucket, Key=key)
+    metadata = response.get('Metadata') or {}
+
+    if 'package' not in metadata:
+        return from_listing(dict(
+            Key=key,
+            Size=response.get('ContentLength'),
+            ETag=response.get('ETag'),
+            LastModified=response.get('LastModified')
+        ))
+
+    return from_metadata(
+        metadata=json.loads(metadata['package']),
+        key=key,
+        size=response.get('ContentLength'),
+        etag=response.get('ETag'),
+        sha256=metadata.get('sha256')
+    )
+
+
+def create_package_manifest(
+        package_name: str,
+        entries: typing.List[dict]
+) -> dict:
+    """Creates a package manifest containing the specified entries."""
+    return dict(
+        package=package_name,
+        updated=datetime.utcnow().isoformat(),
+        versions={entry['safe_version']: entry for entry in entries}
+    )
+
+
+def summarize(manifest: dict) -> dict:
+    """
+    Creates the compact summary of a package manifest that is stored in the
+    repository-wide manifest.
+    """
+    remotes = sorted(
+        RemoteVersion(bucket='', key=entry['key'])
+        for entry in manifest['versions'].values()
+    )
+    stable = [r for r in remotes if not r.is_prerelease]
+    return dict(
+        versions=[r.version for r in remotes],
+        latest=stable[-1].version if stable else None,
+        updated=manifest.get('updated')
+    )
+
+
+def list_package_names(
+        s3_client: BaseClient,
+        bucket: str,
+        root_prefix: str
+) -> typing.List[str]:
+    """Lists the names of all packages in the pipper repository."""
+    responses = []
+    while not responses or responses[-1].get('NextContinuationToken'):
+        continuation_kwargs = (
+            {'ContinuationToken': responses[-1].get('NextContinuationToken')}
+            if responses else
+            {}
+        )
+        responses.append(s3.list_objects(
+            s3_client=s3_client,
+            bucket=bucket,
+            prefix='{}/'.format(root_prefix),
+            Delimiter='/',
+            **continuation_kwargs
+        ))
+
+    return [
+        entry['Prefix'].rstrip('/').rsplit('/', 1)[-1]
+        for response in responses
+        for entry in response.get('CommonPrefixes') or []
+    ]
+
+
+def update_repository(
+        s3_client: BaseClient,
+        bucket: str,
+        root_prefix: str,
+        manifests: typing.List[dict],
+        acl: str = 'private',
+        replace: bool = False
+) -> dict:
+    """
+    Updates the repository-wide manifest with the summaries of the specified
+    package manifests. If `replace` is True, the repository-wide manifest is
+    replaced by one that only contains the specified package manifests.
+    """
+    def modify(existing: typing.Union[dict, None]) -> dict:
+        repository = (None if replace else existing) or {'packages': {}}
+        for manifest in manifests:
+            repository['packages'][manifest['package']] = summarize(manifest)
+        repository['updated'] = datetime.utcnow().isoformat()
+        return repository
+
+    return update(
+        s3_client,
+        bucket,
+        get_repository_key(root_prefix),
+        modify,
+        acl
+    )
+
+
+def update_package(
+        s3_client: BaseClient,
+        bucket: str,
+        root_prefix: str,
+        package_name: str,
+        entries: typing.List[dict],
+        acl: str = 'private'
+) -> dict:
+    """
+    Adds or replaces the specified entries in the manifest of the package
+    and updates the repository-wide manifest to match. If the package does
+    not have a manifest yet, one is created from a listing of the package's
+    existing bundles first. Both manifests are updated with conditional
+    writes that are retried when other publishers update them concurrently.
+
+    :param s3_client:
+        S3 client used to read and write the manifests.
+    :param bucket:
+        Name of the S3 bucket where the pipper repository resides.
+    :param root_prefix:
+        Root prefix of the pipper repository within the bucket.
+    :param package_name:
+        Name of the package whose manifest will be updated.
+    :param entries:
+        Manifest entries of the newly published bundles.
+    :param acl:
+        ACL to apply to the written manifests.
+    :return
+        The updated package manifest.
+    """
+    def modify(existing: typing.Union[dict, None]) -> dict:
+        if existing is not None:
+            manifest = existing
+        else:
+            listed = s3.list_all_objects(
+                s3_client,
+                bucket,
+                '{}/{}/'.format(root_prefix, package_name)
+            )
+            manifest = create_package_manifest(package_name, [
+                from_listing(entry) for entry in listed
+                if entry['Key'].endswith('.pipper')
+            ])
+
+        for entry in entries:
+            manifest['versions'][entry['safe_version']] = entry
+        manifest['updated'] = datetime.utcnow().isoformat()
+        return manifest
+
+    manifest = update(
+        s3_client,
+        bucket,
+        get_package_key(root_prefix, package_name),
+        modify,
+        acl
+    )
+    update_repository(s3_client, bucket, root_prefix, [manifest], acl)
+    return manifest
+
+
+def rebuild_package(
+        s3_client: BaseClient,
+        bucket: str,
+        root_prefix: str,
+        package_name: str,
+        acl: str = 'private',
+        jobs: int = 8
+) -> dict:
+    """
+    Rebuilds the manifest of the specified package from a complete listing
+    of its bundles, reading the metadata of every bundle concurrently.
+    """
+    listed = s3.list_all_objects(
+        s3_client,
+        bucket,
+        '{}/{}/'.format(root_prefix, package_name)
+    )
+    keys = [e['Key'] for e in listed if e['Key'].endswith('.pipper')]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        entries = list(pool.map(
+            lambda key: from_head(s3_client, bucket, key),
+            keys
+        ))
+
+    manifest = create_package_manifest(package_name, entries)
+    save(
+        s3_client,
+        bucket,
+        get_package_key(root_prefix, package_name),
+        manifest,
+        acl
+    )
+    return manifest
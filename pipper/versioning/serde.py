@@ -26,6 +26,33 @@ def explode(version_prefix: str) -> tuple:
     return tuple(sections)
 
 
+def to_sort_key(version: str) -> tuple:
+    """
+    Converts a complete semantic version into a tuple that sorts according
+    to semantic version precedence rules. Numeric pre-release identifiers
+    sort numerically and before alphanumeric ones, pre-release versions sort
+    before their associated release and build metadata is ignored.
+
+    :param version:
+        A complete, standard semantic version.
+    """
+    release = version.split('+', 1)[0]
+    release, _, prerelease = release.partition('-')
+    major, minor, patch = release.split('.')
+
+    if prerelease:
+        prerelease_key = (0,) + tuple(
+            (0, int(identifier), '')
+            if identifier.isdigit() else
+            (1, 0, identifier)
+            for identifier in prerelease.split('.')
+        )
+    else:
+        prerelease_key = (1,)
+
+    return int(major), int(minor), int(patch), prerelease_key
+
+
 def serialize(version: str) -> str:
     """
     Converts the specified semantic version into a URL/filesystem safe
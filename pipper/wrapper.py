@@ -1,16 +1,99 @@
+import importlib
 import os
+import re
 import subprocess
 import sys
+import tempfile
+import threading
 import typing
 
-import pkg_resources
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # pragma: no cover
+    import importlib_metadata
 
+from pipper import output
 from pipper import versioning
 
+_lock = threading.RLock()
+_indexes = {}
 
-def update_required(package_name: str, install_version: str) -> bool:
+
+class InstalledPackage(typing.NamedTuple):
+    """Data structure for an installed python distribution"""
+
+    project_name: str
+    version: str
+    location: str
+
+
+def to_index_name(package_name: str) -> str:
+    """Normalizes a package name for lookups in the installed index."""
+    return re.sub(r'[-_.]+', '-', package_name).lower()
+
+
+def get_installed_index(
+        target_directory: str = None
+) -> typing.Dict[str, InstalledPackage]:
+    """
+    Returns an index of the installed python distributions keyed by their
+    normalized names. The index is built once from the distribution
+    metadata on the python path, or in the target directory if one is
+    specified, and is reused until pip installs something.
+
+    :param target_directory:
+        Alternate installation location to index instead of the python path.
+    """
+    paths = (
+        [clean_path(target_directory)]
+        if target_directory else
+        list(sys.path)
+    )
+    key = tuple(paths)
+
+    with _lock:
+        if key in _indexes:
+            return _indexes[key]
+
+        index = {}
+        for distribution in importlib_metadata.distributions(path=paths):
+            name = distribution.metadata['Name']
+            if not name or to_index_name(name) in index:
+                # Distributions found earlier on the path take precedence.
+                continue
+            index[to_index_name(name)] = InstalledPackage(
+                project_name=name,
+                version=distribution.version,
+                location=str(distribution.locate_file(''))
+            )
+
+        _indexes[key] = index
+        return index
+
+
+def invalidate_installed_index():
+    """Discards the installed index after packages have been installed."""
+    with _lock:
+        _indexes.clear()
+    importlib.invalidate_caches()
+
+
+def parse_version(version: str):
+    """Parses an installed version for comparison with another version."""
+    try:
+        from packaging.version import parse
+    except ImportError:  # pragma: no cover
+        from pkg_resources import parse_version as parse
+    return parse(version)
+
+
+def update_required(
+        package_name: str,
+        install_version: str,
+        target_directory: str = None
+) -> bool:
     """ """
-    existing = status(package_name)
+    existing = status(package_name, target_directory)
 
     if not existing:
         return True
@@ -21,8 +104,8 @@ def update_required(package_name: str, install_version: str) -> bool:
         install_version
     )
 
-    current = pkg_resources.parse_version(existing.version)
-    target = pkg_resources.parse_version(version)
+    current = parse_version(existing.version)
+    target = parse_version(version)
     return current != target
 
 
@@ -32,14 +115,22 @@ def clean_path(path: str) -> str:
     return os.path.realpath(path)
 
 
-def status(package_name: str):
-    """ """
-    try:
-        return pkg_resources.get_distribution(package_name)
-    except pkg_resources.DistributionNotFound:
-        return None
-    except Exception:
-        raise
+def status(
+        package_name: str,
+        target_directory: str = None
+) -> typing.Union[InstalledPackage, None]:
+    """
+    Returns the installed distribution of the specified package, or `None`
+    if it is not installed, from the cached installed index.
+
+    :param package_name:
+        Name of the package to look up.
+    :param target_directory:
+        Alternate installation location in which to look for the package
+        instead of the python path.
+    """
+    index = get_installed_index(target_directory)
+    return index.get(to_index_name(package_name))
 
 
 def install_wheel(
@@ -62,9 +153,10 @@ def install_wheel(
         if target_directory else
         []
     )
-    print('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
+    output.echo('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
 
     result = subprocess.run(cmd)
+    invalidate_installed_index()
     result.check_returncode()
 
 
@@ -87,12 +179,56 @@ def install_pypi(
         if target_directory else
         []
     )
-    print('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
+    output.echo('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
 
     result = subprocess.run(cmd)
+    invalidate_installed_index()
     result.check_returncode()
 
 
+def install_requirements(
+        requirements: typing.List[str],
+        to_user: bool = False,
+        target_directory: str = None
+):
+    """
+    Installs all of the specified requirements with a single pip invocation
+    by way of a generated requirements file. Requirements can be paths to
+    local wheel files or pypi requirement specifiers.
+    """
+    if not requirements:
+        return
+
+    handle, path = tempfile.mkstemp(
+        prefix='pipper-requirements-',
+        suffix='.txt'
+    )
+
+    try:
+        with os.fdopen(handle, 'w') as f:
+            f.write('\n'.join(requirements) + '\n')
+
+        cmd = [
+            sys.executable,
+            '-m', 'pip',
+            'install', '--requirement', path,
+        ]
+        cmd += ['--user'] if to_user else []
+        cmd += (
+            ['--target={}'.format(clean_path(target_directory))]
+            if target_directory else
+            []
+        )
+        output.echo('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
+        output.echo('[REQUIREMENTS]:\n  *', '\n  * '.join(requirements))
+
+        result = subprocess.run(cmd)
+        invalidate_installed_index()
+        result.check_returncode()
+    finally:
+        os.remove(path)
+
+
 def install_conda(
         package: typing.Union[str, dict],
         to_user: bool = False,
@@ -120,7 +256,8 @@ def install_conda(
         if target_directory else
         []
     )
-    print('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
+    output.echo('[COMMAND]:\n', ' '.join(cmd).replace(' --', '\n  --'))
 
     result = subprocess.run(cmd)
+    invalidate_installed_index()
     result.check_returncode()
@@ -69,7 +69,8 @@ setup(
         'wheel',
         'setuptools',
         'semver',
-        'boto3'
+        'boto3',
+        'importlib_metadata; python_version < "3.8"'
     ],
     setup_requires=['pytest-runner'],
     tests_require=['pytest', 'pytest-cov'],